@@ -0,0 +1,295 @@
+import json
+import os
+import queue
+import select
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+from latency import LatencyHistogram
+
+# --- Alert Dispatcher ---
+# Resident delivery channel between the scanners and the outside world. alert_scanner /
+# scanner_daemon hand every new alert to it as one datagram on DISPATCHER_SOCKET the
+# moment it is stored (send_alerts). The dispatcher drops alerts it has already seen,
+# coalesces a burst (e.g. many coins flipping at a 4h close) into one batch - flushed
+# once nothing new arrived for COALESCE_MS, at the latest COALESCE_MAX_MS after the first
+# alert - and fans the batch out to the configured sinks. Each sink has its own thread
+# and queue, so a slow or failing sink only delays itself; failed sends are retried with
+# backoff. Latency is measured from the alert's creation to the sink's ack.
+
+DISPATCHER_SOCKET = "/home/manni/.openclaw/workspace/trading/data/alerts.sock"
+LATENCY_PATH = "/home/manni/.openclaw/workspace/trading/dashboard/dispatcher_latency.json"
+OUTBOX_PATH = "/home/manni/.openclaw/workspace/trading/data/alert_outbox.jsonl"
+WEBHOOK_URL = None    # POSTs {"text", "alerts"} per batch when set
+ALERT_COMMAND = None  # e.g. ['openclaw', 'notify'], gets the batch text on stdin when set
+DISPATCH_SINKS = ['outbox', 'webhook', 'command']  # Unconfigured ones are skipped
+
+COALESCE_MS = 50        # A scanner burst arrives within a few ms
+COALESCE_MAX_MS = 1000
+BATCH_MAX = 100
+RETRY_BACKOFF_MS = [250, 1000, 5000, 30000]  # One retry per entry, then the batch is dropped
+DEDUPE_TTL_MS = 7 * 24 * 60 * 60 * 1000
+
+def now_ms():
+    return int(time.time() * 1000)
+
+# --- Producer Side ---
+def alert_key(alert):
+    return f"{alert['symbol']}|{alert['interval']}|{alert['strategy']}|{alert['candle_ts']}|{alert['type']}"
+
+def send_alerts(alerts, socket_path=DISPATCHER_SOCKET):
+    """Hands alerts to a running dispatcher, one datagram each. Returns how many were sent (0 if none is listening)."""
+    if not alerts or not os.path.exists(socket_path):
+        return 0
+    created = now_ms()
+    sent = 0
+    try:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        for alert in alerts:
+            s.sendto(json.dumps(dict(alert, created_ms=alert.get('created_ms', created))).encode(), socket_path)
+            sent += 1
+        s.close()
+    except OSError:
+        pass
+    return sent
+
+def format_batch(alerts):
+    """One line per alert, for chat-style sinks."""
+    lines = []
+    for a in alerts:
+        lines.append(f"{a['type']} {a['symbol']} {a['interval']} @ {a['price']:.6g} "
+                     f"SL {a['sl']:.6g} TP {a['tp']:.6g} ({a['strategy']})")
+    return "\n".join(lines)
+
+# --- Sinks ---
+# A sink has a name and send(batch) that raises on failure (the worker retries).
+class OutboxSink:
+    """Appends each batch as one JSON line; the agent tails this file instead of parsing stdout."""
+    name = 'outbox'
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+
+    def send(self, batch):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({'sent_ms': now_ms(), 'alerts': batch}) + "\n")
+
+class WebhookSink:
+    name = 'webhook'
+
+    def __init__(self, url=WEBHOOK_URL, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, batch):
+        body = json.dumps({'text': format_batch(batch), 'alerts': batch}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+class CommandSink:
+    name = 'command'
+
+    def __init__(self, command=ALERT_COMMAND, timeout=30):
+        self.command = command
+        self.timeout = timeout
+
+    def send(self, batch):
+        subprocess.run(self.command, input=format_batch(batch), text=True, timeout=self.timeout,
+                       check=True, stdout=subprocess.DEVNULL)
+
+class TestSink:
+    """
+    Local stand-in: writes every delivered batch with its delivery time to `path` (JSON
+    lines) so a test can read back what arrived when. Fails every `fail_every`-th send to
+    exercise the retry path (0 = never).
+    """
+    name = 'test'
+
+    def __init__(self, path, fail_every=0):
+        self.path = path
+        self.fail_every = fail_every
+        self.calls = 0
+
+    def send(self, batch):
+        self.calls += 1
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise ConnectionError(f"test sink: injected failure on call {self.calls}")
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({'delivered_ms': now_ms(), 'call': self.calls, 'alerts': batch}) + "\n")
+
+def configured_sinks(names=DISPATCH_SINKS):
+    """Sink instances for the names whose settings are present."""
+    sinks = []
+    for name in names:
+        if name == 'outbox':
+            sinks.append(OutboxSink())
+        elif name == 'webhook' and WEBHOOK_URL:
+            sinks.append(WebhookSink())
+        elif name == 'command' and ALERT_COMMAND:
+            sinks.append(CommandSink())
+    return sinks
+
+class SinkWorker(threading.Thread):
+    """Delivers batches to one sink in order, retrying each per RETRY_BACKOFF_MS."""
+
+    def __init__(self, sink, backoff_ms=RETRY_BACKOFF_MS):
+        super().__init__(daemon=True, name=f"sink-{sink.name}")
+        self.sink = sink
+        self.backoff_ms = backoff_ms
+        self.queue = queue.Queue()
+        self.latency = LatencyHistogram()
+        self.stats = {'batches': 0, 'alerts': 0, 'retries': 0, 'dropped': 0}
+
+    def run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            self.deliver(batch)
+
+    def deliver(self, batch):
+        for attempt in range(len(self.backoff_ms) + 1):
+            try:
+                self.sink.send(batch)
+            except Exception as e:
+                if attempt == len(self.backoff_ms):
+                    self.stats['dropped'] += 1
+                    print(f"  {self.sink.name}: dropped batch of {len(batch)} after {attempt + 1} attempts ({e})", flush=True)
+                    return
+                self.stats['retries'] += 1
+                print(f"  {self.sink.name}: send failed ({e}), retry in {self.backoff_ms[attempt]} ms", flush=True)
+                time.sleep(self.backoff_ms[attempt] / 1000)
+                continue
+            done = now_ms()
+            for alert in batch:
+                self.latency.observe(done - alert['created_ms'])
+            self.stats['batches'] += 1
+            self.stats['alerts'] += len(batch)
+            return
+
+# --- Dispatcher ---
+class AlertDispatcher:
+    def __init__(self, sinks, socket_path=DISPATCHER_SOCKET, coalesce_ms=COALESCE_MS,
+                 coalesce_max_ms=COALESCE_MAX_MS, latency_path=LATENCY_PATH):
+        self.workers = [SinkWorker(sink) for sink in sinks]
+        self.socket_path = socket_path
+        self.coalesce_ms = coalesce_ms
+        self.coalesce_max_ms = coalesce_max_ms
+        self.latency_path = latency_path
+        self.seen = {}      # alert key -> ms first seen
+        self.pending = []   # Current burst
+        self.first_ms = self.last_ms = 0
+        self.duplicates = 0
+        self.sock = None
+
+    def on_message(self, data, received_ms):
+        try:
+            alert = json.loads(data)
+            key = alert_key(alert)
+        except (ValueError, KeyError, TypeError):
+            return
+        if key in self.seen:
+            self.duplicates += 1
+            return
+        self.seen[key] = received_ms
+        alert.setdefault('created_ms', received_ms)
+        if not self.pending:
+            self.first_ms = received_ms
+        self.last_ms = received_ms
+        self.pending.append(alert)
+
+    def flush_due(self, ts):
+        """ms until the pending burst must be flushed (0 = now, None = nothing pending)."""
+        if not self.pending:
+            return None
+        if len(self.pending) >= BATCH_MAX:
+            return 0
+        return max(0, min(self.last_ms + self.coalesce_ms, self.first_ms + self.coalesce_max_ms) - ts)
+
+    def flush(self):
+        batch, self.pending = self.pending, []
+        for worker in self.workers:
+            worker.queue.put(batch)
+        print(f"Dispatched {len(batch)} alerts to {len(self.workers)} sinks at {datetime.now()}", flush=True)
+
+    def expire_seen(self, ts):
+        self.seen = {k: t for k, t in self.seen.items() if ts - t < DEDUPE_TTL_MS}
+
+    def write_latency(self):
+        data = {w.sink.name: dict(w.latency.snapshot(), **w.stats) for w in self.workers}
+        data['duplicates'] = self.duplicates
+        data['updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            tmp = self.latency_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.latency_path)
+        except OSError:
+            pass
+
+    def open_socket(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.socket_path)
+        self.sock.setblocking(False)
+
+    def run(self):
+        for worker in self.workers:
+            worker.start()
+        self.open_socket()
+        print(f"Alert dispatcher listening on {self.socket_path}, sinks: {', '.join(w.sink.name for w in self.workers) or 'none'}", flush=True)
+        last_expire = now_ms()
+        try:
+            while True:
+                due = self.flush_due(now_ms())
+                readable, _, _ = select.select([self.sock], [], [], None if due is None else due / 1000)
+                if readable:
+                    received = now_ms()
+                    while True:
+                        try:
+                            data = self.sock.recv(65536)
+                        except BlockingIOError:
+                            break
+                        self.on_message(data, received)
+
+                ts = now_ms()
+                if self.flush_due(ts) == 0:
+                    self.flush()
+                    self.write_latency()
+                if ts - last_expire > 3600 * 1000:
+                    self.expire_seen(ts)
+                    last_expire = ts
+        except KeyboardInterrupt:
+            print("Alert dispatcher stopped.", flush=True)
+        finally:
+            if self.pending:
+                self.flush()
+            for worker in self.workers:
+                worker.queue.put(None)
+            for worker in self.workers:
+                worker.join(timeout=5)
+            self.write_latency()
+            self.sock.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+if __name__ == "__main__":
+    # Usage: alert_dispatcher.py [--socket PATH] [--test-sink PATH [--fail-every N]]
+    #   --test-sink delivers only to a TestSink (see bench_alerts.py)
+    args = sys.argv[1:]
+    def option(name):
+        return args[args.index(name) + 1] if name in args else None
+    latency_path = LATENCY_PATH
+    if option('--test-sink'):
+        sinks = [TestSink(option('--test-sink'), int(option('--fail-every') or 0))]
+        latency_path = option('--test-sink') + ".latency.json"
+    else:
+        sinks = configured_sinks()
+    AlertDispatcher(sinks, socket_path=option('--socket') or DISPATCHER_SOCKET, latency_path=latency_path).run()
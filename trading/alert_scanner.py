@@ -1,10 +1,17 @@
 import sqlite3
-import pandas as pd
-import pandas_ta as ta
 import numpy as np
 from datetime import datetime
 import json
 import sys
+import time
+
+from alert_dispatcher import send_alerts
+from candles import Candles
+from correlation import load_matrix, suppress_correlated
+from market_data import load_latest_batch, INTERVAL_MS
+from pivots import PivotIndex, PIVOT_LOOKBACK, divergence_signal
+from scan_pipeline import register_strategy, run_series, REGISTRY
+from signal_store import connect, init_signal_store, load_watermarks, record_scan
 
 # --- Configuration ---
 DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
@@ -36,159 +43,207 @@ def get_strategy(symbol, interval):
     else:
         return STRATEGIES[f"DEFAULT_{interval}"]
 
+# --- Other strategies (params from the batch backtests in strategies/) ---
+MACD_PARAMS = {'fast': 12, 'slow': 26, 'signal': 9, 'sl': 0.03, 'tp': 0.06}
+SUPERTREND_PARAMS = {'length': 10, 'multiplier': 3.0, 'sl': 0.03, 'tp': 0.06}
+EMA_PULLBACK_PARAMS = {'ema_trend': 200, 'ema_entry': 50, 'atr_len': 14, 'sl_atr': 2.0, 'tp_atr': 4.0}
+
+# Candles loaded per series: enough for EMA 200 warmup + pivots
+SCAN_LIMIT = 250
+MIN_CANDLES = 50
+# Max. closed candles per series evaluated after the watermark (missed cron runs)
+MAX_CATCHUP = 24
+
+def make_alert(symbol, interval, side, label, price, sl, tp, time):
+    return {
+        'symbol': symbol,
+        'interval': interval,
+        'type': f"{'BUY' if side == 1 else 'SELL'} ({label})",
+        'price': price,
+        'sl': sl,
+        'tp': tp,
+        'time': time
+    }
+
+# --- RSI Divergence ---
+def rsi_divergence_requires(symbol, interval):
+    return [('rsi', get_strategy(symbol, interval)['rsi_len'])]
+
+def scan_rsi_divergence(symbol, interval, df, ind, state):
+    """
+    A pivot at i-n is confirmed at i, so we only alert on pivots confirmed by the
+    last closed candle. The previous pivot of the same kind is the last entry of the
+    PivotIndex (same 2-bar lookback / 5-bar window rule as optimizer.py).
+    state['pivots'] survives between runs in the daemon; the cron run rebuilds it.
+    """
+    strat = get_strategy(symbol, interval)
+    rsi = ind[('rsi', strat['rsi_len'])]
+    if rsi is None: return []
+    
+    pivots = state.setdefault('pivots', PivotIndex(PIVOT_LOOKBACK))
+    timestamps = df.timestamp
+    events = pivots.update(timestamps, df.low, df.high, rsi)
+    
+    last_ts = int(timestamps[-1])
+    price = df.close[-1]
+    alerts = []
+    
+    for ev in events:
+        if ev['confirm_ts'] != last_ts or ev['prev'] is None:
+            continue
+        _, prev_price, prev_rsi = ev['prev']
+        signal = divergence_signal(ev['kind'], prev_price, prev_rsi, ev['price'], ev['rsi'],
+                                   strat['rsi_os'], strat['rsi_ob'])
+        
+        # Bullish: Price Lower Low, RSI Higher Low (RSI oversold)
+        if signal == 1:
+            alerts.append(make_alert(symbol, interval, 1, 'Bullish Div', price,
+                                     price * (1 - strat['sl']), price * (1 + strat['tp']), ev['pivot_ts']))
+        # Bearish: Price Higher High, RSI Lower High (RSI overbought)
+        elif signal == -1:
+            alerts.append(make_alert(symbol, interval, -1, 'Bearish Div', price,
+                                     price * (1 + strat['sl']), price * (1 - strat['tp']), ev['pivot_ts']))
+    
+    return alerts
+
+# --- MACD Cross ---
+def macd_requires(symbol, interval):
+    p = MACD_PARAMS
+    return [('macd', p['fast'], p['slow'], p['signal'])]
+
+def scan_macd(symbol, interval, df, ind, state):
+    p = MACD_PARAMS
+    macd = ind[('macd', p['fast'], p['slow'], p['signal'])]
+    if macd is None or len(df) < 2: return []
+    m, s = macd['macd'], macd['signal']
+    
+    side = 0
+    if m[-1] > s[-1] and m[-2] <= s[-2]: side = 1
+    elif m[-1] < s[-1] and m[-2] >= s[-2]: side = -1
+    if side == 0: return []
+    
+    price = df.close[-1]
+    return [make_alert(symbol, interval, side, 'MACD Cross', price,
+                       price * (1 - side * p['sl']), price * (1 + side * p['tp']), int(df.timestamp[-1]))]
+
+# --- SuperTrend Flip ---
+def supertrend_requires(symbol, interval):
+    p = SUPERTREND_PARAMS
+    return [('supertrend', p['length'], p['multiplier'])]
+
+def scan_supertrend(symbol, interval, df, ind, state):
+    p = SUPERTREND_PARAMS
+    st = ind[('supertrend', p['length'], p['multiplier'])]
+    if st is None or len(df) < 2: return []
+    d = st['direction']
+    
+    side = 0
+    if d[-1] == 1 and d[-2] == -1: side = 1
+    elif d[-1] == -1 and d[-2] == 1: side = -1
+    if side == 0: return []
+    
+    price = df.close[-1]
+    return [make_alert(symbol, interval, side, 'SuperTrend Flip', price,
+                       price * (1 - side * p['sl']), price * (1 + side * p['tp']), int(df.timestamp[-1]))]
+
+# --- EMA Trend Pullback ---
+def ema_pullback_requires(symbol, interval):
+    p = EMA_PULLBACK_PARAMS
+    return [('ema', p['ema_trend']), ('ema', p['ema_entry']), ('atr', p['atr_len'])]
+
+def scan_ema_pullback(symbol, interval, df, ind, state):
+    p = EMA_PULLBACK_PARAMS
+    ema_t = ind[('ema', p['ema_trend'])]
+    ema_e = ind[('ema', p['ema_entry'])]
+    atr = ind[('atr', p['atr_len'])]
+    if ema_t is None or ema_e is None or atr is None or len(df) < 2: return []
+    
+    close = df.close
+    side = 0
+    # Trend from the previous close, pullback touches the entry EMA and closes back beyond it
+    if close[-2] > ema_t[-2] and df.low[-1] <= ema_e[-1] and close[-1] > ema_e[-1]: side = 1
+    elif close[-2] < ema_t[-2] and df.high[-1] >= ema_e[-1] and close[-1] < ema_e[-1]: side = -1
+    if side == 0: return []
+    
+    price = close[-1]
+    return [make_alert(symbol, interval, side, 'EMA Pullback', price,
+                       price - side * atr[-1] * p['sl_atr'], price + side * atr[-1] * p['tp_atr'], int(df.timestamp[-1]))]
+
+register_strategy('rsi_divergence', rsi_divergence_requires, scan_rsi_divergence)
+register_strategy('macd_cross', macd_requires, scan_macd)
+register_strategy('supertrend', supertrend_requires, scan_supertrend)
+register_strategy('ema_pullback', ema_pullback_requires, scan_ema_pullback)
+
+def scan_series(symbol, interval, df, state=None, timings=None):
+    """
+    Runs every registered strategy on the candles of one series (sorted ascending).
+    `state` is the series' per-strategy state when the caller keeps it across runs (daemon).
+    """
+    alerts = run_series(symbol, interval, df, state, timings=timings)
+    candle_ts = int(df.timestamp[-1])
+    for alert in alerts:
+        alert['candle_ts'] = candle_ts # Candle that triggered it (event store key)
+    return alerts
+
+def closed_candles(arrays, interval, now_ms):
+    """Drops the candle that is still forming (open time + interval > now)."""
+    closed = arrays['timestamp'] + INTERVAL_MS[interval] <= now_ms
+    return {col: arr[closed] for col, arr in arrays.items()}
+
 def check_signals():
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
+    init_signal_store(conn)
     alerts = []
+    timings = {}
     
     print(f"Checking signals at {datetime.now()}...", flush=True)
     
+    # Load Data for all series in one query. Arrays come back sorted ascending,
+    # every strategy runs on the same frame and shared indicators.
+    t0 = time.perf_counter()
+    now_ms = int(time.time() * 1000)
+    watermarks = load_watermarks(conn)
+    batch = load_latest_batch(conn, COINS, INTERVALS, limit=SCAN_LIMIT + MAX_CATCHUP)
+    timings['load'] = time.perf_counter() - t0
+    
+    new_watermarks = {}
     for symbol in COINS:
         for interval in INTERVALS:
-            # Load Data (Last 100 candles is enough for RSI + Pivot)
-            query = f"SELECT timestamp, open, high, low, close, volume FROM candles WHERE symbol='{symbol}' AND interval='{interval}' ORDER BY timestamp DESC LIMIT 100"
-            df = pd.read_sql_query(query, conn)
-            
-            if df.empty or len(df) < 50: continue
-            
-            # Sort ascending for calculation
-            df = df.sort_values('timestamp')
-            
-            # Get Params
-            strat = get_strategy(symbol, interval)
-            
-            # Calc RSI
-            df['RSI'] = ta.rsi(df['close'], length=strat['rsi_len'])
+            arrays = batch.get((symbol, interval))
+            if arrays is None: continue
+            arrays = closed_candles(arrays, interval, now_ms)
+            ts = arrays['timestamp']
+            if len(ts) < MIN_CANDLES: continue
             
-            # Pivot Detection (Lookback 2)
-            n = 2
-            # We only need to check the *latest* completed candle for a signal.
-            # Pivot at i-n is confirmed at i.
-            # So we check if a signal fired at the last closed candle (iloc[-1] or iloc[-2]?)
-            # Usually we want the signal *as soon as it closes*.
-            # If we run this every hour, we check the last closed 1h candle.
+            # Only candles after the watermark. First run: just the last closed candle.
+            wm = watermarks.get((symbol, interval))
+            first = len(ts) - 1 if wm is None else int(np.searchsorted(ts, wm, side='right'))
+            first = max(first, len(ts) - MAX_CATCHUP, MIN_CANDLES - 1)
             
-            # Let's calculate for the last few candles to be sure we didn't miss it
-            # Pivot logic: low[i-n] is min of [i-2n ... i]
-            # So if i is the last closed candle, we check if i-n was a pivot and if divergence existed.
-            
-            # Indices:
-            # -1 is the last candle in DF.
-            # -1-n is the potential pivot candle.
-            # We need to check if -1-n was a pivot using data up to -1.
-            
-            last_idx = len(df) - 1
-            pivot_idx = last_idx - n
-            
-            if pivot_idx < 0: continue
-
-            # Check Pivot Low
-            lows = df['low'].values
-            is_pivot_low = True
-            # Check window around pivot_idx: [pivot_idx - n, pivot_idx + n]
-            # Verify range bounds
-            start_window = pivot_idx - n
-            end_window = pivot_idx + n
-            
-            if start_window < 0 or end_window > last_idx: continue # Should not happen with limit 100
-            
-            pivot_low_val = lows[pivot_idx]
-            for k in range(start_window, end_window + 1):
-                if lows[k] < pivot_low_val:
-                    is_pivot_low = False
-                    break
-            
-            # Check Pivot High
-            highs = df['high'].values
-            is_pivot_high = True
-            pivot_high_val = highs[pivot_idx]
-            for k in range(start_window, end_window + 1):
-                if highs[k] > pivot_high_val:
-                    is_pivot_high = False
-                    break
-            
-            # --- Bullish Div Logic ---
-            if is_pivot_low:
-                # Find previous pivot low
-                # Loop backwards from start_window - 1
-                prev_pivot_idx = -1
-                for k in range(start_window - 1, 0, -1):
-                    # Check if k is a pivot low
-                    # Need full window [k-n, k+n]
-                    # We can't easily check full pivot property without full scan.
-                    # Simplified: Just find a local minimum in the past?
-                    # Strict: Re-run pivot check for k.
-                    
-                    # Optimization: Just check if lows[k] is a local low?
-                    # Let's use the same logic as backtest:
-                    # Rolling check would be easier but we are in a loop.
-                    # Let's assume we find *any* recent low that is Higher than current?
-                    # Wait, Bullish Div: Price Lower Low, RSI Higher Low.
-                    
-                    # Let's use the Pivot Low found at pivot_idx.
-                    curr_rsi = df['RSI'].iloc[pivot_idx]
-                    curr_low = df['low'].iloc[pivot_idx]
-                    
-                    # Filter: RSI Oversold
-                    if curr_rsi < strat['rsi_os']:
-                         # Look for ANY previous pivot low in last 30 candles
-                         # that has Higher Low Price but Lower RSI? NO.
-                         # Bullish Div:
-                         # Current Price (Low) < Prev Price (Low)
-                         # Current RSI > Prev RSI
-                         
-                         # Let's search back 20 candles
-                         found_div = False
-                         for j in range(pivot_idx - 1, max(0, pivot_idx - 30), -1):
-                             # Is j a pivot low? (Approximate check: is it lower than neighbors?)
-                             if lows[j] < lows[j-1] and lows[j] < lows[j+1]:
-                                 prev_low = lows[j]
-                                 prev_rsi = df['RSI'].iloc[j]
-                                 
-                                 if curr_low < prev_low and curr_rsi > prev_rsi:
-                                     # FOUND DIV!
-                                     alerts.append({
-                                         'symbol': symbol,
-                                         'interval': interval,
-                                         'type': 'BUY (Bullish Div)',
-                                         'price': df['close'].iloc[-1],
-                                         'sl': df['close'].iloc[-1] * (1 - strat['sl']),
-                                         'tp': df['close'].iloc[-1] * (1 + strat['tp']),
-                                         'time': df.index[pivot_idx] # Time of pivot
-                                     })
-                                     found_div = True
-                                     break
-                         if found_div: break
-
-            # --- Bearish Div Logic ---
-            if is_pivot_high:
-                curr_rsi = df['RSI'].iloc[pivot_idx]
-                curr_high = df['high'].iloc[pivot_idx]
-                
-                if curr_rsi > strat['rsi_ob']:
-                     # Search back
-                     found_div = False
-                     for j in range(pivot_idx - 1, max(0, pivot_idx - 30), -1):
-                         if highs[j] > highs[j-1] and highs[j] > highs[j+1]:
-                             prev_high = highs[j]
-                             prev_rsi = df['RSI'].iloc[j]
-                             
-                             if curr_high > prev_high and curr_rsi < prev_rsi:
-                                 # FOUND DIV!
-                                 alerts.append({
-                                     'symbol': symbol,
-                                     'interval': interval,
-                                     'type': 'SELL (Bearish Div)',
-                                     'price': df['close'].iloc[-1],
-                                     'sl': df['close'].iloc[-1] * (1 + strat['sl']),
-                                     'tp': df['close'].iloc[-1] * (1 - strat['tp']),
-                                     'time': df.index[pivot_idx]
-                                 })
-                                 found_div = True
-                                 break
-                     if found_div: break
+            state = {} # Shared across the catch-up bars (PivotIndex stays incremental)
+            candles = Candles.from_arrays(arrays)
+            for k in range(first, len(ts)):
+                alerts.extend(scan_series(symbol, interval, candles[max(0, k + 1 - SCAN_LIMIT):k + 1], state, timings=timings))
+            new_watermarks[(symbol, interval)] = ts[-1]
     
+    # Same-direction alerts on strongly correlated coins at the same candle: keep the first
+    alerts, suppressed = suppress_correlated(alerts, load_matrix())
+    if suppressed:
+        print(f"Suppressed {len(suppressed)} correlated alerts: {', '.join(a['symbol'] for a in suppressed)}", flush=True)
+
+    # Events + watermarks in one transaction, already stored events are dropped
+    t0 = time.perf_counter()
+    alerts = record_scan(conn, alerts, new_watermarks)
     conn.close()
+    timings['store'] = time.perf_counter() - t0
     
+    print("Timings: " + ", ".join(f"{k}={v*1000:.1f}ms" for k, v in timings.items()), flush=True)
+    publish_alerts(alerts)
+
+def publish_alerts(alerts):
+    # Straight to the alert dispatcher if one is running (batched delivery to the sinks)
+    send_alerts(alerts)
+
     # Save to JSON for Dashboard
     try:
         with open("/home/manni/.openclaw/workspace/trading/dashboard/signals.json", "w") as f:
@@ -201,7 +256,7 @@ def check_signals():
         print(json.dumps(alerts))
     else:
         # Output explicit empty status for heartbeat
-        print(json.dumps([{"type": "STATUS", "message": "No signals found via RSI Divergence strategy. System active."}]))
+        print(json.dumps([{"type": "STATUS", "message": f"No signals found ({', '.join(REGISTRY.keys())}). System active."}]))
 
 if __name__ == "__main__":
     check_signals()
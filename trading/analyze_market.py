@@ -1,7 +1,10 @@
 import sqlite3
+import sys
 import pandas as pd
 import pandas_ta as ta
 
+from market_snapshot import print_snapshot
+
 DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
 
 def load_data(symbol, interval, limit=200):
@@ -58,9 +61,15 @@ def analyze(symbol, interval):
     print(f"Latest: Close={last_close:.2f} | RSI={last_rsi:.2f}")
 
 if __name__ == "__main__":
-    print("Running market analysis...")
+    # Usage: analyze_market.py            -> indicator table for every coin x interval
+    #        analyze_market.py --json     -> same as JSON (cached in dashboard/data/market_snapshot.json)
+    #        analyze_market.py BTC 1h     -> detailed view of one series
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
     try:
-        analyze("BTC", "1h")
-        analyze("ETH", "15m")
+        if len(args) >= 2:
+            print("Running market analysis...")
+            analyze(args[0], args[1])
+        else:
+            print_snapshot(DB_PATH, as_json='--json' in sys.argv)
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from alert_dispatcher import COALESCE_MS, send_alerts
+
+# --- Alert Delivery End to End ---
+# Starts alert_dispatcher.py with only the local TestSink, sends alerts through
+# send_alerts() like the scanners do and reads back what was delivered when:
+#   single   - isolated alerts, each its own batch (latency = coalesce window + delivery)
+#   burst    - many coins at one 4h close, expected as a single batch
+#   repeat   - the same burst again, expected to be dropped as duplicates
+#   failing  - a sink that fails every 2nd send, delivered through the retry path
+# Usage: bench_alerts.py [burst size]   (default 40)
+
+TRADING_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def make_alerts(n, candle_ts, tag):
+    return [{'symbol': f"C{i}", 'interval': '4h', 'type': 'BUY (EMA Pullback)', 'strategy': tag,
+             'price': 100.0 + i, 'sl': 95.0, 'tp': 110.0, 'time': candle_ts, 'candle_ts': candle_ts}
+            for i in range(n)]
+
+def wait_for_socket(path, timeout=10):
+    deadline = time.time() + timeout
+    while not os.path.exists(path):
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def read_deliveries(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def wait_for_alerts(path, count, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if sum(len(d['alerts']) for d in read_deliveries(path)) >= count:
+            break
+        time.sleep(0.01)
+    return read_deliveries(path)
+
+def summary(label, deliveries, sent):
+    latencies = [d['delivered_ms'] - a['created_ms'] for d in deliveries for a in d['alerts']]
+    delivered = len(latencies)
+    line = f"{label:<8} sent {sent:>4}  delivered {delivered:>4} in {len(deliveries):>3} batches"
+    if latencies:
+        line += f"  latency p50 {statistics.median(latencies):.0f} ms, max {max(latencies):.0f} ms"
+    print(line)
+
+def scenario(fail_every, steps):
+    """Runs `steps(socket_path, sink_path)` against a fresh dispatcher, returns its deliveries."""
+    tmp = tempfile.mkdtemp(prefix="bench_alerts_")
+    socket_path = os.path.join(tmp, "alerts.sock")
+    sink_path = os.path.join(tmp, "delivered.jsonl")
+    worker = subprocess.Popen([sys.executable, os.path.join(TRADING_DIR, "alert_dispatcher.py"),
+                               "--socket", socket_path, "--test-sink", sink_path, "--fail-every", str(fail_every)],
+                              stdout=subprocess.DEVNULL)
+    try:
+        if not wait_for_socket(socket_path, timeout=10):
+            sys.exit("Alert dispatcher did not come up")
+        return steps(socket_path, sink_path)
+    finally:
+        worker.send_signal(signal.SIGINT)
+        worker.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def run(burst):
+    print(f"Coalesce window {COALESCE_MS} ms, burst of {burst}")
+    ts = 1700000000000
+
+    def single(socket_path, sink_path):
+        for i in range(10):
+            send_alerts(make_alerts(1, ts + i, 'single'), socket_path)
+            time.sleep(COALESCE_MS * 3 / 1000)
+        return wait_for_alerts(sink_path, 10)
+    summary('single', scenario(0, single), 10)
+
+    def burst_then_repeat(socket_path, sink_path):
+        send_alerts(make_alerts(burst, ts, 'burst'), socket_path)
+        first = wait_for_alerts(sink_path, burst)
+        summary('burst', first, burst)
+        send_alerts(make_alerts(burst, ts, 'burst'), socket_path)
+        time.sleep(COALESCE_MS * 5 / 1000)
+        return read_deliveries(sink_path)[len(first):]
+    summary('repeat', scenario(0, burst_then_repeat), burst)
+
+    def failing(socket_path, sink_path):
+        for i in range(4):
+            send_alerts(make_alerts(burst // 4, ts + i, 'failing'), socket_path)
+            time.sleep(COALESCE_MS * 3 / 1000)
+        return wait_for_alerts(sink_path, (burst // 4) * 4)
+    summary('failing', scenario(2, failing), (burst // 4) * 4)
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
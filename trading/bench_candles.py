@@ -0,0 +1,72 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from candles import Candles
+
+# --- Microbenchmark: DataFrame vs Candles ---
+# Times the operations the strategies used to pay for on every backtest:
+# attaching indicator columns (pd.concat vs with_columns), dropping the warmup
+# (dropna().reset_index vs a slice view) and reading values inside the bar loop
+# (df[col][i] vs plain lists from the contiguous arrays).
+# Usage: bench_candles.py [n_candles]
+
+def synthetic(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    spread = np.abs(rng.normal(0, 0.002, n))
+    return Candles(1600000000000 + np.arange(n) * 300000, close, close * (1 + spread),
+                   close * (1 - spread), close, np.ones(n))
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+def loop_dataframe(df):
+    total = 0.0
+    for i in range(1, len(df)):
+        if df['macd'][i] > df['signal'][i] and df['macd'][i-1] <= df['signal'][i-1]:
+            total += df['close'][i]
+    return total
+
+def loop_candles(c):
+    closes, macd, signal = c.close.tolist(), c['macd'].tolist(), c['signal'].tolist()
+    total = 0.0
+    for i in range(1, len(c)):
+        if macd[i] > signal[i] and macd[i-1] <= signal[i-1]:
+            total += closes[i]
+    return total
+
+def run(n):
+    candles = synthetic(n)
+    macd = np.where(np.arange(n) < 33, np.nan, np.sin(np.arange(n) / 7.0))
+    signal = np.where(np.arange(n) < 33, np.nan, np.sin(np.arange(n) / 7.0 - 0.3))
+    indicators = pd.DataFrame({'macd': macd, 'signal': signal})
+    df = candles.to_pandas()
+
+    rows = []
+    t_pd, df2 = timed(lambda: pd.concat([df, indicators], axis=1).dropna().reset_index(drop=True))
+    t_c, c2 = timed(lambda: candles.with_columns(macd=macd, signal=signal).dropna())
+    rows.append(("attach + dropna", t_pd, t_c))
+
+    t_pd, a = timed(lambda: loop_dataframe(df2), repeat=1)
+    t_c, b = timed(lambda: loop_candles(c2))
+    rows.append(("bar loop (3 columns)", t_pd, t_c))
+    assert a == b
+
+    t_pd, _ = timed(lambda: df2.iloc[1000:2000].reset_index(drop=True))
+    t_c, _ = timed(lambda: c2[1000:2000])
+    rows.append(("slice 1000 rows", t_pd, t_c))
+
+    print(f"{n} candles")
+    print(f"{'operation':<22} {'pandas ms':>10} {'Candles ms':>11} {'speedup':>8}")
+    for name, t_pd, t_c in rows:
+        print(f"{name:<22} {t_pd*1000:>10.2f} {t_c*1000:>11.3f} {t_pd/max(t_c, 1e-9):>7.0f}x")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
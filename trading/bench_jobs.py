@@ -0,0 +1,72 @@
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from run_job import WORKER_SOCKET
+
+# --- Cold vs Warm Job Latency ---
+# Wall time of `python3 run_job.py JOB` the way cron sees it: --cold (fresh interpreter,
+# all imports, then the job) vs handed to a job_worker.py (client start + job). Also
+# times a bare interpreter start and the pandas/pandas_ta import on their own.
+# Uses a running worker if there is one, otherwise starts one for the duration.
+# Usage: bench_jobs.py [runs] [job ...]   (default: track export snapshot scan)
+
+TRADING_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_JOBS = ['track', 'export', 'snapshot', 'scan']
+
+def wall_ms(cmd):
+    t0 = time.perf_counter()
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - t0) * 1000, result.returncode
+
+def median_ms(cmd, runs):
+    samples = [wall_ms(cmd) for _ in range(runs)]
+    return statistics.median(ms for ms, _ in samples), max(code for _, code in samples)
+
+def wait_for_socket(path, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.connect(path)
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+def run(runs, jobs, socket_path=WORKER_SOCKET):
+    python = sys.executable
+    client = os.path.join(TRADING_DIR, "run_job.py")
+
+    worker = None
+    if not wait_for_socket(socket_path, timeout=0):
+        t0 = time.perf_counter()
+        worker = subprocess.Popen([python, os.path.join(TRADING_DIR, "job_worker.py"), socket_path],
+                                  stdout=subprocess.DEVNULL)
+        if not wait_for_socket(socket_path):
+            worker.kill()
+            sys.exit("Job worker did not come up")
+        print(f"Worker start (preload): {(time.perf_counter() - t0)*1000:.0f} ms")
+
+    try:
+        start, _ = median_ms([python, "-c", "pass"], runs)
+        imports, _ = median_ms([python, "-c", "import pandas, pandas_ta"], runs)
+        print(f"Interpreter start: {start:.0f} ms, import pandas + pandas_ta: {imports:.0f} ms (median of {runs})")
+        print(f"{'job':<10} {'cold ms':>9} {'warm ms':>9} {'speedup':>8}")
+        for job in jobs:
+            cold, cold_code = median_ms([python, client, "--cold", job], runs)
+            warm, warm_code = median_ms([python, client, "--socket", socket_path, job], runs)
+            note = "" if cold_code == warm_code == 0 else f"  (exit {cold_code}/{warm_code})"
+            print(f"{job:<10} {cold:>9.0f} {warm:>9.0f} {cold/warm:>7.1f}x{note}")
+    finally:
+        if worker:
+            worker.send_signal(signal.SIGINT)
+            worker.wait()
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    run(runs, sys.argv[2:] or DEFAULT_JOBS)
@@ -0,0 +1,173 @@
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime
+
+from suites import BENCH_DIR, SUITES
+from synthetic_market import SEED, generate, write_db
+
+# --- Benchmark Runner ---
+# Generates the synthetic market into a temp database, runs the suites (best and median
+# of REPEAT timed runs per case) and compares against a stored JSON baseline: a case is a
+# regression when its best time grew by more than REGRESSION_PCT and by at least
+# MIN_DELTA_MS (sub-ms cases jitter by more than any threshold). Baselines are only
+# comparable on the same machine and sizes; the report warns when either differs.
+# Usage: run_benchmarks.py [--suite load,scanner,...] [--coins N] [--candles N] [--repeat N]
+#                          [--baseline NAME] [--save] [--note TEXT] [--out FILE] [--threshold PCT]
+#   --save writes the results as the baseline NAME (default 'default') instead of comparing,
+#   --note stores a remark with it (which machine, what was left out). The results carry
+#   host and sizes (env / params). Re-save a baseline when it comes from another machine.
+#   Exits 1 if a case regressed.
+
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+COINS = 10
+CANDLES = 5000   # 1h candles per coin (~7 months), 4h are aggregated from them
+REPEAT = 5
+REGRESSION_PCT = 20.0
+MIN_DELTA_MS = 1.0
+
+def timed(fn, setup, repeat):
+    """Best and median ms of `repeat` runs; setup runs untimed before each."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return min(times), statistics.median(times)
+
+def environment():
+    import numpy as np
+    env = {'host': platform.node(), 'python': platform.python_version(), 'numpy': np.__version__,
+           'machine': platform.machine(), 'cpus': os.cpu_count(), 'sqlite': sqlite3.sqlite_version}
+    try:
+        import pandas as pd
+        env['pandas'] = pd.__version__
+    except ImportError:
+        pass
+    return env
+
+def run(suites, coins=COINS, candles=CANDLES, repeat=REPEAT, note=None):
+    """Runs the suites on a fresh synthetic market. Returns the results document."""
+    tmp = tempfile.mkdtemp(prefix="bench_")
+    db = os.path.join(tmp, "synthetic.db")
+    end_ms = int(time.time() * 1000)
+    t0 = time.perf_counter()
+    market = generate(candles, coins, seed=SEED, end_ms=end_ms)
+    write_db(db, market)
+    print(f"Synthetic market: {coins} coins x {candles} 1h candles (+ 4h) in {time.perf_counter() - t0:.1f}s", flush=True)
+
+    ctx = {'db': db, 'tmp': tmp, 'conn': sqlite3.connect(db), 'coins': list(market), 'interval': '1h',
+           'end_ms': end_ms, 'market': market}
+    results = {}
+    failed = {}
+    try:
+        for name in suites:
+            try:
+                cases = SUITES[name](ctx)
+                for case, fn, setup in cases:
+                    best, median = timed(fn, setup, repeat)
+                    results[f"{name}/{case}"] = {'best_ms': round(best, 3), 'median_ms': round(median, 3)}
+                    print(f"  {name + '/' + case:<32} best {best:9.2f} ms  median {median:9.2f} ms", flush=True)
+            except Exception as e:
+                failed[name] = f"{type(e).__name__}: {e}"
+                print(f"  {name}: failed ({failed[name]})", flush=True)
+                traceback.print_exc()
+    finally:
+        ctx['conn'].close()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return {
+        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'note': note,
+        'params': {'coins': coins, 'candles': candles, 'repeat': repeat, 'seed': SEED},
+        'suites': list(suites),
+        'env': environment(),
+        'results': results,
+        'failed': failed
+    }
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def save_json(path, doc):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(doc, f, indent=1)
+    os.replace(tmp, path)
+
+def compare(baseline, current, threshold=REGRESSION_PCT):
+    """Prints the comparison report. Returns the regressed case names."""
+    for key in ('params', 'env'):
+        if baseline.get(key) != current.get(key):
+            print(f"Warning: {key} differ from the baseline ({baseline.get(key)} vs {current.get(key)}), times are not comparable")
+
+    regressions = []
+    print(f"\n{'case':<32} {'baseline':>10} {'now':>10} {'change':>8}")
+    now = current['results']
+    # Suites left out of this run (--suite) are not missing
+    base = {case: r for case, r in baseline['results'].items() if case.split('/')[0] in current['suites']}
+    for case in sorted(set(base) | set(now)):
+        if case not in now:
+            print(f"{case:<32} {base[case]['best_ms']:>8.2f}ms {'-':>10} {'':>8}  MISSING")
+            continue
+        if case not in base:
+            print(f"{case:<32} {'-':>10} {now[case]['best_ms']:>8.2f}ms {'':>8}  NEW")
+            continue
+        b, n = base[case]['best_ms'], now[case]['best_ms']
+        change = (n / b - 1) * 100 if b > 0 else 0.0
+        flag = ''
+        if change > threshold and n - b >= MIN_DELTA_MS:
+            flag = 'REGRESSION'
+            regressions.append(case)
+        elif change < -threshold and b - n >= MIN_DELTA_MS:
+            flag = 'faster'
+        print(f"{case:<32} {b:>8.2f}ms {n:>8.2f}ms {change:>+7.1f}%  {flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regressions over {threshold:.0f}%: {', '.join(regressions)}")
+    else:
+        print(f"\nNo regressions over {threshold:.0f}% against the baseline of {baseline['created']}")
+    return regressions
+
+def main(*args):
+    args = list(args)
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args else default
+
+    suites = option('--suite').split(',') if option('--suite') else list(SUITES)
+    unknown = [s for s in suites if s not in SUITES]
+    if unknown:
+        sys.exit(f"Unknown suites: {', '.join(unknown)} (known: {', '.join(SUITES)})")
+
+    current = run(suites, coins=int(option('--coins', COINS)), candles=int(option('--candles', CANDLES)),
+                  repeat=int(option('--repeat', REPEAT)), note=option('--note'))
+    if option('--out'):
+        save_json(option('--out'), current)
+
+    name = option('--baseline', 'default')
+    if '--save' in args:
+        save_json(baseline_path(name), current)
+        print(f"Saved baseline '{name}' ({len(current['results'])} cases) to {baseline_path(name)}")
+        return 0
+    if not os.path.exists(baseline_path(name)):
+        print(f"No baseline '{name}' yet, store one with --save")
+        return 0
+    with open(baseline_path(name)) as f:
+        baseline = json.load(f)
+    if baseline.get('note'):
+        print(f"Baseline '{name}': {baseline['note']}")
+    threshold = float(option('--threshold', REGRESSION_PCT))
+    return 1 if compare(baseline, current, threshold) or current['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,159 @@
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+TRADING_DIR = os.path.dirname(BENCH_DIR)
+for path in (TRADING_DIR, os.path.join(TRADING_DIR, "dashboard"), os.path.join(TRADING_DIR, "strategies")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+from candles import Candles
+from market_data import INTERVAL_MS, iter_candle_chunks, load_candles, load_latest_batch, load_range_batch
+
+# --- Benchmark Suites ---
+# A suite takes the run context and returns its cases as (name, fn, setup): fn is timed,
+# setup (or None) runs untimed before every repetition. Modules are imported inside the
+# suites, so a missing dependency fails only its suite. Jobs with hardcoded live paths
+# get those module constants pointed at the run's temp dir (redirect), and anything that
+# would publish (alerts, dashboard files) is switched off.
+# Context: db, tmp, conn, coins, interval ('1h'), end_ms, market ({symbol: arrays}).
+
+# Params of the indicators as the strategies request them (scan_pipeline specs)
+INDICATOR_PARAMS = {'rsi': (14,), 'ema': (200,), 'atr': (14,), 'macd': (12, 26, 9), 'supertrend': (10, 3.0)}
+
+@contextlib.contextmanager
+def redirect(module, **attrs):
+    """Temporarily replaces module globals (paths, side effects)."""
+    old = {name: getattr(module, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in old.items():
+            setattr(module, name, value)
+
+def quiet(fn):
+    """fn with its stdout swallowed (jobs print their reports)."""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+def bench_candles(ctx, symbol='BTC'):
+    return Candles.from_arrays(ctx['market'][symbol])
+
+# --- Suites ---
+def suite_load(ctx):
+    conn, coins, interval = ctx['conn'], ctx['coins'], ctx['interval']
+    return [
+        ('load_candles', lambda: [load_candles(conn, s, interval) for s in coins], None),
+        ('latest_batch', lambda: load_latest_batch(conn, coins, [interval, '4h'], limit=300, now_ms=ctx['end_ms']), None),
+        ('range_batch', lambda: load_range_batch(conn, coins, interval, -1, 2 ** 62), None),
+        ('chunks', lambda: sum(len(c) for c in iter_candle_chunks(conn, coins[0], interval, chunk_size=1000)), None),
+    ]
+
+def suite_indicators(ctx):
+    from scan_pipeline import INDICATORS
+    from market_snapshot import market_snapshot
+    candles = bench_candles(ctx)
+    cases = [(name, lambda fn=fn, params=INDICATOR_PARAMS[name]: fn(candles, *params), None)
+             for name, fn in INDICATORS.items() if name in INDICATOR_PARAMS]
+    cases.append(('snapshot_panel', lambda: market_snapshot(ctx['conn'], cache_path=None, force=True), None))
+    return cases
+
+def suite_strategies(ctx):
+    import ema_trend_pullback
+    import macd
+    import rsi_divergence
+    import supertrend
+    candles = bench_candles(ctx)
+
+    def rsi_div():
+        with redirect(rsi_divergence, DB_PATH=ctx['db']):
+            rsi_divergence.run_backtest(ctx['coins'][0], ctx['interval'])
+
+    return [
+        ('macd', lambda: macd.backtest_macd(candles), None),
+        ('supertrend', lambda: supertrend.backtest_supertrend(candles), None),
+        ('ema_pullback', lambda: ema_trend_pullback.backtest_ema_pullback(candles), None),
+        ('rsi_divergence', quiet(rsi_div), None),
+    ]
+
+def suite_optimizer(ctx):
+    import pandas as pd
+    import optimizer
+    df = pd.DataFrame(ctx['market'][ctx['coins'][0]])
+    # Funding index like perp_history.funding_cost_index builds it (one ~0.001% settlement per 1h candle)
+    rng = np.random.default_rng(0)
+    funding = np.cumsum(rng.normal(1e-5, 3e-5, len(df)) * df['close'].values)
+    return [
+        ('grid', lambda: optimizer.optimize_series('BTC', ctx['interval'], df), None),
+        ('grid_funding', lambda: optimizer.optimize_series('BTC', ctx['interval'], df, funding), None),
+    ]
+
+def suite_scanner(ctx):
+    import alert_scanner
+    from signal_store import init_signal_store, record_scan
+
+    def reset(catchup):
+        def setup():
+            conn = sqlite3.connect(ctx['db'])
+            conn.execute("DROP TABLE IF EXISTS signals")
+            conn.execute("DROP TABLE IF EXISTS scan_watermarks")
+            init_signal_store(conn)
+            if catchup:
+                # Watermarks MAX_CATCHUP candles back: every series replays that many bars
+                last = {i: ctx['end_ms'] - ctx['end_ms'] % INTERVAL_MS[i] - INTERVAL_MS[i] for i in alert_scanner.INTERVALS}
+                record_scan(conn, [], {(s, i): last[i] - alert_scanner.MAX_CATCHUP * INTERVAL_MS[i]
+                                       for s in alert_scanner.COINS for i in alert_scanner.INTERVALS})
+            conn.close()
+        return setup
+
+    def scan():
+        with redirect(alert_scanner, DB_PATH=ctx['db'], publish_alerts=lambda alerts: None):
+            alert_scanner.check_signals()
+
+    return [
+        ('last_candle', quiet(scan), reset(False)),
+        ('catchup', quiet(scan), reset(True)),
+    ]
+
+def suite_exporter(ctx):
+    import data_exporter
+    dash = os.path.join(ctx['tmp'], "dashboard")
+    export_dir = os.path.join(dash, "data")
+    paths = {
+        'DB_PATH': ctx['db'],
+        'DASH_DIR': dash,
+        'JSON_PATH': os.path.join(dash, "data.json"),
+        'SIGNALS_PATH': os.path.join(dash, "signals.json"),
+        'MACD_PATH': os.path.join(dash, "macd_results.json"),
+        'EXPORT_DIR': export_dir,
+        'MANIFEST_PATH': os.path.join(export_dir, "manifest.json"),
+        'STATE_PATH': os.path.join(export_dir, ".export_state.json"),
+        'SERIES_STATE_PATH': os.path.join(export_dir, ".series_state.json"),
+    }
+
+    def export():
+        with redirect(data_exporter, **paths):
+            data_exporter.export_data()
+
+    return [
+        ('cold', quiet(export), lambda: shutil.rmtree(dash, ignore_errors=True)),
+        ('unchanged', quiet(export), None), # Runs after 'cold': every shard key is current
+    ]
+
+# name -> suite, in run order
+SUITES = {
+    'load': suite_load,
+    'indicators': suite_indicators,
+    'strategies': suite_strategies,
+    'optimizer': suite_optimizer,
+    'scanner': suite_scanner,
+    'exporter': suite_exporter,
+}
@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import sys
+import numpy as np
+
+# Shared modules live one level up in trading/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from market_data import COLUMNS, INTERVAL_MS
+
+# --- Synthetic OHLCV ---
+# Deterministic candles for benchmarks: a log random walk per coin whose drift and
+# volatility follow market-wide regimes (switching after a geometric number of candles).
+# Each coin's return is the common market shock plus its own, so the coins correlate like
+# alts on BTC. Same seed and sizes -> the same prices, only the timestamps follow end_ms.
+
+SEED = 42
+# (name, drift per candle, volatility per candle, mean length in candles)
+REGIMES = [
+    ('bull', 0.0005, 0.006, 400),
+    ('bear', -0.0005, 0.009, 250),
+    ('range', 0.0, 0.004, 300),
+    ('crash', -0.003, 0.025, 30),
+]
+MARKET_SHARE = 0.6  # Share of a coin's return variance coming from the market shock
+# Real names first, so the scanner / exporter watchlists find their coins
+SYMBOLS = ['BTC', 'ETH', 'SOL', 'BNB', 'ARB', 'OP', 'SUI', 'MATIC', 'LINK', 'DOGE']
+
+def symbols(n_coins):
+    return SYMBOLS[:n_coins] + [f"SYN{k:03d}" for k in range(n_coins - len(SYMBOLS))]
+
+def regime_path(n, rng):
+    """Regime index per candle."""
+    out = np.empty(n, dtype=np.int64)
+    pos = 0
+    regime = int(rng.integers(len(REGIMES)))
+    while pos < n:
+        length = int(rng.geometric(1.0 / REGIMES[regime][3]))
+        out[pos:pos + length] = regime
+        pos += length
+        regime = (regime + 1 + int(rng.integers(len(REGIMES) - 1))) % len(REGIMES) # Any other one
+    return out
+
+def generate(n_candles, n_coins, interval='1h', seed=SEED, end_ms=None):
+    """{symbol: {column: array}} of n_candles closed candles each, the last one opening before end_ms."""
+    rng = np.random.default_rng(seed)
+    step = INTERVAL_MS[interval]
+    end_ms = end_ms if end_ms is not None else 1767225600000 # 2026-01-01
+    last = end_ms - end_ms % step - step
+    timestamps = last - step * np.arange(n_candles - 1, -1, -1, dtype=np.int64)
+
+    regimes = regime_path(n_candles, rng)
+    drift = np.array([r[1] for r in REGIMES])[regimes]
+    vol = np.array([r[2] for r in REGIMES])[regimes]
+    market = rng.standard_normal(n_candles)
+
+    out = {}
+    for k, symbol in enumerate(symbols(n_coins)):
+        scale = 1.0 if k == 0 else rng.uniform(1.0, 2.0)  # Alts move more than BTC
+        start = 60000.0 if k == 0 else float(np.exp(rng.uniform(np.log(0.05), np.log(3000))))
+        shock = np.sqrt(MARKET_SHARE) * market + np.sqrt(1 - MARKET_SHARE) * rng.standard_normal(n_candles)
+        close = start * np.exp(np.cumsum(drift * scale + vol * scale * shock))
+        open_ = np.r_[start, close[:-1]]
+        wick = vol * scale * 0.5
+        high = np.maximum(open_, close) * np.exp(np.abs(rng.standard_normal(n_candles)) * wick)
+        low = np.minimum(open_, close) * np.exp(-np.abs(rng.standard_normal(n_candles)) * wick)
+        volume = 1000.0 * np.exp(rng.normal(0, 0.5, n_candles)) * (vol / REGIMES[2][2])
+        out[symbol] = {'timestamp': timestamps, 'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+    return out
+
+def aggregate(arrays, interval, target):
+    """Candles of a coarser interval (whole target candles only, aligned to its grid)."""
+    factor = INTERVAL_MS[target] // INTERVAL_MS[interval]
+    first = int(np.argmax(arrays['timestamp'] % INTERVAL_MS[target] == 0))
+    n = (len(arrays['timestamp']) - first) // factor
+    cut = {col: arr[first:first + n * factor].reshape(n, factor) for col, arr in arrays.items()}
+    return {'timestamp': cut['timestamp'][:, 0], 'open': cut['open'][:, 0], 'high': cut['high'].max(axis=1),
+            'low': cut['low'].min(axis=1), 'close': cut['close'][:, -1], 'volume': cut['volume'].sum(axis=1)}
+
+def write_db(path, market, interval='1h', targets=('4h',)):
+    """Writes the coins (and their aggregates to `targets`) into a fresh candles table."""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS candles (
+            symbol TEXT,
+            interval TEXT,
+            timestamp INTEGER,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume REAL,
+            PRIMARY KEY (symbol, interval, timestamp)
+        )
+    ''')
+    with conn:
+        for symbol, arrays in market.items():
+            for iv, a in [(interval, arrays)] + [(t, aggregate(arrays, interval, t)) for t in targets]:
+                rows = zip([symbol] * len(a['timestamp']), [iv] * len(a['timestamp']),
+                           a['timestamp'].tolist(), *(a[col].tolist() for col in COLUMNS[1:]))
+                conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.close()
+
+if __name__ == "__main__":
+    # Usage: synthetic_market.py DB_PATH [--coins N] [--candles N] [--seed S]   (1h + 4h, ending now)
+    import time
+    args = sys.argv[1:]
+    def option(name, default):
+        return int(args[args.index(name) + 1]) if name in args else default
+    market = generate(option('--candles', 5000), option('--coins', 10), seed=option('--seed', SEED),
+                      end_ms=int(time.time() * 1000))
+    write_db(args[0], market)
+    print(f"Wrote {len(market)} coins x {option('--candles', 5000)} 1h candles (+ 4h) to {args[0]}")
@@ -0,0 +1,281 @@
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from market_data import COLUMNS, DB_PATH, INTERVAL_MS, iter_candle_chunks, list_series
+
+# --- Candle Validation ---
+# Vectorized rules over the ascending arrays of one series. Every row gets a bit mask of
+# the rules it breaks; rows breaking a QUARANTINE rule go to the candle_quarantine table
+# instead of candles, so backtests and the scanner never see them. Runs on every chunk
+# the sync ingests (store_candles, via sync_hyperliquid.save_candles) and on demand over
+# the whole database (--audit). Missing intervals have no row to quarantine, they are
+# only reported.
+
+PARSE = 1          # Unparsable or non-finite field
+OHLC = 2           # high below max(open, close) or low above min(open, close)
+NON_POSITIVE = 4   # Price <= 0 or negative volume
+OFF_GRID = 8       # Open time not a multiple of the interval step
+DUPLICATE = 16     # Open time repeated later in the chunk (the last copy wins)
+ZERO_VOLUME = 32   # Closed candle without volume (the forming one may legitimately have none)
+SPIKE = 64         # Close jumps SPIKE_Z sigmas and snaps back on the next candle
+WICK = 128         # High/low sticks out WICK_Z typical ranges beyond the body
+
+RULES = {PARSE: 'parse', OHLC: 'ohlc', NON_POSITIVE: 'non_positive', OFF_GRID: 'off_grid',
+         DUPLICATE: 'duplicate', ZERO_VOLUME: 'zero_volume', SPIKE: 'spike', WICK: 'wick'}
+QUARANTINE = PARSE | OHLC | NON_POSITIVE | OFF_GRID | DUPLICATE | ZERO_VOLUME | SPIKE | WICK
+
+# Spike detection: z = |log return| / sigma, sigma from the mean absolute return of the
+# SPIKE_WINDOW candles before (rolling sums, no per-window sort). Moves under
+# SPIKE_MIN_MOVE never count, so flat illiquid series don't flag every tick.
+SPIKE_WINDOW = 100
+SPIKE_Z = 10.0
+SPIKE_REVERT = 0.5     # Next return must undo at least this share of the jump
+SPIKE_MIN_MOVE = 0.02
+WICK_Z = 20.0          # In mean high/low ranges of the window
+CONTEXT_ROWS = SPIKE_WINDOW + 2  # Stored candles loaded in front of an ingested chunk
+AUDIT_WORKERS = os.cpu_count() or 4  # Row decoding in the sqlite3 module is the bottleneck, so one process per core
+
+def init_quarantine(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS candle_quarantine (
+            symbol TEXT,
+            interval TEXT,
+            timestamp INTEGER,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume REAL,
+            reasons TEXT,
+            quarantined INTEGER,
+            PRIMARY KEY (symbol, interval, timestamp)
+        )
+    ''')
+
+def describe(flags):
+    """Bit mask -> 'ohlc,spike'."""
+    return ','.join(name for bit, name in RULES.items() if flags & bit)
+
+# --- Rules ---
+def rolling_mean_before(values, window):
+    """Mean of the `window` values before each position (NaN until there are that many)."""
+    out = np.full(len(values), np.nan)
+    if len(values) > window:
+        sums = np.cumsum(np.r_[0.0, values])
+        out[window:] = (sums[window:-1] - sums[:-window - 1]) / window
+    return out
+
+def spike_flags(o, h, l, c, window=SPIKE_WINDOW):
+    """SPIKE / WICK bits for candles that already passed the row rules."""
+    flags = np.zeros(len(c), dtype=np.uint16)
+    if len(c) < window + 2:
+        return flags
+
+    # Close spikes: returns[j] leads into candle j+1, which is the suspect
+    returns = np.diff(np.log(c))
+    moves = np.abs(returns)
+    sigma = rolling_mean_before(moves, window) * np.sqrt(np.pi / 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        jump = (moves > SPIKE_Z * sigma) & (moves > SPIKE_MIN_MOVE)
+    revert = np.zeros(len(returns), dtype=bool)
+    revert[:-1] = (returns[1:] * returns[:-1] < 0) & (np.abs(returns[1:]) >= SPIKE_REVERT * moves[:-1])
+    flags[1:][jump & revert] |= SPIKE
+
+    # Wicks beyond the body, against the mean range of the window before
+    body_high = np.maximum(o, c)
+    body_low = np.minimum(o, c)
+    wick = np.maximum(np.log(h / body_high), np.log(body_low / l))
+    typical = rolling_mean_before(np.log(h / l), window)
+    with np.errstate(invalid='ignore'):
+        flags[(wick > WICK_Z * typical) & (wick > SPIKE_MIN_MOVE)] |= WICK
+    return flags
+
+def check(arrays, step, now_ms=None):
+    """
+    Bit mask per row of ascending (ties allowed) candle arrays. The spike rules only look
+    at rows that pass the row rules, so one garbled candle doesn't also flag its neighbours.
+    """
+    now_ms = now_ms or int(time.time() * 1000)
+    ts = arrays['timestamp']
+    o, h, l, c, v = (arrays[col] for col in COLUMNS[1:])
+    flags = np.zeros(len(ts), dtype=np.uint16)
+    if not len(ts):
+        return flags
+
+    prices = np.column_stack([o, h, l, c])
+    flags[~(np.isfinite(prices).all(axis=1) & np.isfinite(v))] |= PARSE
+    with np.errstate(invalid='ignore'):
+        flags[(h < np.maximum(o, c)) | (l > np.minimum(o, c))] |= OHLC
+        flags[(prices <= 0).any(axis=1) | (v < 0)] |= NON_POSITIVE
+        flags[(v == 0) & (ts + step <= now_ms)] |= ZERO_VOLUME
+    flags[ts % step != 0] |= OFF_GRID
+    flags[:-1][ts[1:] == ts[:-1]] |= DUPLICATE
+
+    ok = np.flatnonzero(flags == 0)
+    flags[ok] |= spike_flags(o[ok], h[ok], l[ok], c[ok])
+    return flags
+
+def find_gaps(ts, step):
+    """[(first missing open time, candles missing)] between consecutive stored candles."""
+    diffs = np.diff(ts)
+    at = np.flatnonzero(diffs > step)
+    return list(zip((ts[at] + step).tolist(), (diffs[at] // step - 1).tolist()))
+
+# --- Ingest ---
+def from_api(candles):
+    """
+    API candle dicts ({'t', 'o', 'h', 'l', 'c', 'v'}, prices as strings) -> ascending arrays.
+    Garbled fields become NaN (caught by PARSE); rows without a usable open time are
+    dropped, there is no key to store them under. Returns (arrays, dropped).
+    """
+    rows = []
+    for candle in candles:
+        try:
+            rows.append((int(candle['t']), candle.get('o'), candle.get('h'), candle.get('l'),
+                         candle.get('c'), candle.get('v')))
+        except (KeyError, TypeError, ValueError):
+            continue
+    dropped = len(candles) - len(rows)
+    rows.sort(key=lambda r: r[0]) # Stable: duplicates keep their API order
+
+    arrays = {'timestamp': np.array([r[0] for r in rows], dtype=np.int64)}
+    for j, col in enumerate(COLUMNS[1:], start=1):
+        raw = [r[j] for r in rows]
+        try:
+            arrays[col] = np.array(raw, dtype=np.float64)
+        except (TypeError, ValueError):
+            arrays[col] = np.array([to_float(x) for x in raw], dtype=np.float64)
+    return arrays, dropped
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def load_context(conn, symbol, interval, before_ms, limit=CONTEXT_ROWS):
+    rows = conn.execute('''
+        SELECT timestamp, open, high, low, close, volume FROM candles
+        WHERE symbol = ? AND interval = ? AND timestamp < ?
+        ORDER BY timestamp DESC LIMIT ?
+    ''', (symbol, interval, before_ms, limit)).fetchall()[::-1]
+    arrays = {'timestamp': np.array([r[0] for r in rows], dtype=np.int64)}
+    for j, col in enumerate(COLUMNS[1:], start=1):
+        arrays[col] = np.array([r[j] for r in rows], dtype=np.float64)
+    return arrays
+
+def quarantine_rows(conn, symbol, interval, arrays, flags, idx, now_s):
+    conn.executemany('''
+        INSERT OR REPLACE INTO candle_quarantine
+        (symbol, interval, timestamp, open, high, low, close, volume, reasons, quarantined)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(symbol, interval, int(arrays['timestamp'][k]), *(float(arrays[col][k]) for col in COLUMNS[1:]),
+           describe(int(flags[k])), now_s) for k in idx])
+
+def store_candles(conn, symbol, interval, arrays, now_ms=None):
+    """
+    Validates one ingested chunk behind the stored candles before it and writes it: clean
+    rows to candles, bad ones to candle_quarantine. Stored candles that the new ones
+    expose as spikes (the snap-back only arrives with the next candle) are moved out too.
+    Returns (saved, quarantined).
+    """
+    if not len(arrays['timestamp']):
+        return 0, 0
+    now_ms = now_ms or int(time.time() * 1000)
+    context = load_context(conn, symbol, interval, int(arrays['timestamp'][0]))
+    k = len(context['timestamp'])
+    combined = {col: np.concatenate([context[col], arrays[col]]) for col in COLUMNS}
+    flags = check(combined, INTERVAL_MS[interval], now_ms)
+    bad = flags & QUARANTINE != 0
+    stored_bad = np.flatnonzero(bad[:k])
+    new_bad = np.flatnonzero(bad[k:]) + k
+    good = np.flatnonzero(~bad[k:]) + k
+
+    with conn:
+        init_quarantine(conn)
+        conn.executemany('''
+            INSERT OR REPLACE INTO candles (symbol, interval, timestamp, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', zip([symbol] * len(good), [interval] * len(good), combined['timestamp'][good].tolist(),
+                 *(combined[col][good].tolist() for col in COLUMNS[1:])))
+        if len(stored_bad) or len(new_bad):
+            quarantine_rows(conn, symbol, interval, combined, flags, np.r_[stored_bad, new_bad], now_ms // 1000)
+            conn.executemany("DELETE FROM candles WHERE symbol = ? AND interval = ? AND timestamp = ?",
+                             [(symbol, interval, int(combined['timestamp'][i])) for i in stored_bad])
+    return len(good), len(stored_bad) + len(new_bad)
+
+# --- Audit ---
+def audit_series(args):
+    """Worker: validates one stored series. Returns (symbol, interval, rows, flags of bad rows, gaps)."""
+    db_path, symbol, interval, now_ms = args
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+    try:
+        chunks = list(iter_candle_chunks(conn, symbol, interval, chunk_size=10 ** 7))
+    finally:
+        conn.close()
+    if not chunks:
+        return symbol, interval, 0, {}, np.zeros(0, dtype=np.uint16), []
+    arrays = {col: np.concatenate([ch[col] for ch in chunks]) for col in COLUMNS}
+    flags = check(arrays, INTERVAL_MS[interval], now_ms)
+    bad = np.flatnonzero(flags)
+    rows = {col: arrays[col][bad] for col in COLUMNS}
+    return symbol, interval, len(flags), rows, flags[bad], find_gaps(arrays['timestamp'], INTERVAL_MS[interval])
+
+def audit(db_path=DB_PATH, quarantine=False, workers=AUDIT_WORKERS):
+    """
+    Validates every stored series (one process per series at a time, each with its own
+    read-only connection). With quarantine=True bad rows are moved to candle_quarantine.
+    Returns {(symbol, interval): {rule: count, 'gaps': n, 'missing': candles}} for series with findings.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    series = [(s, i) for s, i in list_series(conn) if i in INTERVAL_MS]
+    now_ms = int(time.time() * 1000)
+    t0 = time.perf_counter()
+    findings = {}
+    total_rows = moved = 0
+    with ProcessPoolExecutor(workers) as pool:
+        for symbol, interval, n, rows, flags, gaps in pool.map(
+                audit_series, [(db_path, s, i, now_ms) for s, i in series], chunksize=4):
+            total_rows += n
+            if not len(flags) and not gaps:
+                continue
+            counts = {name: int(np.count_nonzero(flags & bit)) for bit, name in RULES.items()}
+            counts = {name: n for name, n in counts.items() if n}
+            if gaps:
+                counts.update(gaps=len(gaps), missing=sum(g[1] for g in gaps))
+            findings[(symbol, interval)] = counts
+            idx = np.flatnonzero(flags & QUARANTINE)
+            if quarantine and len(idx):
+                with conn:
+                    init_quarantine(conn)
+                    quarantine_rows(conn, symbol, interval, rows, flags, idx, now_ms // 1000)
+                    conn.executemany("DELETE FROM candles WHERE symbol = ? AND interval = ? AND timestamp = ?",
+                                     [(symbol, interval, int(rows['timestamp'][k])) for k in idx])
+                moved += len(idx)
+    conn.close()
+
+    elapsed = time.perf_counter() - t0
+    print(f"Audited {len(series)} series, {total_rows} candles in {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9) / 1e6:.1f}M candles/s)")
+    totals = {}
+    for counts in findings.values():
+        for name, n in counts.items():
+            totals[name] = totals.get(name, 0) + n
+    print("Findings: " + (", ".join(f"{name} {n}" for name, n in totals.items()) or "none"))
+    worst = sorted(findings.items(), key=lambda x: -sum(n for name, n in x[1].items() if name in RULES.values()))[:10]
+    for (symbol, interval), counts in worst:
+        print(f"  {symbol:<10} {interval:<4} " + ", ".join(f"{name} {n}" for name, n in counts.items()))
+    if quarantine:
+        print(f"Moved {moved} candles to candle_quarantine")
+    return findings
+
+if __name__ == "__main__":
+    # Usage: candle_validation.py [--quarantine] [db_path]
+    #   Audits every series in the database; --quarantine also moves the bad candles out.
+    args = sys.argv[1:]
+    quarantine = '--quarantine' in args
+    args = [a for a in args if a != '--quarantine']
+    audit(args[0] if args else DB_PATH, quarantine)
@@ -0,0 +1,101 @@
+import numpy as np
+
+# --- Candle Container ---
+# Slim replacement for the DataFrame the strategies only use as a bag of columns.
+# Every column is one contiguous array (timestamp int64, prices float64), slicing returns
+# views, and indicator columns live next to the candles under their own names. pandas
+# is only touched for pandas_ta (series()) and reporting (to_pandas()), both zero-copy.
+
+CORE_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+def _float_column(values, n):
+    if values is None:
+        return np.full(n, np.nan)
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+class Candles:
+    __slots__ = ('timestamp', 'open', 'high', 'low', 'close', 'volume', 'columns')
+
+    def __init__(self, timestamp, open=None, high=None, low=None, close=None, volume=None, columns=None):
+        self.timestamp = np.ascontiguousarray(timestamp, dtype=np.int64)
+        n = len(self.timestamp)
+        self.open = _float_column(open, n)
+        self.high = _float_column(high, n)
+        self.low = _float_column(low, n)
+        self.close = _float_column(close, n)
+        self.volume = _float_column(volume, n)
+        self.columns = {name: _float_column(values, n) for name, values in (columns or {}).items()}
+
+    # --- Construction ---
+    @classmethod
+    def from_arrays(cls, arrays):
+        """From a market_data {column: array} dict (no copy)."""
+        return cls(**{col: arrays[col] for col in CORE_COLUMNS if col in arrays})
+
+    @classmethod
+    def from_pandas(cls, df):
+        """From a candles DataFrame; columns it lacks (e.g. open/volume) are NaN."""
+        core = {col: df[col].to_numpy() for col in CORE_COLUMNS if col in df.columns}
+        return cls(**core)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=np.int64))
+
+    # --- Access ---
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __contains__(self, name):
+        return name in CORE_COLUMNS or name in self.columns
+
+    def __getitem__(self, key):
+        """candles['close'] -> array, candles[a:b] -> Candles of views."""
+        if isinstance(key, str):
+            return getattr(self, key) if key in CORE_COLUMNS else self.columns[key]
+        if isinstance(key, slice):
+            return Candles(self.timestamp[key], self.open[key], self.high[key], self.low[key],
+                           self.close[key], self.volume[key],
+                           {name: values[key] for name, values in self.columns.items()})
+        raise TypeError(f"Candles index must be a column name or a slice, not {type(key).__name__}")
+
+    def with_columns(self, **columns):
+        """New container sharing all arrays, plus the given indicator columns."""
+        out = self[:]
+        for name, values in columns.items():
+            out.columns[name] = _float_column(values, len(out))
+        return out
+
+    def take(self, idx):
+        return Candles(self.timestamp[idx], self.open[idx], self.high[idx], self.low[idx],
+                       self.close[idx], self.volume[idx],
+                       {name: values[idx] for name, values in self.columns.items()})
+
+    def dropna(self, names=None):
+        """
+        Drops rows where any of `names` (default: all indicator columns) is NaN.
+        The usual warmup-only case is a slice (views); gaps in the middle fall back to a copy.
+        """
+        names = list(self.columns) if names is None else names
+        valid = np.ones(len(self), dtype=bool)
+        for name in names:
+            valid &= ~np.isnan(self[name])
+        if valid.all():
+            return self
+        first = int(np.argmax(valid)) if valid.any() else len(self)
+        if valid[first:].all():
+            return self[first:]
+        return self.take(np.flatnonzero(valid))
+
+    # --- pandas Bridge ---
+    def series(self, name):
+        """Column as a pandas Series over the same memory (for pandas_ta)."""
+        import pandas as pd
+        return pd.Series(self[name], copy=False)
+
+    def to_pandas(self):
+        """DataFrame over the same arrays (no copy), for reporting."""
+        import pandas as pd
+        data = {col: getattr(self, col) for col in CORE_COLUMNS}
+        data.update(self.columns)
+        return pd.DataFrame(data, copy=False)
@@ -0,0 +1,161 @@
+import math
+import numpy as np
+
+from market_data import INTERVAL_MS
+
+# --- Multi-Resolution Chart Series ---
+# Closed 1h candles are folded into OHLC buckets at every LEVELS size as they arrive.
+# Each level keeps at most LEVEL_CAP buckets (the coarsest keeps everything), so state
+# and view cost stay bounded no matter how much history the DB holds. A zoom view picks
+# the finest level that covers its span, then thins it to POINT_BUDGET points:
+# OHLC by merging neighbouring buckets, the line series with LTTB.
+
+SOURCE_INTERVAL = '1h'
+POINT_BUDGET = 200
+LEVELS = [INTERVAL_MS['1h'], INTERVAL_MS['4h'], INTERVAL_MS['1d'], 7 * INTERVAL_MS['1d']]
+LEVEL_CAP = 4 * POINT_BUDGET
+ZOOMS = {
+    'day': INTERVAL_MS['1d'],
+    'week': 7 * INTERVAL_MS['1d'],
+    'month': 30 * INTERVAL_MS['1d'],
+    'all': None
+}
+FIELDS = ('t', 'o', 'h', 'l', 'c', 'v')
+
+def new_level():
+    level = {f: [] for f in FIELDS}
+    level['truncated'] = False
+    return level
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: keeps first and last point and, per bucket, the
+    point forming the largest triangle with the previous pick and the next bucket's mean.
+    Returns the selected indices.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (threshold - 2)
+
+    idx = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(math.floor(i * every)) + 1
+        end = int(math.floor((i + 1) * every)) + 1
+        next_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        idx.append(a)
+    idx.append(n - 1)
+    return np.array(idx)
+
+def merge_buckets(t, o, h, l, c, size, budget):
+    """Merges neighbouring buckets on a k*size grid until at most `budget` remain."""
+    if len(t) <= budget:
+        return t, o, h, l, c
+    k = math.ceil(len(t) / budget)
+    groups = t // (size * k)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    ends = np.r_[starts[1:], len(t)] - 1
+    return (t[starts], o[starts], np.maximum.reduceat(h, starts),
+            np.minimum.reduceat(l, starts), c[ends])
+
+class ChartSeries:
+    """OHLC aggregates of one coin at every LEVELS size, plus the still-forming candle."""
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.closed_ts = state.get('closed_ts')  # Newest candle already folded in
+        self.forming = state.get('forming')      # [t, o, h, l, c, v] of the forming candle
+        self.levels = state.get('levels') or [new_level() for _ in LEVELS]
+
+    def to_state(self):
+        return {'closed_ts': self.closed_ts, 'forming': self.forming, 'levels': self.levels}
+
+    def add_closed(self, t, o, h, l, c, v):
+        for size, level in zip(LEVELS, self.levels):
+            bucket = t - t % size
+            if level['t'] and level['t'][-1] == bucket:
+                level['h'][-1] = max(level['h'][-1], h)
+                level['l'][-1] = min(level['l'][-1], l)
+                level['c'][-1] = c
+                level['v'][-1] += v
+                continue
+            for f, value in zip(FIELDS, (bucket, o, h, l, c, v)):
+                level[f].append(value)
+            if size != LEVELS[-1] and len(level['t']) > LEVEL_CAP:
+                for f in FIELDS:
+                    del level[f][0]
+                level['truncated'] = True
+        self.closed_ts = t
+
+    def update(self, arrays, now_ms):
+        """
+        Feeds candles ({column: array}, ascending). Closed ones newer than closed_ts are
+        folded in once; the forming candle is only kept aside and merged at view time.
+        """
+        step = INTERVAL_MS[SOURCE_INTERVAL]
+        ts = arrays['timestamp']
+        for i in range(len(ts)):
+            t = int(ts[i])
+            row = [t] + [float(arrays[col][i]) for col in ('open', 'high', 'low', 'close', 'volume')]
+            if t + step > now_ms:
+                self.forming = row
+            elif self.closed_ts is None or t > self.closed_ts:
+                self.add_closed(*row)
+        if self.forming is not None and self.closed_ts is not None and self.forming[0] <= self.closed_ts:
+            self.forming = None
+
+    def newest_ts(self):
+        return self.forming[0] if self.forming else self.closed_ts
+
+    def pick_level(self, span):
+        for k, size in enumerate(LEVELS):
+            if span is None:
+                if not self.levels[k]['truncated']:
+                    return k
+            elif span / size <= LEVEL_CAP:
+                return k
+        return len(LEVELS) - 1
+
+    def level_arrays(self, k, since):
+        """Level k from `since` on as arrays, with the forming candle merged into its bucket."""
+        level = self.levels[k]
+        size = LEVELS[k]
+        start = np.searchsorted(level['t'], since) if since is not None else 0
+        t, o, h, l, c = (np.array(level[f][start:], dtype=float) for f in ('t', 'o', 'h', 'l', 'c'))
+        if self.forming:
+            ft, fo, fh, fl, fc, _ = self.forming
+            bucket = ft - ft % size
+            if len(t) and t[-1] == bucket:
+                h[-1] = max(h[-1], fh)
+                l[-1] = min(l[-1], fl)
+                c[-1] = fc
+            else:
+                t, o, h, l, c = (np.append(a, value) for a, value in zip((t, o, h, l, c), (bucket, fo, fh, fl, fc)))
+        return t.astype(np.int64), o, h, l, c
+
+    def view(self, zoom, budget=POINT_BUDGET):
+        """{'ohlc': {t, o, h, l, c}, 'line': {t, v}} for one zoom level, at most `budget` points each."""
+        newest = self.newest_ts()
+        if newest is None:
+            return {'ohlc': {f: [] for f in ('t', 'o', 'h', 'l', 'c')}, 'line': {'t': [], 'v': []}}
+        span = ZOOMS[zoom]
+        k = self.pick_level(span)
+        since = newest - span if span is not None else None
+        t, o, h, l, c = self.level_arrays(k, since)
+
+        idx = lttb(t, c, budget)
+        mt, mo, mh, ml, mc = merge_buckets(t, o, h, l, c, LEVELS[k], budget)
+        return {
+            'ohlc': {'t': mt.tolist(), 'o': mo.tolist(), 'h': mh.tolist(), 'l': ml.tolist(), 'c': mc.tolist()},
+            'line': {'t': t[idx].tolist(), 'v': c[idx].tolist()}
+        }
+
+    def views(self, budget=POINT_BUDGET):
+        return {zoom: self.view(zoom, budget) for zoom in ZOOMS}
@@ -0,0 +1,281 @@
+import os
+import sqlite3
+import sys
+import time
+import numpy as np
+
+from market_data import INTERVAL_MS, list_series, load_latest_rows, load_range_batch
+
+# --- Rolling Cross-Asset Correlation ---
+# Correlation and beta of log returns between every pair of coins over the last
+# CORR_WINDOW candles of CORR_INTERVAL. Per pair the engine keeps the number of returns
+# both coins have plus the sums sx, sxx, sxy over them, so a new candle (and the one
+# leaving the window) is a few N x N outer products instead of a full recompute; coins
+# with gaps or a later listing simply contribute fewer common returns. Every
+# CORR_RESYNC candles the sums are rebuilt from the ring buffer to shed float drift.
+# State persists in CORR_STATE_PATH (the pipeline stage 'correlation' extends it with
+# the candles closed since); the scanner and the dashboard read the matrices from there.
+
+DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
+CORR_STATE_PATH = "/home/manni/.openclaw/workspace/trading/data/correlation_state.npz"
+CORR_INTERVAL = '1h'
+CORR_WINDOW = 720             # 30 days of 1h returns
+CORR_MIN_OBS = 48             # Pairs with fewer common returns report NaN
+CORR_RESYNC = CORR_WINDOW
+CORR_BENCHMARK = 'BTC'
+# Rows are only committed up to the newest candle of every series that is at most this
+# far behind the freshest one (lower universe tiers refresh every few hours); series
+# lagging further count as missing for those rows
+CORR_MAX_LAG_MS = 6 * 60 * 60 * 1000
+# Scanner: of same-direction alerts on the same interval and candle, a coin correlated
+# at least this much with an already kept coin is suppressed
+SUPPRESS_CORR = 0.8
+
+class RollingCorrelation:
+    def __init__(self, symbols=(), interval=CORR_INTERVAL, window=CORR_WINDOW):
+        self.interval = interval
+        self.step = INTERVAL_MS[interval]
+        self.window = window
+        self.symbols = []
+        self.index = {}
+        self.returns = np.zeros((window, 0))  # Ring buffer, NaN = no return
+        self.pos = 0                          # Next ring slot
+        self.last_close = np.zeros(0)
+        self.last_ts = None                   # Open time of the newest candle fed
+        self.updates = 0
+        self.n = self.sx = self.sxx = self.sxy = np.zeros((0, 0))
+        self.add_symbols(symbols)
+
+    def add_symbols(self, symbols):
+        """Appends new coins with an empty history."""
+        new = [s for s in symbols if s not in self.index]
+        if not new:
+            return
+        k = len(new)
+        self.symbols += new
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.returns = np.hstack([self.returns, np.full((self.window, k), np.nan)])
+        self.last_close = np.r_[self.last_close, np.full(k, np.nan)]
+        for name in ('n', 'sx', 'sxx', 'sxy'):
+            setattr(self, name, np.pad(getattr(self, name), ((0, k), (0, k))))
+
+    # --- Updates ---
+    def accumulate(self, r, sign):
+        """Adds (sign=1) or removes (sign=-1) one row of returns, over the coins that have one."""
+        m = ~np.isnan(r)
+        if not m.any():
+            return
+        # Dense outer products with the missing coins zeroed (faster than indexing the sub-block)
+        mf = m * float(sign)
+        x = np.where(m, r, 0.0)
+        self.n += np.outer(m, mf)
+        self.sx += np.outer(x, mf)
+        self.sxx += np.outer(x * x, mf)
+        self.sxy += sign * np.outer(x, x)
+
+    def push(self, r):
+        self.accumulate(self.returns[self.pos], -1)
+        self.returns[self.pos] = r
+        self.accumulate(r, 1)
+        self.pos = (self.pos + 1) % self.window
+        self.updates += 1
+        if self.updates % CORR_RESYNC == 0:
+            self.recompute()
+
+    def recompute(self):
+        """Sums from scratch over the ring buffer (O(window * N^2), one matmul each)."""
+        m = (~np.isnan(self.returns)).astype(np.float64)
+        x = np.nan_to_num(self.returns)
+        self.n = m.T @ m
+        self.sx = x.T @ m
+        self.sxx = (x * x).T @ m
+        self.sxy = x.T @ x
+
+    def extend(self, timestamps, closes):
+        """
+        Feeds closed candles: ascending open times after last_ts and a
+        (len(timestamps), len(symbols)) array of closes, NaN where a coin has none.
+        Missing steps become empty rows. Returns the number of rows pushed.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if not len(timestamps):
+            return 0
+        start = int(timestamps[0]) if self.last_ts is None else self.last_ts + self.step
+        grid = np.full(((int(timestamps[-1]) - start) // self.step + 1, len(self.symbols)), np.nan)
+        grid[(timestamps - start) // self.step] = closes
+        prev = np.vstack([self.last_close[None, :], grid[:-1]])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = np.log(grid / prev)
+        returns[~np.isfinite(returns)] = np.nan
+        self.last_close = grid[-1]
+        self.last_ts = start + (len(grid) - 1) * self.step
+
+        if len(returns) >= self.window // 4:
+            # Long catch-up: lay the rows into the buffer and rebuild once
+            ordered = np.roll(self.returns, -self.pos, axis=0)
+            self.returns = np.vstack([ordered, returns])[-self.window:]
+            self.pos = 0
+            self.updates += len(returns)
+            self.recompute()
+        else:
+            for r in returns:
+                self.push(r)
+        return len(returns)
+
+    # --- Results ---
+    def matrices(self, min_obs=CORR_MIN_OBS):
+        """
+        (corr, beta) over the returns each pair has in common. beta[i, j] = cov(i, j) / var(j):
+        i's move per unit move of j (row = coin, column = benchmark).
+        """
+        n = self.n
+        cov = n * self.sxy - self.sx * self.sx.T
+        var = n * self.sxx - self.sx ** 2  # var[i, j]: i's, over the pair's common returns
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = np.clip(cov / np.sqrt(var * var.T), -1.0, 1.0)
+            beta = cov / var.T
+        bad = (n < min_obs) | (var <= 0) | (var.T <= 0)
+        corr[bad] = np.nan
+        beta[bad] = np.nan
+        return corr, beta
+
+    # --- State ---
+    def save(self, path=CORR_STATE_PATH):
+        corr, beta = self.matrices()
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, symbols=np.array(self.symbols, dtype=str), interval=np.array(self.interval),
+                     counters=np.array([self.window, self.pos, self.updates, -1 if self.last_ts is None else self.last_ts]),
+                     returns=self.returns, last_close=self.last_close,
+                     n=self.n, sx=self.sx, sxx=self.sxx, sxy=self.sxy, corr=corr, beta=beta)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=CORR_STATE_PATH):
+        with np.load(path) as data:
+            window, pos, updates, last_ts = (int(v) for v in data['counters'])
+            engine = cls(interval=str(data['interval']), window=window)
+            engine.symbols = [str(s) for s in data['symbols']]
+            engine.index = {s: i for i, s in enumerate(engine.symbols)}
+            engine.pos, engine.updates = pos, updates
+            engine.last_ts = None if last_ts < 0 else last_ts
+            for name in ('returns', 'last_close', 'n', 'sx', 'sxx', 'sxy'):
+                setattr(engine, name, data[name])
+        return engine
+
+def load_matrix(path=CORR_STATE_PATH):
+    """{'symbols', 'corr', 'beta', 'last_ts'} as of the last update (reads only those arrays), None without state."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        last_ts = int(data['counters'][3])
+        return {'symbols': [str(s) for s in data['symbols']], 'corr': data['corr'], 'beta': data['beta'],
+                'last_ts': None if last_ts < 0 else last_ts}
+
+# --- Feed ---
+def catch_up(conn, engine, now_ms=None):
+    """Feeds every candle closed since the engine's last row, up to the commit horizon. Returns rows pushed."""
+    now_ms = now_ms or int(time.time() * 1000)
+    step = engine.step
+    pairs = [p for p in list_series(conn) if p[1] == engine.interval]
+    engine.add_symbols(sorted(s for s, _ in pairs))
+
+    # Newest closed candle per series (the stored newest may still be forming)
+    last_closed = now_ms - now_ms % step - step
+    newest = {s: min(ts, last_closed) for (s, _), (ts, _) in load_latest_rows(conn, pairs).items()}
+    if not newest:
+        return 0
+    top = max(newest.values())
+    horizon = min(ts for ts in newest.values() if top - ts <= CORR_MAX_LAG_MS)
+
+    start = engine.last_ts if engine.last_ts is not None else horizon - (engine.window + 1) * step
+    if horizon <= start:
+        return 0
+    batch = load_range_batch(conn, engine.symbols, engine.interval, start, horizon + 1)
+    if not batch:
+        return 0
+    timestamps = np.unique(np.concatenate([arrays['timestamp'] for arrays in batch.values()]))
+    closes = np.full((len(timestamps), len(engine.symbols)), np.nan)
+    for (symbol, _), arrays in batch.items():
+        closes[np.searchsorted(timestamps, arrays['timestamp']), engine.index[symbol]] = arrays['close']
+    return engine.extend(timestamps, closes)
+
+def update_correlation(db_path=DB_PATH, state_path=CORR_STATE_PATH):
+    """Pipeline stage: loads the engine (or bootstraps it from the last window), extends it, saves it."""
+    t0 = time.perf_counter()
+    engine = RollingCorrelation.load(state_path) if os.path.exists(state_path) else RollingCorrelation()
+    conn = sqlite3.connect(db_path, timeout=30)
+    rows = catch_up(conn, engine)
+    conn.close()
+    if rows:
+        engine.save(state_path)
+    print(f"Correlation: {len(engine.symbols)} coins, {rows} new {engine.interval} rows "
+          f"in {(time.perf_counter() - t0) * 1000:.1f} ms", flush=True)
+    return engine
+
+# --- Consumers ---
+def suppress_correlated(alerts, matrix, threshold=SUPPRESS_CORR):
+    """
+    Drops alerts that repeat an earlier kept alert (same interval, candle and direction)
+    on another coin correlated at least `threshold` with it; the kept alert lists them
+    under 'correlated'. Alerts come in scan order, so the watchlist's leaders win.
+    Returns (kept, suppressed).
+    """
+    if matrix is None:
+        return alerts, []
+    index = {s: i for i, s in enumerate(matrix['symbols'])}
+    corr = matrix['corr']
+    kept = []
+    suppressed = []
+    for alert in alerts:
+        i = index.get(alert['symbol'])
+        side = alert['type'].split()[0]
+        leader = None
+        for k in kept:
+            j = index.get(k['symbol'])
+            if (i is not None and j is not None and i != j and k['interval'] == alert['interval']
+                    and k['candle_ts'] == alert['candle_ts'] and k['type'].split()[0] == side
+                    and corr[i, j] >= threshold):
+                leader = k
+                break
+        if leader is None:
+            kept.append(alert)
+        else:
+            leader.setdefault('correlated', []).append(alert['symbol'])
+            suppressed.append(alert)
+    return kept, suppressed
+
+def build_correlation(matrix, symbols, benchmark=CORR_BENCHMARK):
+    """Dashboard shard: the sub-matrix of `symbols` (rounded, None = too little data) plus beta to the benchmark."""
+    if matrix is None:
+        return {}
+    index = {s: i for i, s in enumerate(matrix['symbols'])}
+    symbols = [s for s in symbols if s in index]
+    idx = [index[s] for s in symbols]
+
+    def rounded(values):
+        return [None if np.isnan(v) else round(float(v), 3) for v in values]
+
+    b = index.get(benchmark)
+    return {
+        'interval': CORR_INTERVAL,
+        'window': CORR_WINDOW,
+        'updated': matrix['last_ts'],
+        'benchmark': benchmark,
+        'symbols': symbols,
+        'corr': [rounded(matrix['corr'][i, idx]) for i in idx],
+        'beta': rounded([matrix['beta'][i, b] for i in idx]) if b is not None else [],
+    }
+
+if __name__ == "__main__":
+    # Usage: correlation.py [--rebuild] [db_path]   (--rebuild drops the saved state first)
+    args = sys.argv[1:]
+    if '--rebuild' in args and os.path.exists(CORR_STATE_PATH):
+        os.remove(CORR_STATE_PATH)
+    paths = [a for a in args if not a.startswith('--')]
+    engine = update_correlation(paths[0] if paths else DB_PATH)
+    corr, beta = engine.matrices()
+    b = engine.index.get(CORR_BENCHMARK)
+    if b is not None:
+        for s, i in sorted(engine.index.items(), key=lambda x: -np.nan_to_num(corr[x[1], b])):
+            print(f"  {s:<10} corr {corr[i, b]:6.2f}  beta {beta[i, b]:6.2f}  ({int(engine.n[i, b])} common returns)")
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+# --- Load Test for api_server.py ---
+# Starts the API server on its own port, connects many SSE clients plus pollers that
+# revalidate sections with If-None-Match, and bumps the latest candle in the DB so the
+# server pushes deltas. Reports request latency, push latency and server CPU time.
+# The bump writes, so the test runs on a copy of the DB in a temp dir (db_path is only read).
+# Usage: api_loadtest.py [db_path] [sse_clients] [pollers] [seconds]
+
+DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
+HOST = "127.0.0.1"
+PORT = 8091
+SSE_CLIENTS = 200
+POLLERS = 50
+DURATION = 20
+BUMP_SECONDS = 1.0   # How often the latest candle is updated
+SECTIONS = ['manifest', 'prices', 'signals', 'charts/BTC']
+
+def copy_db(db_path, tmp):
+    """Consistent copy of db_path (online backup, safe while sync writes) into tmp."""
+    copy = os.path.join(tmp, "loadtest.db")
+    src = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+    dst = sqlite3.connect(copy)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    return copy
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def cpu_seconds(pid):
+    """utime + stime of a process from /proc (Linux)."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+async def http_get(path, headers=None):
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    head = f"GET {path} HTTP/1.1\r\nHost: {HOST}\r\nAccept-Encoding: gzip\r\n"
+    for k, v in (headers or {}).items():
+        head += f"{k}: {v}\r\n"
+    writer.write((head + "\r\n").encode())
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    status_line, _, rest = raw.partition(b"\r\n")
+    header_block = rest.split(b"\r\n\r\n", 1)[0].decode('latin-1')
+    response_headers = {}
+    for line in header_block.split("\r\n"):
+        key, _, value = line.partition(':')
+        response_headers[key.strip().lower()] = value.strip()
+    return int(status_line.split()[1]), response_headers
+
+async def poller(stop, latencies, counts):
+    etags = {}
+    i = 0
+    while not stop.is_set():
+        section = SECTIONS[i % len(SECTIONS)]
+        i += 1
+        headers = {'If-None-Match': etags[section]} if section in etags else {}
+        t0 = time.perf_counter()
+        status, response_headers = await http_get(f"/api/{section}", headers)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        counts[status] = counts.get(status, 0) + 1
+        if 'etag' in response_headers:
+            etags[section] = response_headers['etag']
+
+async def sse_client(stop, push_latencies, counts):
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    writer.write(f"GET /api/events HTTP/1.1\r\nHost: {HOST}\r\n\r\n".encode())
+    await writer.drain()
+    try:
+        while not stop.is_set():
+            try:
+                line = await asyncio.wait_for(reader.readline(), 0.5)
+            except asyncio.TimeoutError:
+                continue
+            if not line:
+                break
+            if line.startswith(b"data:"):
+                event = json.loads(line[5:])
+                push_latencies.append(time.time() * 1000 - event['ts'])
+                counts['events'] = counts.get('events', 0) + 1
+    finally:
+        writer.close()
+
+async def bump_candles(stop, db_path):
+    """Nudges the close of the newest 1h BTC candle, like sync updating the forming candle."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    while not stop.is_set():
+        with conn:
+            conn.execute('''
+                UPDATE candles SET close = close * 1.0001 WHERE rowid = (
+                    SELECT rowid FROM candles WHERE symbol = 'BTC' AND interval = '1h'
+                    ORDER BY timestamp DESC LIMIT 1)
+            ''')
+        await asyncio.sleep(BUMP_SECONDS)
+    conn.close()
+
+async def run_load(db_path, n_sse, n_pollers, duration):
+    stop = asyncio.Event()
+    latencies, push_latencies, counts, push_counts = [], [], {}, {}
+
+    sse = [asyncio.create_task(sse_client(stop, push_latencies, push_counts)) for _ in range(n_sse)]
+    await asyncio.sleep(0.5)
+    tasks = [asyncio.create_task(poller(stop, latencies, counts)) for _ in range(n_pollers)]
+    tasks.append(asyncio.create_task(bump_candles(stop, db_path)))
+
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks, *sse, return_exceptions=True)
+    return latencies, push_latencies, counts, push_counts
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DB_PATH
+    n_sse = int(sys.argv[2]) if len(sys.argv) > 2 else SSE_CLIENTS
+    n_pollers = int(sys.argv[3]) if len(sys.argv) > 3 else POLLERS
+    duration = float(sys.argv[4]) if len(sys.argv) > 4 else DURATION
+
+    tmp = tempfile.mkdtemp(prefix="api_loadtest_")
+    try:
+        db_path = copy_db(db_path, tmp)
+        run_test(db_path, n_sse, n_pollers, duration)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def run_test(db_path, n_sse, n_pollers, duration):
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_server.py"),
+                               str(PORT), db_path], stdout=subprocess.PIPE, text=True)
+    try:
+        print(server.stdout.readline().strip(), flush=True)
+        cpu0 = cpu_seconds(server.pid)
+        t0 = time.perf_counter()
+        latencies, push_latencies, counts, push_counts = asyncio.run(run_load(db_path, n_sse, n_pollers, duration))
+        wall = time.perf_counter() - t0
+        cpu = cpu_seconds(server.pid) - cpu0
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"\n{n_sse} SSE clients, {n_pollers} pollers, {wall:.1f}s")
+    print(f"Requests: {len(latencies)} ({len(latencies) / wall:.0f}/s), status {counts}")
+    print(f"  latency ms  p50 {percentile(latencies, 0.5):.2f}  p95 {percentile(latencies, 0.95):.2f}  p99 {percentile(latencies, 0.99):.2f}")
+    print(f"Pushed events received: {push_counts.get('events', 0)}")
+    print(f"  push ms     p50 {percentile(push_latencies, 0.5):.2f}  p95 {percentile(push_latencies, 0.95):.2f}  p99 {percentile(push_latencies, 0.99):.2f}")
+    print(f"Server CPU: {cpu:.2f}s ({cpu / wall * 100:.1f}% of one core)")
+
+if __name__ == "__main__":
+    main()
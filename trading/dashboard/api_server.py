@@ -0,0 +1,288 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import data_exporter as exporter
+from data_exporter import (SIGNAL_LOOKBACK_DAYS, dump_compact, load_latest_closes, source_keys,
+                           build_prices, load_charts, build_chart, build_signals, build_strategies,
+                           build_correlations, update_series, build_series)
+
+# --- Configuration ---
+# Local dashboard API: keeps the current snapshot in memory, serves each section as
+# JSON with ETag + gzip, and pushes deltas to browsers over server-sent events.
+#   GET /api/manifest          -> section list with ETags (+ db_size / last_sync)
+#   GET /api/<section>         -> prices | signals | strategies | correlation | charts/<COIN> | series/<COIN>
+#   GET /api/events            -> SSE stream: candle, signal, trade_closed, section
+#   GET /<file>                -> static dashboard files (index.html, script.js, ...)
+HOST = "127.0.0.1"
+PORT = 8080
+REFRESH_SECONDS = 2.0      # How often the DB is checked for new data
+HEARTBEAT_SECONDS = 15.0   # SSE keep-alive comment
+CLIENT_QUEUE_SIZE = 256    # Slow SSE clients are dropped when their queue is full
+GZIP_MIN_BYTES = 512
+
+def now_ms():
+    return int(time.time() * 1000)
+
+class Section:
+    __slots__ = ('body', 'gz', 'etag')
+
+    def __init__(self, content):
+        self.body = dump_compact(content)
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:16] + '"'
+        self.gz = gzip.compress(self.body, 6) if len(self.body) >= GZIP_MIN_BYTES else None
+
+class Snapshot:
+    """
+    In-memory copy of everything the dashboard shows. refresh() runs in a worker thread,
+    rebuilds only sections whose source key changed and returns the delta events.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = None
+        self.sections = {}
+        self.keys = {}
+        self.latest = {}
+        self.series = {}     # coin -> ChartSeries, kept in memory and extended incrementally
+        self.max_signal_id = None
+        self.active_ids = None  # ACTIVE signal ids in the lookback window at the last refresh
+        self.meta = {}
+
+    def _connect(self):
+        if self.conn is None:
+            # Only ever used from the single refresh thread
+            self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            exporter.init_signal_store(self.conn)
+        return self.conn
+
+    def refresh(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        since_ms = int((time.time() - SIGNAL_LOOKBACK_DAYS * 86400) * 1000)
+        events = []
+
+        latest = load_latest_closes(conn)
+        keys = source_keys(cursor, latest, since_ms)
+
+        # New candle / price update per coin
+        for coin, value in latest.items():
+            if self.latest and self.latest.get(coin) != value:
+                events.append(('candle', {'symbol': coin, 'timestamp': value[0], 'close': value[1]}))
+
+        # New signals and closed trades since the last refresh
+        if keys.get('signals') != self.keys.get('signals'):
+            max_id = keys['signals'][0]
+            if self.max_signal_id is not None:
+                for row in cursor.execute('''
+                    SELECT id, timestamp, symbol, interval, strategy, signal, entry_price, sl_price, tp_price
+                    FROM signals WHERE id > ? ORDER BY id
+                ''', (self.max_signal_id,)):
+                    events.append(('signal', dict(zip(('id', 'date', 'symbol', 'interval', 'strategy', 'signal', 'entry', 'sl', 'tp'), row))))
+                # Closed since the last refresh: ACTIVE then (or new since then) and not ACTIVE now.
+                # By id, so a close is pushed whatever its closed_ts is.
+                ids = sorted(self.active_ids)
+                for row in cursor.execute(f'''
+                    SELECT id, symbol, signal, status, profit_loss, exit_price, closed_ts
+                    FROM signals WHERE status != 'ACTIVE' AND (id > ? OR id IN ({','.join('?' * len(ids))}))
+                    ORDER BY closed_ts, id
+                ''', [self.max_signal_id] + ids):
+                    events.append(('trade_closed', dict(zip(('id', 'symbol', 'signal', 'status', 'profit_loss', 'exit', 'closed_ts'), row))))
+            self.max_signal_id = max_id or 0
+            self.active_ids = {r[0] for r in cursor.execute(
+                "SELECT id FROM signals WHERE status = 'ACTIVE' AND candle_ts >= ?", (since_ms,))}
+
+        # Rebuild only the sections whose inputs changed
+        stale = [name for name in keys if keys[name] != self.keys.get(name) or name not in self.sections]
+        chart_coins = [name.split('/')[1] for name in stale if name.startswith('charts/')]
+        chart_data = load_charts(conn, chart_coins, latest)
+        update_series(conn, [name.split('/')[1] for name in stale if name.startswith('series/')], self.series)
+        for name in stale:
+            if name == 'prices': content = build_prices(latest)
+            elif name == 'signals': content = build_signals(conn, since_ms)
+            elif name == 'strategies': content = build_strategies()
+            elif name == 'correlation': content = build_correlations()
+            elif name.startswith('series/'): content = build_series(self.series[name.split('/')[1]])
+            else: content = build_chart(chart_data.get(name.split('/')[1]))
+
+            section = Section(content)
+            old = self.sections.get(name)
+            self.sections[name] = section
+            if old is None or old.etag != section.etag:
+                events.append(('section', {'name': name, 'etag': section.etag.strip('"')}))
+
+        raw_sync = max((v[0] for v in latest.values()), default=None)
+        self.meta = {
+            'db_size': f"{os.path.getsize(self.db_path) / (1024 * 1024):.2f} MB",
+            'last_sync': datetime.fromtimestamp(raw_sync / 1000).strftime('%Y-%m-%d %H:%M') if raw_sync else None
+        }
+        if stale or 'manifest' not in self.sections:
+            self.sections['manifest'] = Section({
+                **self.meta,
+                'shards': {name: {'path': name, 'etag': s.etag.strip('"')}
+                           for name, s in self.sections.items() if name != 'manifest'}
+            })
+
+        self.latest = latest
+        self.keys = keys
+        return events
+
+class ApiServer:
+    def __init__(self, db_path, host=HOST, port=PORT, static_dir=exporter.DASH_DIR):
+        self.snapshot = Snapshot(db_path)
+        self.host = host
+        self.port = port
+        self.static_dir = os.path.realpath(static_dir)
+        self.clients = {}    # SSE queue -> writer
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.stats = {'requests': 0, 'not_modified': 0, 'events': 0, 'dropped_clients': 0}
+
+    # --- Push ---
+    def broadcast(self, kind, data):
+        data['ts'] = now_ms() # Server send time, lets clients measure push latency
+        message = f"event: {kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+        self.stats['events'] += 1
+        for queue, writer in list(self.clients.items()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Client can't keep up, cut it off (EventSource reconnects and refetches)
+                del self.clients[queue]
+                writer.transport.abort()
+                self.stats['dropped_clients'] += 1
+
+    async def refresh_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                events = await loop.run_in_executor(self.executor, self.snapshot.refresh)
+                for kind, data in events:
+                    self.broadcast(kind, data)
+            except Exception as e:
+                print(f"Refresh failed: {e}", flush=True)
+            await asyncio.sleep(REFRESH_SECONDS)
+
+    async def heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            for queue in list(self.clients):
+                if not queue.full():
+                    queue.put_nowait(b": ping\n\n")
+
+    # --- HTTP ---
+    async def handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            parts = request_line.decode('latin-1').split()
+            if len(parts) < 2:
+                return
+            method, target = parts[0], parts[1]
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                key, _, value = line.decode('latin-1').partition(':')
+                headers[key.strip().lower()] = value.strip()
+
+            self.stats['requests'] += 1
+            path = target.split('?')[0]
+            if method != 'GET':
+                await self.respond(writer, 405, b'Method Not Allowed')
+            elif path == '/api/events':
+                await self.serve_events(writer)
+            elif path.startswith('/api/'):
+                await self.serve_section(writer, path[len('/api/'):], headers)
+            else:
+                await self.serve_static(writer, path)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def respond(self, writer, status, body, content_type='text/plain', extra=None):
+        reasons = {200: 'OK', 304: 'Not Modified', 404: 'Not Found', 405: 'Method Not Allowed'}
+        head = [f"HTTP/1.1 {status} {reasons.get(status, 'OK')}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(body)}",
+                "Connection: close"]
+        for k, v in (extra or {}).items():
+            head.append(f"{k}: {v}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    async def serve_section(self, writer, name, headers):
+        section = self.snapshot.sections.get(name)
+        if section is None:
+            await self.respond(writer, 404, b'Unknown section')
+            return
+        extra = {'ETag': section.etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if headers.get('if-none-match') == section.etag:
+            self.stats['not_modified'] += 1
+            await self.respond(writer, 304, b'', 'application/json', extra)
+            return
+        body = section.body
+        if section.gz is not None and 'gzip' in headers.get('accept-encoding', ''):
+            body = section.gz
+            extra['Content-Encoding'] = 'gzip'
+        await self.respond(writer, 200, body, 'application/json', extra)
+
+    async def serve_static(self, writer, path):
+        if path == '/':
+            path = '/index.html'
+        full = os.path.realpath(os.path.join(self.static_dir, path.lstrip('/')))
+        if not full.startswith(self.static_dir + os.sep) or not os.path.isfile(full):
+            await self.respond(writer, 404, b'Not Found')
+            return
+        with open(full, 'rb') as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(full)[0] or 'application/octet-stream'
+        await self.respond(writer, 200, body, content_type, {'Cache-Control': 'no-cache'})
+
+    async def serve_events(self, writer):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n"
+                     b"retry: 3000\n\n")
+        await writer.drain()
+        queue = asyncio.Queue(CLIENT_QUEUE_SIZE)
+        self.clients[queue] = writer
+        try:
+            while True:
+                writer.write(await queue.get())
+                await writer.drain()
+        finally:
+            self.clients.pop(queue, None)
+
+    async def run(self):
+        # First snapshot before accepting clients
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.snapshot.refresh)
+        server = await asyncio.start_server(self.handle, self.host, self.port, backlog=1024)
+        print(f"Dashboard API on http://{self.host}:{self.port} ({len(self.snapshot.sections)} sections)", flush=True)
+        asyncio.create_task(self.refresh_loop())
+        asyncio.create_task(self.heartbeat_loop())
+        async with server:
+            await server.serve_forever()
+
+if __name__ == "__main__":
+    # Usage: api_server.py [port] [db_path]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    db_path = sys.argv[2] if len(sys.argv) > 2 else exporter.DB_PATH
+    try:
+        asyncio.run(ApiServer(db_path, port=port).run())
+    except KeyboardInterrupt:
+        print("API server stopped.")
@@ -1,110 +1,206 @@
 import sqlite3
 import json
 import os
+import sys
+import time
+import hashlib
 from datetime import datetime
 
+# Shared modules live one level up in trading/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from signal_store import init_signal_store, load_recent_events
+from market_data import load_latest_batch, load_range_batch, INTERVAL_MS
+from chart_series import ChartSeries, SOURCE_INTERVAL
+from correlation import CORR_STATE_PATH, load_matrix, build_correlation
+
 DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
 DASH_DIR = "/home/manni/.openclaw/workspace/trading/dashboard"
 JSON_PATH = os.path.join(DASH_DIR, "data.json")
 SIGNALS_PATH = os.path.join(DASH_DIR, "signals.json")
 MACD_PATH = os.path.join(DASH_DIR, "macd_results.json")
 
+# Sharded output: one file per section / coin plus a manifest with an ETag per shard.
+# The dashboard fetches the small manifest and only the shards whose ETag changed.
+EXPORT_DIR = os.path.join(DASH_DIR, "data")
+MANIFEST_PATH = os.path.join(EXPORT_DIR, "manifest.json")
+STATE_PATH = os.path.join(EXPORT_DIR, ".export_state.json")
+# Chart aggregates (chart_series.py), extended with new candles on every export
+SERIES_STATE_PATH = os.path.join(EXPORT_DIR, ".series_state.json")
+# Also write the old single data.json (compact) for anything still reading it
+WRITE_LEGACY_JSON = True
+
 COINS = ['BTC', 'ETH', 'SOL', 'LINK', 'DOGE']
+SIGNAL_LOOKBACK_DAYS = 30
+# Prices and charts both come from the 1h series (its forming candle holds the latest close)
+PRICE_INTERVAL = '1h'
+CHART_POINTS = 50
+RSI_TRADE_COINS = ['LINK', 'BTC']
+MACD_TRADE_COINS = ['DOGE', 'ETH', 'BTC']
+# Correlation heatmap: the scanner's watchlist (coins without enough history are left out)
+CORRELATION_COINS = ['BTC', 'ETH', 'SOL', 'BNB', 'ARB', 'OP', 'SUI', 'MATIC', 'LINK', 'DOGE']
 
-def export_data():
-    if not os.path.exists(DB_PATH):
-        return
+# --- Helpers ---
+def dump_compact(obj):
+    return json.dumps(obj, separators=(',', ':')).encode()
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def write_atomic(path, blob):
+    """Write to a temp file and rename, readers never see a half-written shard."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(blob)
+    os.replace(tmp, path)
 
-    # Get DB size
-    db_size = os.path.getsize(DB_PATH) / (1024 * 1024) # MB
-
-    # Get latest sync time
-    cursor.execute("SELECT MAX(timestamp) FROM candles")
-    raw_sync = cursor.fetchone()[0]
-    
+def load_json(path, default):
     try:
-        if isinstance(raw_sync, int):
-            last_sync = datetime.fromtimestamp(raw_sync / 1000).strftime('%Y-%m-%d %H:%M')
-        else:
-            last_sync = str(raw_sync)
-    except:
-        last_sync = str(raw_sync)
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
 
-    # Get current prices
-    prices = {}
-    for coin in COINS:
-        cursor.execute(f"SELECT close FROM candles WHERE symbol='{coin}' ORDER BY timestamp DESC LIMIT 1")
-        res = cursor.fetchone()
-        prices[coin] = res[0] if res else 0
+def shard_path(name):
+    return os.path.join(EXPORT_DIR, f"{name}.json")
 
-    # Get chart data for ALL coins
-    charts = {}
+def trade_files():
+    paths = [os.path.join(DASH_DIR, f"trades_rsi_{coin}.json") for coin in RSI_TRADE_COINS]
+    paths += [os.path.join(DASH_DIR, f"trades_macd_{coin}.json") for coin in MACD_TRADE_COINS]
+    return paths
+
+# --- Batched Loads ---
+def load_latest_closes(conn):
+    """
+    Latest (timestamp, close) of every coin in ONE statement. The correlated subquery
+    is a single PK index seek per coin, so cost grows with len(COINS), not history.
+    """
+    values = ','.join(['(?)'] * len(COINS))
+    rows = conn.execute(f'''
+        WITH coins(symbol) AS (VALUES {values})
+        SELECT c.symbol, c.timestamp, c.close
+        FROM coins JOIN candles c ON c.rowid = (
+            SELECT rowid FROM candles
+            WHERE symbol = coins.symbol AND interval = ?
+            ORDER BY timestamp DESC LIMIT 1
+        )
+    ''', COINS + [PRICE_INTERVAL]).fetchall()
+    return {r[0]: (r[1], r[2]) for r in rows}
+
+# Parsed trade files, reused while the file's mtime is unchanged
+_TRADE_CACHE = {}
+
+def load_trades(path):
+    mtime = os.path.getmtime(path)
+    cached = _TRADE_CACHE.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r") as f:
+        trades = json.load(f)
+    _TRADE_CACHE[path] = (mtime, trades)
+    return trades
+
+# --- Source Watermarks ---
+def source_keys(cursor, latest, since_ms):
+    """
+    Cheap "has the input advanced?" key per shard. A shard is only rebuilt when its
+    key differs from the one stored at the last export. `latest` is the result of
+    load_latest_closes, so an in-place update of the forming candle also changes the key.
+    """
+    keys = {}
+    keys['prices'] = [latest.get(coin) for coin in COINS]
     for coin in COINS:
-        cursor.execute(f"SELECT timestamp, close FROM candles WHERE symbol='{coin}' AND interval='1h' ORDER BY timestamp DESC LIMIT 50")
-        coin_data = cursor.fetchall()[::-1]
-        
-        def format_ts(ts):
-            try:
-                if isinstance(ts, int):
-                    return datetime.fromtimestamp(ts / 1000).strftime('%H:%M')
-                return ts.split(' ')[1][:5]
-            except: return str(ts)
-
-        charts[coin] = {
-            "labels": [format_ts(d[0]) for d in coin_data],
-            "values": [d[1] for d in coin_data]
-        }
+        keys[f"charts/{coin}"] = latest.get(coin)
+        keys[f"series/{coin}"] = latest.get(coin)
+
+    # New events, closed positions and events dropping out of the lookback window. The
+    # ACTIVE count catches every close, also one whose closed_ts is not above the max.
+    cursor.execute("""
+        SELECT MAX(id), MAX(closed_ts), COUNT(*), SUM(status = 'ACTIVE') FROM signals WHERE candle_ts >= ?
+    """, (since_ms,))
+    keys['signals'] = list(cursor.fetchone())
+
+    keys['strategies'] = [[p, os.path.getmtime(p)] for p in trade_files() if os.path.exists(p)]
+    keys['correlation'] = os.path.getmtime(CORR_STATE_PATH) if os.path.exists(CORR_STATE_PATH) else None
+    # Normalize (tuples -> lists) so keys compare equal to the JSON-loaded state
+    return json.loads(json.dumps(keys))
+
+# --- Shard Builders ---
+def build_prices(latest):
+    return {coin: latest[coin][1] if coin in latest else 0 for coin in COINS}
+
+def format_ts(ts):
+    try:
+        if isinstance(ts, int):
+            return datetime.fromtimestamp(ts / 1000).strftime('%H:%M')
+        return ts.split(' ')[1][:5]
+    except: return str(ts)
+
+def load_charts(conn, coins, latest):
+    """Last CHART_POINTS candles of all given coins in one windowed query."""
+    coins = [c for c in coins if c in latest]
+    if not coins:
+        return {}
+    step = INTERVAL_MS[PRICE_INTERVAL]
+    newest = max(latest[c][0] for c in coins)
+    batch = load_latest_batch(conn, coins, [PRICE_INTERVAL], limit=CHART_POINTS, now_ms=newest + step)
+    return {symbol: arrays for (symbol, _), arrays in batch.items()}
+
+def build_chart(arrays):
+    if arrays is None:
+        return {"labels": [], "values": []}
+    return {
+        "labels": [format_ts(int(ts)) for ts in arrays['timestamp']],
+        "values": [float(v) for v in arrays['close']]
+    }
+
+def update_series(conn, coins, series, now_ms=None):
+    """
+    Extends each coin's ChartSeries with the candles after its last closed one.
+    Coins without state are bootstrapped from their full history (one query);
+    the others share one range query from the oldest of their watermarks.
+    """
+    now_ms = now_ms or int(time.time() * 1000)
+    fresh = [c for c in coins if c not in series]
+    known = [c for c in coins if c in series]
+    for coin in fresh:
+        series[coin] = ChartSeries()
+
+    batch = {}
+    if fresh:
+        batch.update(load_range_batch(conn, fresh, SOURCE_INTERVAL, -1, now_ms + 1))
+    if known:
+        since = min(series[c].closed_ts if series[c].closed_ts is not None else -1 for c in known)
+        batch.update(load_range_batch(conn, known, SOURCE_INTERVAL, since - 1, now_ms + 1))
+    for (symbol, _), arrays in batch.items():
+        series[symbol].update(arrays, now_ms)
+    return series
+
+def build_series(chart_series):
+    return chart_series.views()
 
-    # Get signals directly from database
-    signals = []
-    cursor.execute("SELECT id, timestamp, symbol, signal, entry_price, sl_price, tp_price, status, profit_loss FROM signals ORDER BY timestamp DESC")
-    for row in cursor.fetchall():
-        signals.append({
-            "id": row[0],
-            "date": row[1],
-            "symbol": row[2],
-            "signal": row[3],
-            "entry": row[4],
-            "sl": row[5],
-            "tp": row[6],
-            "status": row[7],
-            "profit_loss": row[8]
-        })
-
-    # Load MACD Results
-    macd_res = []
-    if os.path.exists(MACD_PATH):
-        try:
-            with open(MACD_PATH, "r") as f:
-                macd_res = json.load(f)
-        except: pass
-
-    # Strategy Info
+def build_signals(conn, since_ms):
+    # Recent signal events from the scanner's event store (indexed range query)
+    return load_recent_events(conn, since_ms)
+
+def build_strategies():
     strategies = []
-    
+
     # 1. RSI Divergence
     rsi_trades = []
     # Load from BTC 1h or LINK 4h
-    for coin in ['LINK', 'BTC']:
+    for coin in RSI_TRADE_COINS:
         path = os.path.join(DASH_DIR, f"trades_rsi_{coin}.json")
         if os.path.exists(path):
-            with open(path, "r") as f:
-                raw_trades = json.load(f)
-                # Only take the CLOSE trades for the performance table
-                for t in raw_trades:
-                    if t['type'] == 'CLOSE' or t['type'] == 'EXIT_LONG' or t['type'] == 'EXIT_SHORT':
-                        rsi_trades.append({
-                            "date": t['date'],
-                            "coin": coin,
-                            "type": t.get('side', t['type']),
-                            "profit": f"{t['profit']:.2f}$",
-                            "entry": f"{t.get('entry', 0):.2f}",
-                            "sl": f"{t.get('sl', 0):.2f}",
-                            "tp": f"{t.get('tp', 0):.2f}"
-                        })
+            # Only take the CLOSE trades for the performance table
+            for t in load_trades(path):
+                if t['type'] == 'CLOSE' or t['type'] == 'EXIT_LONG' or t['type'] == 'EXIT_SHORT':
+                    rsi_trades.append({
+                        "date": t['date'],
+                        "coin": coin,
+                        "type": t.get('side', t['type']),
+                        "profit": f"{t['profit']:.2f}$",
+                        "entry": f"{t.get('entry', 0):.2f}",
+                        "sl": f"{t.get('sl', 0):.2f}",
+                        "tp": f"{t.get('tp', 0):.2f}"
+                    })
 
     strategies.append({
         "id": "rsi_div",
@@ -117,22 +213,20 @@ def export_data():
 
     # 2. MACD Cross
     macd_trades = []
-    for coin in ['DOGE', 'ETH', 'BTC']:
+    for coin in MACD_TRADE_COINS:
         path = os.path.join(DASH_DIR, f"trades_macd_{coin}.json")
         if os.path.exists(path):
-            with open(path, "r") as f:
-                raw_trades = json.load(f)
-                for t in raw_trades:
-                    if 'EXIT' in t['type']:
-                        macd_trades.append({
-                            "date": t['date'],
-                            "coin": coin,
-                            "type": t['type'].replace('EXIT_', ''),
-                            "profit": f"{t['profit']:.2f}$",
-                            "entry": f"{t['entry']:.2f}",
-                            "sl": f"{t['sl']:.2f}",
-                            "tp": f"{t['tp']:.2f}"
-                        })
+            for t in load_trades(path):
+                if 'EXIT' in t['type']:
+                    macd_trades.append({
+                        "date": t['date'],
+                        "coin": coin,
+                        "type": t['type'].replace('EXIT_', ''),
+                        "profit": f"{t['profit']:.2f}$",
+                        "entry": f"{t['entry']:.2f}",
+                        "sl": f"{t['sl']:.2f}",
+                        "tp": f"{t['tp']:.2f}"
+                    })
 
     strategies.append({
         "id": "macd_cross",
@@ -142,20 +236,118 @@ def export_data():
         "desc": "Trend-Folge Strategie. Top Performer bei DOGE 4h.",
         "trades": macd_trades[::-1][:20]
     })
+    return strategies
+
+def build_correlations():
+    return build_correlation(load_matrix(), CORRELATION_COINS)
 
-    data = {
-        "db_size": f"{db_size:.2f} MB",
-        "last_sync": last_sync,
-        "prices": prices,
-        "signals": signals,
-        "charts": charts,
-        "strategies": strategies
+# --- Export ---
+def export_data():
+    if not os.path.exists(DB_PATH):
+        return
+
+    t0 = time.perf_counter()
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    init_signal_store(conn)
+
+    # Get DB size
+    db_size = os.path.getsize(DB_PATH) / (1024 * 1024) # MB
+
+    # Latest candle per coin: one statement feeds prices, chart keys and last sync time
+    latest = load_latest_closes(conn)
+    raw_sync = max((v[0] for v in latest.values()), default=None)
+
+    try:
+        if isinstance(raw_sync, int):
+            last_sync = datetime.fromtimestamp(raw_sync / 1000).strftime('%Y-%m-%d %H:%M')
+        else:
+            last_sync = str(raw_sync)
+    except:
+        last_sync = str(raw_sync)
+
+    since_ms = int((time.time() - SIGNAL_LOOKBACK_DAYS * 86400) * 1000)
+    keys = source_keys(cursor, latest, since_ms)
+    state = load_json(STATE_PATH, {})
+    manifest = load_json(MANIFEST_PATH, {"shards": {}})
+    shards = manifest.get("shards", {})
+
+    # Shards whose inputs advanced (or that are missing on disk)
+    names = ['prices', 'signals', 'strategies', 'correlation'] + [f"charts/{coin}" for coin in COINS] + [f"series/{coin}" for coin in COINS]
+    stale = [name for name in names
+             if state.get(name) != keys.get(name) or name not in shards or not os.path.exists(shard_path(name))]
+
+    # All stale charts come from a single windowed query
+    chart_coins = [name.split('/')[1] for name in stale if name.startswith('charts/')]
+    chart_data = load_charts(conn, chart_coins, latest)
+
+    # Stale zoom series: load stored aggregates and fold in only the new candles
+    series_coins = [name.split('/')[1] for name in stale if name.startswith('series/')]
+    series = {}
+    if series_coins:
+        series_state = load_json(SERIES_STATE_PATH, {})
+        series = {coin: ChartSeries(series_state[coin]) for coin in series_coins if coin in series_state}
+        update_series(conn, series_coins, series)
+
+    builders = {
+        'prices': lambda: build_prices(latest),
+        'signals': lambda: build_signals(conn, since_ms),
+        'strategies': build_strategies,
+        'correlation': build_correlations
     }
+    for coin in COINS:
+        builders[f"charts/{coin}"] = lambda coin=coin: build_chart(chart_data.get(coin))
+        builders[f"series/{coin}"] = lambda coin=coin: build_series(series[coin])
+
+    rebuilt = []
+    written = []
+    contents = {}
+    for name in stale:
+        content = builders[name]()
+        blob = dump_compact(content)
+        etag = hashlib.sha1(blob).hexdigest()[:16]
+        rebuilt.append(name)
+        contents[name] = content
+        state[name] = keys.get(name)
+
+        # Rebuilt but identical (e.g. a candle update with the same close): keep the file
+        if shards.get(name, {}).get("etag") == etag and os.path.exists(shard_path(name)):
+            continue
+        write_atomic(shard_path(name), blob)
+        shards[name] = {"path": f"{name}.json", "etag": etag, "bytes": len(blob)}
+        written.append(name)
 
-    with open(JSON_PATH, "w") as f:
-        json.dump(data, f, indent=4)
-    
+    meta_changed = manifest.get("db_size") != f"{db_size:.2f} MB" or manifest.get("last_sync") != last_sync
+    if written or meta_changed:
+        manifest = {
+            "db_size": f"{db_size:.2f} MB",
+            "last_sync": last_sync,
+            "generated": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "shards": shards
+        }
+        write_atomic(MANIFEST_PATH, dump_compact(manifest))
+
+        if WRITE_LEGACY_JSON:
+            def shard(name):
+                return contents[name] if name in contents else load_json(shard_path(name), None)
+            data = {
+                "db_size": manifest["db_size"],
+                "last_sync": last_sync,
+                "prices": shard('prices') or {},
+                "signals": shard('signals') or [],
+                "charts": {coin: shard(f"charts/{coin}") or {"labels": [], "values": []} for coin in COINS},
+                "strategies": shard('strategies') or [],
+                "correlation": shard('correlation') or {}
+            }
+            write_atomic(JSON_PATH, dump_compact(data))
+
+    if series:
+        series_state.update({coin: cs.to_state() for coin, cs in series.items()})
+        write_atomic(SERIES_STATE_PATH, dump_compact(series_state))
+    write_atomic(STATE_PATH, dump_compact(state))
     conn.close()
 
+    print(f"Export: rebuilt {len(rebuilt)} shards, wrote {len(written)} ({', '.join(written) or '-'}) in {(time.perf_counter() - t0)*1000:.1f} ms")
+
 if __name__ == "__main__":
     export_data()
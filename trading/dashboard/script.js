@@ -1,5 +1,6 @@
 let cachedData = null;
 let currentCoin = 'BTC';
+let currentZoom = 'live'; // 'live' = last 50 1h closes, otherwise a series/<COIN> zoom level
 
 function updateActiveTrades(data) {
     const container = document.getElementById('active-trades');
@@ -19,7 +20,8 @@ function updateActiveTrades(data) {
     
     container.innerHTML = signals.map(sig => {
         const isOpen = sig.status === 'ACTIVE';
-        const currentPrice = prices[sig.symbol] || 0;
+        // Closed positions are valued at their exit price (set by position_tracker.py)
+        const currentPrice = isOpen ? (prices[sig.symbol] || 0) : (sig.exit || prices[sig.symbol] || 0);
         const entryPrice = sig.entry || 0;
         const diff = currentPrice - entryPrice;
         
@@ -66,10 +68,50 @@ function updateActiveTrades(data) {
     }).join('');
 }
 
+// Sharded export (data_exporter.py): the manifest lists every shard with its ETag,
+// only shards whose ETag changed since the last poll are downloaded again.
+// Served by api_server.py, the same shards come from its in-memory snapshot instead
+// (revalidated via ETag) and changes are pushed over server-sent events.
+const shardEtags = {};
+const shardData = {};
+let apiMode = false;
+
+async function loadSnapshot() {
+    const manifestUrl = apiMode ? 'api/manifest' : 'data/manifest.json';
+    const manifest = await (await fetch(manifestUrl, { cache: 'no-cache' })).json();
+    const changed = Object.entries(manifest.shards).filter(([name, shard]) => shardEtags[name] !== shard.etag);
+
+    await Promise.all(changed.map(async ([name, shard]) => {
+        // ETag in the URL: unchanged shards can be served straight from the browser cache
+        const response = apiMode
+            ? await fetch(`api/${shard.path}`, { cache: 'no-cache' })
+            : await fetch(`data/${shard.path}?v=${shard.etag}`);
+        shardData[name] = await response.json();
+        shardEtags[name] = shard.etag;
+    }));
+
+    const charts = {};
+    const series = {};
+    for (const [name, value] of Object.entries(shardData)) {
+        if (name.startsWith('charts/')) charts[name.slice('charts/'.length)] = value;
+        if (name.startsWith('series/')) series[name.slice('series/'.length)] = value;
+    }
+
+    return {
+        db_size: manifest.db_size,
+        last_sync: manifest.last_sync,
+        prices: shardData.prices || {},
+        signals: shardData.signals || [],
+        charts: charts,
+        series: series,
+        strategies: shardData.strategies || [],
+        correlation: shardData.correlation || {}
+    };
+}
+
 async function updateDashboard() {
     try {
-        const response = await fetch('data.json');
-        const data = await response.json();
+        const data = await loadSnapshot();
         cachedData = data;
 
         // Update Global Stats
@@ -136,6 +178,9 @@ async function updateDashboard() {
             stratList.appendChild(card);
         });
 
+        // Correlation heatmap (correlation.py, rolling over the last window of 1h returns)
+        renderCorrelation(data.correlation);
+
         // Render Current Chart
         renderChart(currentCoin);
 
@@ -152,15 +197,59 @@ function switchCoin(coin) {
         if (t.innerText.includes(coin)) t.classList.add('active');
     });
     
-    document.getElementById('chart-title').innerText = `${coin}/1H`;
     renderChart(coin);
 }
 
+function setZoom(zoom) {
+    currentZoom = zoom;
+    document.querySelectorAll('.zoom-buttons button').forEach(b => b.classList.toggle('active', b.dataset.zoom === zoom));
+    renderChart(currentCoin);
+}
+
+// Downsampled line (LTTB, fixed point budget) of one zoom level, in the live chart's format
+function zoomChartData(coin, zoom) {
+    const view = cachedData.series && cachedData.series[coin] && cachedData.series[coin][zoom];
+    if (!view) return null;
+    const withTime = zoom === 'day' || zoom === 'week';
+    return {
+        labels: view.line.t.map(t => {
+            const d = new Date(t);
+            return withTime ? d.toLocaleString('de-DE', { day: '2-digit', month: '2-digit', hour: '2-digit', minute: '2-digit' })
+                            : d.toLocaleDateString('de-DE');
+        }),
+        values: view.line.v
+    };
+}
+
+function renderCorrelation(corr) {
+    const table = document.getElementById('correlation-table');
+    if (!corr.symbols || corr.symbols.length === 0) {
+        table.innerHTML = '<tr><td>Keine Daten</td></tr>';
+        return;
+    }
+    document.getElementById('correlation-title').innerText = `(${corr.interval}, ${corr.window} Kerzen)`;
+    const cell = v => {
+        if (v === null) return '<td>-</td>';
+        // Red for positive, blue for negative, opacity by strength
+        const color = v >= 0 ? `rgba(255, 77, 77, ${Math.abs(v) * 0.6})` : `rgba(0, 150, 255, ${Math.abs(v) * 0.6})`;
+        return `<td style="background: ${color}">${v.toFixed(2)}</td>`;
+    };
+    const header = `<tr><th></th>${corr.symbols.map(s => `<th>${s}</th>`).join('')}<th>β ${corr.benchmark}</th></tr>`;
+    const rows = corr.symbols.map((s, i) => {
+        const beta = corr.beta[i];
+        return `<tr><th>${s}</th>${corr.corr[i].map(cell).join('')}<td>${beta === null || beta === undefined ? '-' : beta.toFixed(2)}</td></tr>`;
+    });
+    table.innerHTML = header + rows.join('');
+}
+
 let priceChart;
 function renderChart(coin) {
-    if (!cachedData || !cachedData.charts[coin]) return;
-    
-    const chartData = cachedData.charts[coin];
+    if (!cachedData) return;
+    const chartData = currentZoom === 'live' ? cachedData.charts[coin] : zoomChartData(coin, currentZoom);
+    if (!chartData) return;
+    const zoomLabels = { live: '1H', day: '1T', week: '1W', month: '1M', all: 'ALLE' };
+    document.getElementById('chart-title').innerText = `${coin}/${zoomLabels[currentZoom]}`;
+
     const ctx = document.getElementById('priceChart').getContext('2d');
     
     if (priceChart) priceChart.destroy();
@@ -224,6 +313,21 @@ document.getElementById('trade-modal').addEventListener('click', function(e) {
     if (e.target === this) closeModal();
 });
 
+// Push updates from api_server.py; without it the EventSource fails and we keep polling
+function connectEvents() {
+    if (!window.EventSource) return;
+    const source = new EventSource('api/events');
+    let pending = null;
+    const schedule = () => {
+        // Several events usually arrive together, reload once
+        if (!pending) pending = setTimeout(() => { pending = null; updateDashboard(); }, 250);
+    };
+    source.addEventListener('open', () => { apiMode = true; });
+    ['section', 'signal', 'trade_closed'].forEach(kind => source.addEventListener(kind, schedule));
+    source.addEventListener('error', () => { if (!apiMode) source.close(); });
+}
+
 // Initial load
 updateDashboard();
+connectEvents();
 setInterval(updateDashboard, 60000);
\ No newline at end of file
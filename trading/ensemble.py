@@ -0,0 +1,257 @@
+import sqlite3
+import pandas as pd
+import pandas_ta as ta
+import numpy as np
+from itertools import combinations
+
+from optimizer import detect_divergence_signals, run_backtest_fast
+
+# --- Configuration ---
+DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
+RESULTS_PATH = "/home/manni/.openclaw/workspace/trading/ensemble_results.csv"
+
+# Signal sources. "event" sources fire on a single bar (cross, flip, pivot),
+# "state" sources stay on while a condition holds and act as filters.
+EVENT_SOURCES = ['rsi_div', 'macd_cross', 'st_flip', 'ema_pullback']
+STATE_SOURCES = ['macd_bull', 'st_trend', 'ema_trend']
+
+# --- Bitset helpers ---
+# A bitset is a plain Python int where bit i is set when the condition holds on bar i.
+# AND/OR/shift on ints run in C over the whole series at once and the ints are
+# hashable, so identical signal sets can be detected and backtested only once.
+
+def to_bitset(mask):
+    """Packs a boolean array into an int bitset (bit i = bar i)."""
+    packed = np.packbits(np.asarray(mask, dtype=bool), bitorder='little')
+    return int.from_bytes(packed.tobytes(), 'little')
+
+def from_bitset(bits, n):
+    """Unpacks an int bitset back into a boolean array of length n."""
+    raw = np.frombuffer(bits.to_bytes((n + 7) // 8, 'little'), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder='little')[:n].astype(bool)
+
+def widen(bits, lag, n):
+    """
+    Keeps every set bit alive for `lag` more bars, i.e. bit i is set if the
+    source fired anywhere in [i - lag, i]. Uses log2(lag) shift/or steps.
+    """
+    if lag <= 0:
+        return bits
+    out = bits
+    covered = 1
+    while covered < lag + 1:
+        step = min(covered, lag + 1 - covered)
+        out |= out << step
+        covered += step
+    return out & ((1 << n) - 1)
+
+def combine(bitsets, op='and', n_required=None):
+    """
+    Combines bitsets with AND / OR / N-of-M.
+    N-of-M is built as the OR over all AND-ed subsets of size N, which is cheap
+    for the handful of sources we combine.
+    """
+    if op == 'and':
+        out = bitsets[0]
+        for b in bitsets[1:]:
+            out &= b
+        return out
+    if op == 'or':
+        out = 0
+        for b in bitsets:
+            out |= b
+        return out
+    if op == 'nofm':
+        out = 0
+        for subset in combinations(bitsets, n_required):
+            out |= combine(list(subset), 'and')
+        return out
+    raise ValueError(f"Unknown op: {op}")
+
+# --- Signal Materialization ---
+def materialize_signals(df, rsi_length=14, rsi_oversold=30, rsi_overbought=70,
+                        macd_params=(12, 26, 9), st_params=(10, 3.0), ema_params=(200, 50)):
+    """
+    Computes every strategy's long/short conditions once for a series and returns
+    {source_name: (long_bits, short_bits)}. Logic mirrors the per-strategy backtests.
+    """
+    n = len(df)
+    close = df['close'].values
+    low = df['low'].values
+    high = df['high'].values
+    sources = {}
+
+    # RSI Divergence (same detector as optimizer.py)
+    div = detect_divergence_signals(df, rsi_length, rsi_oversold, rsi_overbought)
+    sources['rsi_div'] = (to_bitset(div == 1), to_bitset(div == -1))
+
+    # MACD Cross
+    fast, slow, signal = macd_params
+    macd = ta.macd(df['close'], fast=fast, slow=slow, signal=signal)
+    if macd is not None:
+        m = macd[f"MACD_{fast}_{slow}_{signal}"].values
+        s = macd[f"MACDs_{fast}_{slow}_{signal}"].values
+        above = m > s
+        below = m < s
+        prev_m = np.roll(m, 1)
+        prev_s = np.roll(s, 1)
+        cross_up = above & (prev_m <= prev_s)
+        cross_dn = below & (prev_m >= prev_s)
+        cross_up[0] = cross_dn[0] = False
+        sources['macd_cross'] = (to_bitset(cross_up), to_bitset(cross_dn))
+        sources['macd_bull'] = (to_bitset(above), to_bitset(below))
+
+    # SuperTrend Flip
+    length, mult = st_params
+    st = ta.supertrend(df['high'], df['low'], df['close'], length=length, multiplier=mult)
+    if st is not None:
+        col_name = [c for c in st.columns if c.startswith('SUPERTd')][0]
+        d = st[col_name].values
+        prev_d = np.roll(d, 1)
+        flip_up = (d == 1) & (prev_d == -1)
+        flip_dn = (d == -1) & (prev_d == 1)
+        flip_up[0] = flip_dn[0] = False
+        sources['st_flip'] = (to_bitset(flip_up), to_bitset(flip_dn))
+        sources['st_trend'] = (to_bitset(d == 1), to_bitset(d == -1))
+
+    # EMA Trend Pullback
+    ema_trend, ema_entry = ema_params
+    ema_t = ta.ema(df['close'], length=ema_trend)
+    ema_e = ta.ema(df['close'], length=ema_entry)
+    if ema_t is not None and ema_e is not None:
+        t = ema_t.values
+        e = ema_e.values
+        prev_close = np.roll(close, 1)
+        prev_t = np.roll(t, 1)
+        pb_long = (prev_close > prev_t) & (low <= e) & (close > e)
+        pb_short = (prev_close < prev_t) & (high >= e) & (close < e)
+        pb_long[0] = pb_short[0] = False
+        sources['ema_pullback'] = (to_bitset(pb_long), to_bitset(pb_short))
+        sources['ema_trend'] = (to_bitset(close > t), to_bitset(close < t))
+
+    return sources
+
+def evaluate_combo(sources, combo, n):
+    """
+    Evaluates one combination on materialized sources.
+    combo = (names, op, n_required, lag). The lag widens event sources only;
+    states are already "on" for as long as they hold.
+    Returns (long_bits, short_bits).
+    """
+    names, op, n_required, lag = combo
+    longs = []
+    shorts = []
+    for name in names:
+        l_bits, s_bits = sources[name]
+        if name in EVENT_SOURCES and op != 'or':
+            l_bits = widen(l_bits, lag, n)
+            s_bits = widen(s_bits, lag, n)
+        longs.append(l_bits)
+        shorts.append(s_bits)
+    return combine(longs, op, n_required), combine(shorts, op, n_required)
+
+def bits_to_signals(long_bits, short_bits, n):
+    """Converts long/short bitsets into the 1/-1/0 array used by run_backtest_fast."""
+    signals = np.zeros(n)
+    signals[from_bitset(long_bits, n)] = 1
+    # Conflicting bars (long and short at once) are skipped
+    signals[from_bitset(long_bits & short_bits, n)] = 0
+    signals[from_bitset(short_bits & ~long_bits, n)] = -1
+    return signals
+
+def generate_combos(names, max_terms=3, lags=(0, 2, 5)):
+    """
+    Enumerates combinations: single sources, AND of 2..max_terms sources (at each lag),
+    OR of pairs and N-of-M for groups of 3+. Pure state-only combos are skipped,
+    a combo needs at least one event to define the entry bar.
+    """
+    combos = []
+    for k in range(1, max_terms + 1):
+        for names_subset in combinations(names, k):
+            if not any(n in EVENT_SOURCES for n in names_subset):
+                continue
+            if k == 1:
+                combos.append((names_subset, 'and', None, 0))
+                continue
+            for lag in lags:
+                combos.append((names_subset, 'and', None, lag))
+            combos.append((names_subset, 'or', None, 0))
+            if k >= 3:
+                for lag in lags:
+                    combos.append((names_subset, 'nofm', k - 1, lag))
+    return combos
+
+def screen_series(df, sl_tp_ratios, max_terms=3, lags=(0, 2, 5), **signal_params):
+    """
+    Screens all combinations for a single series.
+    Signals are materialized once; combos producing the same bitsets share one backtest.
+    """
+    n = len(df)
+    sources = materialize_signals(df, **signal_params)
+    combos = generate_combos(list(sources.keys()), max_terms, lags)
+
+    backtest_cache = {}
+    results = []
+    for combo in combos:
+        long_bits, short_bits = evaluate_combo(sources, combo, n)
+        if long_bits == 0 and short_bits == 0:
+            continue
+
+        key = (long_bits, short_bits)
+        if key not in backtest_cache:
+            signals = bits_to_signals(long_bits, short_bits, n)
+            backtest_cache[key] = [run_backtest_fast(df, signals, sl, tp) for (sl, tp) in sl_tp_ratios]
+
+        names, op, n_required, lag = combo
+        label = f" {op.upper()} ".join(names) if op != 'nofm' else f"{n_required}-of-({', '.join(names)})"
+        for (sl, tp), (ret, w, l) in zip(sl_tp_ratios, backtest_cache[key]):
+            results.append({
+                'Combo': label,
+                'Lag': lag,
+                'SL_TP': f"{sl*100:.0f}%/{tp*100:.0f}%",
+                'Signals': long_bits.bit_count() + short_bits.bit_count(),
+                'Return%': ret,
+                'Trades': w + l,
+                'WinRate': (w/(w+l)*100) if (w+l) > 0 else 0
+            })
+
+    return results, len(combos), len(backtest_cache)
+
+def run_screening():
+    conn = sqlite3.connect(DB_PATH)
+    symbols = ['BTC', 'ETH', 'SOL', 'LINK', 'DOGE']
+    intervals = ['1h', '4h']
+    sl_tp_ratios = [(0.01, 0.02), (0.02, 0.04), (0.03, 0.06), (0.05, 0.10)]
+
+    all_results = []
+    print("Starting Ensemble Screening...", flush=True)
+
+    for symbol in symbols:
+        for interval in intervals:
+            query = f"SELECT timestamp, open, high, low, close, volume FROM candles WHERE symbol='{symbol}' AND interval='{interval}' ORDER BY timestamp ASC"
+            df = pd.read_sql_query(query, conn)
+            if len(df) < 250: continue
+
+            results, n_combos, n_backtests = screen_series(df, sl_tp_ratios)
+            for r in results:
+                r['Symbol'] = symbol
+                r['Interval'] = interval
+            all_results.extend(results)
+            print(f"{symbol} {interval}: {n_combos} combos -> {n_backtests} unique signal sets backtested", flush=True)
+
+    conn.close()
+
+    res_df = pd.DataFrame(all_results)
+    if res_df.empty:
+        print("No combinations produced signals.")
+        return
+    res_df = res_df.sort_values('Return%', ascending=False)
+
+    print("\n=== TOP 10 COMBINATIONS ===")
+    print(res_df.head(10).to_string(index=False))
+
+    res_df.to_csv(RESULTS_PATH, index=False)
+    print(f"\nFull results saved to {RESULTS_PATH}")
+
+if __name__ == "__main__":
+    run_screening()
@@ -0,0 +1,139 @@
+import contextlib
+import importlib
+import io
+import json
+import os
+import socket
+import sys
+import time
+import traceback
+from datetime import datetime
+
+from run_job import JOBS, WORKER_SOCKET, STATUS_MARK, job_function, exit_code
+
+# --- Warm Job Worker ---
+# Resident process behind run_job.py. numpy / pandas / pandas_ta and every job module
+# are imported once at start, so a cron job costs its own work instead of an interpreter
+# start plus seconds of imports. Jobs run one at a time (cron never overlapped them
+# either), stdout/stderr go back to the client, and module-level caches such as the
+# exporter's trade file memo stay warm between runs. Deployed code changes need a restart.
+
+PRELOAD = ['numpy', 'pandas', 'pandas_ta']
+
+class ClientWriter(io.TextIOBase):
+    """stdout/stderr replacement for a job. A client that went away does not stop the job."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.gone = False
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.send(text.encode())
+        return len(text)
+
+    def send(self, data):
+        if self.gone:
+            return
+        try:
+            self.conn.sendall(data)
+        except OSError:
+            self.gone = True
+
+def preload():
+    """Imports the heavy libraries and all job modules. Returns {name: import ms}."""
+    timings = {}
+    for name in PRELOAD + list(JOBS):
+        t0 = time.perf_counter()
+        try:
+            if name in JOBS:
+                job_function(name)
+            else:
+                importlib.import_module(name)
+        except Exception as e:
+            # The job reports the same error when it runs; the worker stays up
+            print(f"  preload {name} failed: {e}", flush=True)
+            continue
+        timings[name] = (time.perf_counter() - t0) * 1000
+    return timings
+
+def read_request(conn):
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return json.loads(data)
+
+def run_job(name, args, out):
+    """Runs one job with its output redirected to `out`. Returns the exit status."""
+    if name not in JOBS:
+        out.write(f"Unknown job: {name}\n")
+        return 2
+    argv = sys.argv
+    sys.argv = [JOBS[name][0]] + list(args)
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            try:
+                job_function(name)(*args)
+            except SystemExit as e:
+                return exit_code(e)
+            except Exception:
+                traceback.print_exc()
+                return 1
+        return 0
+    finally:
+        sys.argv = argv
+
+def worker_running(socket_path):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+def serve(socket_path=WORKER_SOCKET):
+    if worker_running(socket_path):
+        print(f"A job worker is already listening on {socket_path}", flush=True)
+        return
+    t0 = time.perf_counter()
+    timings = preload()
+    print(f"Preloaded {len(timings)} modules in {(time.perf_counter() - t0)*1000:.0f} ms "
+          f"({', '.join(f'{k}={v:.0f}ms' for k, v in timings.items())})", flush=True)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(16)
+    print(f"Job worker listening on {socket_path}", flush=True)
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                try:
+                    request = read_request(conn)
+                except (OSError, ValueError):
+                    continue
+                name = request.get('job')
+                writer = ClientWriter(conn)
+                t0 = time.perf_counter()
+                code = run_job(name, request.get('args', []), writer)
+                ms = (time.perf_counter() - t0) * 1000
+                writer.send(STATUS_MARK + json.dumps({'code': code, 'ms': round(ms, 1)}).encode())
+                print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} {name}: exit {code} in {ms:.0f} ms", flush=True)
+    except KeyboardInterrupt:
+        print("Job worker stopped.", flush=True)
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+if __name__ == "__main__":
+    # Usage: job_worker.py [socket_path]
+    serve(sys.argv[1] if len(sys.argv) > 1 else WORKER_SOCKET)
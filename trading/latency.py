@@ -0,0 +1,45 @@
+import bisect
+
+# Shared by scanner_daemon.py (candle close -> alert) and alert_dispatcher.py (alert -> sink)
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 30000, 120000, 600000]
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (upper bounds in ms, last bucket is +inf)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        idx = bisect.bisect_left(self.buckets, ms)
+        self.counts[idx] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None if empty)."""
+        if self.total == 0:
+            return None
+        target = q * self.total
+        running = 0
+        for i, c in enumerate(self.counts):
+            running += c
+            if running >= target:
+                return self.buckets[i] if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            'buckets_ms': self.buckets + ['inf'],
+            'counts': self.counts,
+            'count': self.total,
+            'avg_ms': (self.sum_ms / self.total) if self.total else None,
+            'max_ms': self.max_ms,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+        }
@@ -0,0 +1,198 @@
+import sqlite3
+import time
+import numpy as np
+
+from candles import Candles
+
+DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+INTERVAL_MS = {
+    '1m': 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+}
+
+def load_latest_batch(conn, symbols, intervals, limit=100, now_ms=None, slack=2.0):
+    """
+    Loads the last `limit` candles of every symbol x interval in ONE query.
+
+    Returns {(symbol, interval): {column: np.ndarray}} with rows sorted ascending by
+    timestamp. The arrays of each series are contiguous slices of one block per column.
+
+    The scan is bounded by a per-interval time floor (limit * slack bars before now), so
+    the PK index (symbol, interval, timestamp) only touches recent rows and the cost
+    grows with the number of series returned, not with history length. Series with fewer
+    than `limit` candles after the floor (sync outage, slow universe tier, gaps) are
+    re-read with a per-series index seek; those that gain candles from it are listed on
+    stdout, so none come back short or drop out silently.
+    ROW_NUMBER() needs SQLite >= 3.25.
+    """
+    if not symbols or not intervals:
+        return {}
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+
+    floor_clauses = []
+    params = list(symbols)
+    for interval in intervals:
+        floor_clauses.append("(interval = ? AND timestamp >= ?)")
+        params.extend([interval, now_ms - int(limit * slack * INTERVAL_MS[interval])])
+    params.append(limit)
+
+    query = f"""
+        SELECT symbol, interval, timestamp, open, high, low, close, volume FROM (
+            SELECT symbol, interval, timestamp, open, high, low, close, volume,
+                   ROW_NUMBER() OVER (PARTITION BY symbol, interval ORDER BY timestamp DESC) AS rn
+            FROM candles
+            WHERE symbol IN ({','.join('?' * len(symbols))})
+              AND ({' OR '.join(floor_clauses)})
+        )
+        WHERE rn <= ?
+        ORDER BY symbol, interval, timestamp ASC
+    """
+    rows = conn.execute(query, params).fetchall()
+    batch = group_rows(rows)
+
+    stale = []
+    for symbol, interval in [(s, i) for s in symbols for i in intervals]:
+        found = len(batch[(symbol, interval)]['timestamp']) if (symbol, interval) in batch else 0
+        if found >= limit:
+            continue
+        rows = conn.execute("""
+            SELECT symbol, interval, timestamp, open, high, low, close, volume FROM candles
+            WHERE symbol = ? AND interval = ? ORDER BY timestamp DESC LIMIT ?
+        """, (symbol, interval, limit)).fetchall()
+        if len(rows) > found:
+            batch.update(group_rows(rows[::-1]))
+            stale.append(f"{symbol} {interval}")
+    if stale:
+        print(f"load_latest_batch: {len(stale)} series short after the window floor, loaded unbounded: "
+              f"{', '.join(stale)}", flush=True)
+    return batch
+
+def load_range_batch(conn, symbols, interval, start_ms, end_ms):
+    """
+    Loads candles with start_ms < timestamp < end_ms for several symbols of one interval
+    in one query. Same return shape as load_latest_batch.
+    """
+    if not symbols:
+        return {}
+    query = f"""
+        SELECT symbol, interval, timestamp, open, high, low, close, volume
+        FROM candles
+        WHERE symbol IN ({','.join('?' * len(symbols))})
+          AND interval = ? AND timestamp > ? AND timestamp < ?
+        ORDER BY symbol, interval, timestamp ASC
+    """
+    rows = conn.execute(query, list(symbols) + [interval, start_ms, end_ms]).fetchall()
+    return group_rows(rows)
+
+def load_candles(conn, symbol, interval, start_ms=-1, end_ms=None):
+    """One series as a Candles container (start_ms < timestamp < end_ms)."""
+    end_ms = end_ms if end_ms is not None else 2 ** 62
+    arrays = load_range_batch(conn, [symbol], interval, start_ms, end_ms).get((symbol, interval))
+    return Candles.from_arrays(arrays) if arrays is not None else Candles.empty()
+
+def iter_candle_chunks(conn, symbol, interval, chunk_size=50000, start_ms=-1, end_ms=None):
+    """
+    Streams one series as ascending blocks of at most `chunk_size` candles
+    ({column: array}, same shape as the batch loaders). Keyset pagination on the PK
+    (timestamp > last seen), so each block is one index range read and only one block
+    is held in memory at a time.
+    """
+    last = start_ms
+    end_clause = "AND timestamp < ?" if end_ms is not None else ""
+    while True:
+        params = [symbol, interval, last] + ([end_ms] if end_ms is not None else []) + [chunk_size]
+        rows = conn.execute(f"""
+            SELECT timestamp, open, high, low, close, volume FROM candles
+            WHERE symbol = ? AND interval = ? AND timestamp > ? {end_clause}
+            ORDER BY timestamp ASC LIMIT ?
+        """, params).fetchall()
+        if not rows:
+            return
+        block = np.array(rows, dtype=np.float64)
+        chunk = {'timestamp': np.array([r[0] for r in rows], dtype=np.int64)}
+        for j, col in enumerate(COLUMNS[1:], start=1):
+            chunk[col] = np.ascontiguousarray(block[:, j])
+        yield chunk
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][0]
+
+def list_series(conn):
+    """
+    All (symbol, interval) pairs in the candles table. Skip-scan over the PK index:
+    one seek per series instead of a DISTINCT over every row.
+    """
+    pairs = []
+    row = conn.execute("SELECT symbol, interval FROM candles ORDER BY symbol, interval LIMIT 1").fetchone()
+    while row is not None:
+        pairs.append(row)
+        row = conn.execute("""
+            SELECT symbol, interval FROM candles WHERE (symbol, interval) > (?, ?)
+            ORDER BY symbol, interval LIMIT 1
+        """, row).fetchone()
+    return pairs
+
+def load_latest_rows(conn, pairs):
+    """Newest (timestamp, close) of each (symbol, interval) pair in one statement, one index seek per pair."""
+    if not pairs:
+        return {}
+    values = ','.join(['(?, ?)'] * len(pairs))
+    rows = conn.execute(f"""
+        WITH series(symbol, interval) AS (VALUES {values})
+        SELECT c.symbol, c.interval, c.timestamp, c.close
+        FROM series JOIN candles c ON c.rowid = (
+            SELECT rowid FROM candles
+            WHERE symbol = series.symbol AND interval = series.interval
+            ORDER BY timestamp DESC LIMIT 1
+        )
+    """, [v for pair in pairs for v in pair]).fetchall()
+    return {(r[0], r[1]): (r[2], r[3]) for r in rows}
+
+def group_rows(rows):
+    """
+    Turns (symbol, interval, timestamp, o, h, l, c, v) rows sorted by series/time
+    into {(symbol, interval): {column: array}} without re-sorting.
+    """
+    if not rows:
+        return {}
+
+    keys = [(r[0], r[1]) for r in rows]
+    block = np.array([r[2:] for r in rows], dtype=np.float64)
+    ts = np.array([r[2] for r in rows], dtype=np.int64)
+
+    # Series boundaries: positions where (symbol, interval) changes
+    starts = [0] + [i for i in range(1, len(keys)) if keys[i] != keys[i - 1]]
+    ends = starts[1:] + [len(keys)]
+
+    # Column-major copy so every column is one contiguous block
+    columns = {'timestamp': ts}
+    for j, col in enumerate(COLUMNS[1:], start=1):
+        columns[col] = np.ascontiguousarray(block[:, j])
+
+    series = {}
+    for start, end in zip(starts, ends):
+        series[keys[start]] = {col: arr[start:end] for col, arr in columns.items()}
+    return series
+
+if __name__ == "__main__":
+    import sys
+    symbols = sys.argv[1].split(',') if len(sys.argv) > 1 else ['BTC', 'ETH']
+    intervals = sys.argv[2].split(',') if len(sys.argv) > 2 else ['1h', '4h']
+
+    conn = sqlite3.connect(DB_PATH)
+    t0 = time.perf_counter()
+    batch = load_latest_batch(conn, symbols, intervals)
+    elapsed = (time.perf_counter() - t0) * 1000
+    conn.close()
+
+    for (symbol, interval), arrays in batch.items():
+        print(f"{symbol} {interval}: {len(arrays['timestamp'])} candles, last close {arrays['close'][-1]}")
+    print(f"Loaded {len(batch)} series in {elapsed:.1f} ms")
@@ -0,0 +1,202 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+import numpy as np
+
+from market_data import DB_PATH, INTERVAL_MS, list_series, load_latest_rows
+
+# --- Market Snapshot Engine ---
+# Indicator panel (RSI / SMA50 / Bollinger / ATR) for every coin x interval in the DB.
+# All series are right-aligned into one (n_series, LOOKBACK) matrix per column (NaN
+# left-padded) and every indicator is computed for all rows at once. Results are cached
+# with a per-series watermark (newest timestamp + close); only series whose newest
+# candle changed are recomputed. Formulas follow pandas_ta's defaults.
+
+SNAPSHOT_PATH = "/home/manni/.openclaw/workspace/trading/dashboard/data/market_snapshot.json"
+LOOKBACK = 200
+RSI_LENGTH = 14
+SMA_LENGTH = 50
+BB_LENGTH = 20
+BB_STD = 2.0
+ATR_LENGTH = 14
+
+# --- Loading ---
+def load_matrices(conn, keys, lookback=LOOKBACK):
+    """
+    Last `lookback` high/low/close of every (symbol, interval) in `keys`, right-aligned
+    into NaN-padded (len(keys), lookback) matrices. One statement: per series one index
+    seek finds the cutoff timestamp, then a range scan; rows carry the series number
+    instead of symbol/interval strings.
+    """
+    values = ','.join(['(?, ?, ?)'] * len(keys))
+    rows = conn.execute(f"""
+        WITH series(idx, symbol, interval) AS (VALUES {values})
+        SELECT series.idx, c.high, c.low, c.close
+        FROM series JOIN candles c
+          ON c.symbol = series.symbol AND c.interval = series.interval
+         AND c.timestamp >= IFNULL((
+                SELECT timestamp FROM candles
+                WHERE symbol = series.symbol AND interval = series.interval
+                ORDER BY timestamp DESC LIMIT 1 OFFSET ?), 0)
+        ORDER BY series.idx, c.timestamp
+    """, [v for i, key in enumerate(keys) for v in (i,) + tuple(key)] + [lookback - 1]).fetchall()
+
+    matrices = {col: np.full((len(keys), lookback), np.nan) for col in ('high', 'low', 'close')}
+    if not rows:
+        return matrices
+    block = np.array(rows, dtype=np.float64)
+    idx = block[:, 0].astype(np.int64)
+    counts = np.bincount(idx, minlength=len(keys))
+    starts = np.cumsum(counts) - counts
+    # Position inside the right-aligned row: rank within the series, shifted by the padding
+    cols = lookback - counts[idx] + (np.arange(len(idx)) - starts[idx])
+    for j, col in enumerate(('high', 'low', 'close'), start=1):
+        matrices[col][idx, cols] = block[:, j]
+    return matrices
+
+# --- Vectorized Indicators (row = series, column = time) ---
+def ewm_mean(x, alpha, min_periods):
+    """pandas ewm(alpha, min_periods, adjust=True).mean() along axis 1, NaN = missing."""
+    out = np.full(x.shape, np.nan)
+    num = np.zeros(x.shape[0])
+    den = np.zeros(x.shape[0])
+    count = np.zeros(x.shape[0])
+    decay = 1.0 - alpha
+    for j in range(x.shape[1]):
+        valid = ~np.isnan(x[:, j])
+        num = num * decay + np.where(valid, x[:, j], 0.0)
+        den = den * decay + valid
+        count += valid
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[:, j] = np.where(count >= min_periods, num / den, np.nan)
+    return out
+
+def rma(x, length):
+    return ewm_mean(x, 1.0 / length, length)
+
+def rsi_last(close, length=RSI_LENGTH):
+    diff = np.diff(close, axis=1, prepend=np.nan)
+    up = rma(np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0)), length)
+    down = rma(np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0)), length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (100 * up / (up + down))[:, -1]
+
+def atr_last(high, low, close, length=ATR_LENGTH):
+    prev = np.roll(close, 1, axis=1)
+    prev[:, 0] = np.nan
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(prev - low)))
+    tr[np.isnan(prev)] = np.nan
+    return rma(tr, length)[:, -1]
+
+def compute_panel(matrices):
+    """Latest indicator values of every row, {name: array}."""
+    high, low, close = matrices['high'], matrices['low'], matrices['close']
+    last = close[:, -1]
+    prev = close[:, -2]
+
+    # Rows with NaN padding inside the window give NaN, like min_periods=length
+    sma = close[:, -SMA_LENGTH:].mean(axis=1)
+    bb_win = close[:, -BB_LENGTH:]
+    bb_mid = bb_win.mean(axis=1)
+    bb_std = bb_win.std(axis=1, ddof=0)
+    bb_upper = bb_mid + BB_STD * bb_std
+    bb_lower = bb_mid - BB_STD * bb_std
+    atr = atr_last(high, low, close)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'close': last,
+            'change_pct': (last / prev - 1) * 100,
+            'rsi': rsi_last(close),
+            'sma50': sma,
+            'dist_sma_pct': (last / sma - 1) * 100,
+            'bb_lower': bb_lower,
+            'bb_mid': bb_mid,
+            'bb_upper': bb_upper,
+            'bb_pct': (last - bb_lower) / (bb_upper - bb_lower),
+            'bb_width': (bb_upper - bb_lower) / bb_mid * 100,
+            'atr': atr,
+            'atr_pct': atr / last * 100
+        }
+
+# --- Snapshot ---
+def series_key(symbol, interval):
+    return f"{symbol}|{interval}"
+
+def compute_rows(conn, keys, marks):
+    """One batched load + one vectorized pass for the given (symbol, interval) keys."""
+    if not keys:
+        return {}
+    panel = compute_panel(load_matrices(conn, keys))
+    rows = {}
+    for r, (symbol, interval) in enumerate(keys):
+        row = {'symbol': symbol, 'interval': interval, 'timestamp': marks[(symbol, interval)][0]}
+        for name, values in panel.items():
+            value = float(values[r])
+            row[name] = None if np.isnan(value) else round(value, 6)
+        rows[series_key(symbol, interval)] = row
+    return rows
+
+def market_snapshot(conn, cache_path=SNAPSHOT_PATH, force=False):
+    """
+    Indicator panel of every series in the DB. Reuses the cached rows of series whose
+    watermark is unchanged. Returns (rows sorted by symbol/interval, number recomputed).
+    """
+    pairs = [p for p in list_series(conn) if p[1] in INTERVAL_MS]
+    marks = load_latest_rows(conn, pairs)
+
+    cache = {'watermarks': {}, 'rows': {}}
+    if not force and cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    stale = [key for key in marks if cache['watermarks'].get(series_key(*key)) != list(marks[key])]
+    rows = {k: v for k, v in cache['rows'].items() if tuple(k.split('|')) in marks}
+    rows.update(compute_rows(conn, stale, marks))
+
+    if stale and cache_path:
+        cache = {
+            'generated': int(time.time() * 1000),
+            'watermarks': {series_key(*key): list(mark) for key, mark in marks.items()},
+            'rows': rows
+        }
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp = cache_path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(cache, f, separators=(',', ':'))
+        os.replace(tmp, cache_path)
+
+    return [rows[k] for k in sorted(rows)], len(stale)
+
+def fmt(value, spec):
+    return format(value, spec) if value is not None else '-'
+
+def print_table(rows):
+    print(f"{'SYMBOL':<7} {'INT':<4} {'CLOSE':>12} {'CHG%':>7} {'RSI':>6} {'SMA50':>12} {'vsSMA%':>7} {'BB%B':>6} {'BBW%':>6} {'ATR%':>6}")
+    for r in rows:
+        print(f"{r['symbol']:<7} {r['interval']:<4} {fmt(r['close'], '12.4f')} {fmt(r['change_pct'], '7.2f')} "
+              f"{fmt(r['rsi'], '6.1f')} {fmt(r['sma50'], '12.4f')} {fmt(r['dist_sma_pct'], '7.2f')} "
+              f"{fmt(r['bb_pct'], '6.2f')} {fmt(r['bb_width'], '6.2f')} {fmt(r['atr_pct'], '6.2f')}")
+
+def print_snapshot(db_path=DB_PATH, as_json=False, force=False):
+    conn = sqlite3.connect(db_path)
+    t0 = time.perf_counter()
+    rows, recomputed = market_snapshot(conn, force=force)
+    elapsed = (time.perf_counter() - t0) * 1000
+    conn.close()
+
+    if as_json:
+        print(json.dumps(rows))
+    else:
+        print_table(rows)
+        print(f"{len(rows)} series, {recomputed} recomputed in {elapsed:.1f} ms")
+
+if __name__ == "__main__":
+    # Usage: market_snapshot.py [--json] [--force] [db_path]
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    print_snapshot(args[0] if args else DB_PATH, as_json='--json' in sys.argv, force='--force' in sys.argv)
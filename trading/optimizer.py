@@ -4,8 +4,19 @@ import pandas_ta as ta
 import numpy as np
 from datetime import datetime
 
+from pivots import find_pivots, divergence_signal
+from market_data import INTERVAL_MS
+from perp_history import funding_cost_index
+
 # --- Configuration ---
 DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
+CHARGE_FUNDING = True # Perp funding on open positions from perp_history (no-op where none is stored)
+
+# Optimization Parameters
+SYMBOLS = ['BTC', 'ETH', 'SOL', 'BNB', 'ARB', 'OP', 'SUI', 'MATIC', 'LINK', 'DOGE']
+INTERVALS = ['15m', '1h', '4h']
+RSI_THRESHOLDS = [ (30, 70), (35, 65), (40, 60), (45, 55) ] # Added more range
+SL_TP_RATIOS = [ (0.01, 0.02), (0.02, 0.04), (0.03, 0.06), (0.02, 0.06), (0.05, 0.10) ]
 
 # --- Strategy Logic ---
 def detect_divergence_signals(df, rsi_length, rsi_oversold, rsi_overbought, lookback=2):
@@ -22,12 +33,9 @@ def detect_divergence_signals(df, rsi_length, rsi_oversold, rsi_overbought, look
     lows = df['low']
     highs = df['high']
     
-    # Rolling min/max to find pivots
-    # Using shift to align "future" lookahead for pivot definition
-    # pivot low at i means low[i] < low[i-n...i+n]
-    # We can use rolling(window=2n+1, center=True)
-    is_pl = (lows.rolling(window=2*n+1, center=True).min() == lows).fillna(False)
-    is_ph = (highs.rolling(window=2*n+1, center=True).max() == highs).fillna(False)
+    # Pivot low at i means low[i] is the min of low[i-n...i+n].
+    # Same definition as the live scanner (see pivots.py).
+    c_is_pl, c_is_ph = find_pivots(lows.values, highs.values, n)
     
     # We need to iterate to compare pivots (vectorizing pivot-to-pivot is hard)
     signals = np.zeros(len(df))
@@ -39,8 +47,6 @@ def detect_divergence_signals(df, rsi_length, rsi_oversold, rsi_overbought, look
     c_lows = lows.values
     c_highs = highs.values
     c_rsi = rsi.values
-    c_is_pl = is_pl.values
-    c_is_ph = is_ph.values
     
     # Loop starts after RSI warmup
     for i in range(rsi_length + n, len(df) - n):
@@ -50,36 +56,37 @@ def detect_divergence_signals(df, rsi_length, rsi_oversold, rsi_overbought, look
         # Bullish Div Check
         if c_is_pl[pivot_idx]:
             if last_pl_idx != -1:
-                # Compare current pivot with last pivot
-                if c_lows[pivot_idx] < c_lows[last_pl_idx] and \
-                   c_rsi[pivot_idx] > c_rsi[last_pl_idx]:
-                    # Filter: RSI Oversold
-                    if c_rsi[pivot_idx] < rsi_oversold:
-                         signals[i] = 1 # Long Signal
+                # Compare current pivot with last pivot (Filter: RSI Oversold)
+                signals[i] = divergence_signal('low', c_lows[last_pl_idx], c_rsi[last_pl_idx],
+                                               c_lows[pivot_idx], c_rsi[pivot_idx],
+                                               rsi_oversold, rsi_overbought)
             last_pl_idx = pivot_idx
 
         # Bearish Div Check
         if c_is_ph[pivot_idx]:
             if last_ph_idx != -1:
-                # Compare current pivot with last pivot
-                if c_highs[pivot_idx] > c_highs[last_ph_idx] and \
-                   c_rsi[pivot_idx] < c_rsi[last_ph_idx]:
-                    # Filter: RSI Overbought
-                    if c_rsi[pivot_idx] > rsi_overbought:
-                         signals[i] = -1 # Short Signal
+                # Compare current pivot with last pivot (Filter: RSI Overbought)
+                bearish = divergence_signal('high', c_highs[last_ph_idx], c_rsi[last_ph_idx],
+                                            c_highs[pivot_idx], c_rsi[pivot_idx],
+                                            rsi_oversold, rsi_overbought)
+                if bearish:
+                    signals[i] = bearish
             last_ph_idx = pivot_idx
             
     return signals
 
-def run_backtest_fast(df, signals, sl_pct, tp_pct):
+def run_backtest_fast(df, signals, sl_pct, tp_pct, funding=None):
     """
     Fast backtest for optimization loop. Returns Total Return %.
     Assumes initial capital 1000.
+    funding: optional per-candle cumulative funding per unit held long
+    (perp_history.funding_cost_index), charged once per trade on exit.
     """
     initial_capital = 1000.0
     capital = initial_capital
     position = 0.0 # size
     entry_price = 0.0
+    entry_idx = 0
     
     closes = df['close'].values
     
@@ -112,6 +119,10 @@ def run_backtest_fast(df, signals, sl_pct, tp_pct):
                     closed = True
             
             if closed:
+                if funding is not None:
+                    paid = position * (funding[i] - funding[entry_idx])
+                    capital -= paid
+                    pnl -= paid
                 if pnl > 0: wins += 1
                 else: losses += 1
                 position = 0
@@ -122,6 +133,7 @@ def run_backtest_fast(df, signals, sl_pct, tp_pct):
             if signal == 1: # LONG
                 position = capital / price
                 entry_price = price
+                entry_idx = i
                 capital -= (position * price)
                 stop_price = price * (1.0 - sl_pct)
                 target_price = price * (1.0 + tp_pct)
@@ -130,6 +142,7 @@ def run_backtest_fast(df, signals, sl_pct, tp_pct):
                 size = capital / price
                 position = -size
                 entry_price = price
+                entry_idx = i
                 capital -= (size * price)
                 stop_price = price * (1.0 + sl_pct)
                 target_price = price * (1.0 - tp_pct)
@@ -141,54 +154,60 @@ def run_backtest_fast(df, signals, sl_pct, tp_pct):
         else:
             pnl = (entry_price - closes[-1]) * abs(position)
             final_val = capital + (abs(position) * entry_price) + pnl
+        if funding is not None:
+            final_val -= position * (funding[-1] - funding[entry_idx])
     else:
         final_val = capital
         
     ret = ((final_val - initial_capital) / initial_capital) * 100
     return ret, wins, losses
 
+def optimize_series(symbol, interval, df, funding=None):
+    """The parameter grid on one series. Returns one result row per setting that traded."""
+    results = []
+    for (oversold, overbought) in RSI_THRESHOLDS:
+        # Pre-calculate signals for this RSI setting
+        signals = detect_divergence_signals(df, 14, oversold, overbought)
+        
+        if np.sum(np.abs(signals)) == 0:
+            continue # No signals generated
+        
+        for (sl, tp) in SL_TP_RATIOS:
+            ret, w, l = run_backtest_fast(df, signals, sl, tp, funding)
+            
+            results.append({
+                'Symbol': symbol,
+                'Interval': interval,
+                'RSI_Set': f"{oversold}/{overbought}",
+                'SL_TP': f"{sl*100:.0f}%/{tp*100:.0f}%",
+                'Return%': ret,
+                'Trades': w + l,
+                'WinRate': (w/(w+l)*100) if (w+l)>0 else 0
+            })
+    return results
+
 def optimize():
     conn = sqlite3.connect(DB_PATH)
     
-    # Optimization Parameters
-    symbols = ['BTC', 'ETH', 'SOL', 'BNB', 'ARB', 'OP', 'SUI', 'MATIC', 'LINK', 'DOGE']
-    intervals = ['15m', '1h', '4h']
-    
-    rsi_thresholds = [ (30, 70), (35, 65), (40, 60), (45, 55) ] # Added more range
-    sl_tp_ratios = [ (0.01, 0.02), (0.02, 0.04), (0.03, 0.06), (0.02, 0.06), (0.05, 0.10) ]
-    
     results = []
     
     print("Starting Optimization Run...", flush=True)
     
-    for symbol in symbols:
-        for interval in intervals:
+    for symbol in SYMBOLS:
+        for interval in INTERVALS:
             # Load Data Once
             query = f"SELECT timestamp, open, high, low, close, volume FROM candles WHERE symbol='{symbol}' AND interval='{interval}' ORDER BY timestamp ASC"
             df = pd.read_sql_query(query, conn)
             if df.empty: continue
             
             print(f"Testing {symbol} {interval} ({len(df)} candles)...", flush=True)
-            
-            for (oversold, overbought) in rsi_thresholds:
-                # Pre-calculate signals for this RSI setting
-                signals = detect_divergence_signals(df, 14, oversold, overbought)
-                
-                if np.sum(np.abs(signals)) == 0:
-                    continue # No signals generated
-                
-                for (sl, tp) in sl_tp_ratios:
-                    ret, w, l = run_backtest_fast(df, signals, sl, tp)
-                    
-                    results.append({
-                        'Symbol': symbol,
-                        'Interval': interval,
-                        'RSI_Set': f"{oversold}/{overbought}",
-                        'SL_TP': f"{sl*100:.0f}%/{tp*100:.0f}%",
-                        'Return%': ret,
-                        'Trades': w + l,
-                        'WinRate': (w/(w+l)*100) if (w+l)>0 else 0
-                    })
+            funding = None
+            if CHARGE_FUNDING:
+                try:
+                    funding = funding_cost_index(conn, symbol, df['timestamp'].values, df['close'].values, INTERVAL_MS[interval])
+                except sqlite3.OperationalError:
+                    pass # No perp_history table yet
+            results.extend(optimize_series(symbol, interval, df, funding))
     
     conn.close()
     
@@ -0,0 +1,203 @@
+import sqlite3
+import sys
+import time
+import numpy as np
+
+import sync_hyperliquid as sync
+
+# --- Funding / Open Interest History ---
+# Perp context per coin on a fixed hourly grid, stored column-wise: one row per
+# (symbol, field, UTC day) holding the day's 24 hourly values as a float64 blob (NaN =
+# no value). A range load is a handful of blob reads, and aligning to any candle series
+# is index arithmetic on the grid ((ts - grid start) // 1h), no per-row merge.
+#   funding / premium - fundingHistory (hourly, paid at the top of the hour)
+#   oi / mark         - metaAndAssetCtxs, sampled once per pipeline cycle; the API has
+#                       no OI history, so it accrues from the first sample on (last
+#                       sample of an hour wins)
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+FIELDS = ['funding', 'premium', 'oi', 'mark']
+
+FUNDING_LOOKBACK_DAYS = 365
+FUNDING_PER_REQUEST = 500   # Response cap of fundingHistory
+FUNDING_ITEMS_PER_WEIGHT = 20
+FUNDING_MAX_TIER = 1        # Universe tiers whose funding history is synced (core + active)
+
+def init_perp_history(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS perp_history (
+            symbol TEXT,
+            field TEXT,
+            day INTEGER,
+            data BLOB,
+            PRIMARY KEY (symbol, field, day)
+        )
+    ''')
+
+# --- Storage ---
+def write_hours(conn, symbol, field, ts, values):
+    """Puts values at the hour slots of `ts` (rounded to the nearest hour), merging into the stored days."""
+    if not len(ts):
+        return
+    slots = np.rint(np.asarray(ts, dtype=np.float64) / HOUR_MS).astype(np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    days = slots // 24
+    rows = []
+    for day in np.unique(days).tolist():
+        row = conn.execute("SELECT data FROM perp_history WHERE symbol = ? AND field = ? AND day = ?",
+                           (symbol, field, day * DAY_MS)).fetchone()
+        block = np.frombuffer(row[0], dtype=np.float64).copy() if row else np.full(24, np.nan)
+        mask = days == day
+        block[slots[mask] - day * 24] = values[mask]
+        rows.append((symbol, field, day * DAY_MS, block.tobytes()))
+    conn.executemany("INSERT OR REPLACE INTO perp_history (symbol, field, day, data) VALUES (?, ?, ?, ?)", rows)
+
+def load_hours(conn, symbol, field, start_ms, end_ms):
+    """
+    Hourly values for [start_ms, end_ms) on the grid: (grid start ms, array), grid start
+    = the UTC day of start_ms. Days without a stored row are NaN.
+    """
+    first_day = start_ms // DAY_MS
+    n_days = max(0, -(-end_ms // DAY_MS) - first_day)
+    out = np.full(n_days * 24, np.nan)
+    rows = conn.execute("SELECT day, data FROM perp_history WHERE symbol = ? AND field = ? AND day >= ? AND day < ?",
+                        (symbol, field, first_day * DAY_MS, (first_day + n_days) * DAY_MS)).fetchall()
+    for day, data in rows:
+        k = (day // DAY_MS - first_day) * 24
+        out[k:k + 24] = np.frombuffer(data, dtype=np.float64)
+    return first_day * DAY_MS, out
+
+def newest_hour(conn, symbol, field):
+    """Open time of the newest stored non-NaN hour, or None."""
+    row = conn.execute("SELECT day, data FROM perp_history WHERE symbol = ? AND field = ? ORDER BY day DESC LIMIT 1",
+                       (symbol, field)).fetchone()
+    if row is None:
+        return None
+    filled = np.flatnonzero(~np.isnan(np.frombuffer(row[1], dtype=np.float64)))
+    return row[0] + int(filled[-1]) * HOUR_MS if len(filled) else row[0]
+
+# --- Alignment ---
+def grid_index(grid_start, ts):
+    return (np.asarray(ts, dtype=np.int64) - grid_start) // HOUR_MS
+
+def funding_per_candle(conn, symbol, timestamps, step):
+    """
+    Summed funding rate of the hours settled within each candle (open, open + step],
+    for candle open times `timestamps`. Missing hours count as 0.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if not len(timestamps):
+        return np.zeros(0)
+    grid_start, rates = load_hours(conn, symbol, 'funding', int(timestamps[0]), int(timestamps[-1]) + step + 1)
+    # cum[k] = sum of the rates settled at grid hours < k; hour h settles at grid_start + h * 1h
+    cum = np.r_[0.0, np.cumsum(np.nan_to_num(rates))]
+    lo = np.clip(grid_index(grid_start, timestamps) + 1, 0, len(rates))
+    hi = np.clip(grid_index(grid_start, timestamps + step) + 1, 0, len(rates))
+    return cum[hi] - cum[lo]
+
+def hourly_asof(conn, symbol, field, timestamps, step):
+    """
+    Latest stored value of `field` at each candle's close, forward-filled over missing
+    hours (looking back at most a day before the first candle), NaN before the first.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if not len(timestamps):
+        return np.zeros(0)
+    grid_start, values = load_hours(conn, symbol, field, int(timestamps[0]) - DAY_MS, int(timestamps[-1]) + step)
+    filled = np.flatnonzero(~np.isnan(values))
+    if not len(filled):
+        return np.full(len(timestamps), np.nan)
+    # Hour slot that contains the close, then the newest filled slot at or before it
+    slot = grid_index(grid_start, timestamps + step - 1)
+    pos = np.searchsorted(filled, slot, side='right') - 1
+    return np.where(pos >= 0, values[filled[np.maximum(pos, 0)]], np.nan)
+
+def funding_cost_index(conn, symbol, timestamps, closes, step):
+    """
+    Cumulative funding paid per unit of a long position, per candle: a position of
+    `size` (negative = short) held from candle i to candle j pays
+    size * (index[j] - index[i]). Each settlement is charged at its candle's close.
+    """
+    rates = funding_per_candle(conn, symbol, timestamps, step)
+    return np.cumsum(rates * np.asarray(closes, dtype=np.float64))
+
+# --- Sync ---
+def fetch_funding(coin, start_ms, end_ms):
+    """fundingHistory pages for [start_ms, end_ms], list of {'time', 'fundingRate', 'premium'}."""
+    out = []
+    while start_ms <= end_ms:
+        entry = sync.LIMITER.acquire(sync.REQUEST_WEIGHT + FUNDING_PER_REQUEST // FUNDING_ITEMS_PER_WEIGHT)
+        response = sync.requests.post(sync.API_URL, json={"type": "fundingHistory", "coin": coin,
+                                                          "startTime": start_ms, "endTime": end_ms},
+                                      headers={"Content-Type": "application/json"}, timeout=15)
+        if response.status_code == 429:
+            sync.LIMITER.settle(entry, sync.REQUEST_WEIGHT)
+            sync.LIMITER.pause(2)
+            continue
+        response.raise_for_status()
+        page = response.json()
+        sync.LIMITER.settle(entry, sync.REQUEST_WEIGHT + len(page) // FUNDING_ITEMS_PER_WEIGHT)
+        out.extend(page)
+        if len(page) < FUNDING_PER_REQUEST:
+            break
+        start_ms = page[-1]['time'] + 1
+    return out
+
+def sync_funding(conn, coin, now_ms):
+    """Fetches the funding hours after the newest stored one. Returns hours stored."""
+    newest = newest_hour(conn, coin, 'funding')
+    start = newest + HOUR_MS // 2 if newest is not None else now_ms - FUNDING_LOOKBACK_DAYS * DAY_MS
+    if now_ms - start < HOUR_MS // 2:
+        return 0 # Next settlement not due yet
+    rows = fetch_funding(coin, start, now_ms)
+    with conn:
+        write_hours(conn, coin, 'funding', [r['time'] for r in rows], [float(r['fundingRate']) for r in rows])
+        write_hours(conn, coin, 'premium', [r['time'] for r in rows], [float(r['premium']) for r in rows])
+    return len(rows)
+
+def record_asset_ctxs(conn, meta, now_ms):
+    """Samples open interest and mark price of every listed perp into the current hour."""
+    universe, ctxs = meta
+    with conn:
+        for asset, ctx in zip(universe['universe'], ctxs):
+            if asset.get('isDelisted'):
+                continue
+            for field, key in (('oi', 'openInterest'), ('mark', 'markPx')):
+                if ctx.get(key) is not None:
+                    write_hours(conn, asset['name'], field, [now_ms - now_ms % HOUR_MS], [float(ctx[key])])
+
+def funding_coins(conn):
+    """Watchlist, plus the universe's core/active tiers when the universe is synced."""
+    coins = list(sync.COINS)
+    if sync.SYNC_UNIVERSE:
+        try:
+            rows = conn.execute("SELECT symbol FROM universe WHERE tier <= ? ORDER BY tier, symbol", (FUNDING_MAX_TIER,)).fetchall()
+            coins += [r[0] for r in rows if r[0] not in coins]
+        except sqlite3.OperationalError:
+            pass # No universe table yet
+    return coins
+
+def sync_perp(stub_path=None):
+    """One pipeline cycle: OI/mark sample for every perp, then funding for the coins that have a settlement due."""
+    from universe import fetch_meta, UNIVERSE_STUB_PATH
+    conn = sqlite3.connect(sync.DB_PATH, timeout=30)
+    init_perp_history(conn)
+    now_ms = int(time.time() * 1000)
+    t0 = time.time()
+    record_asset_ctxs(conn, fetch_meta(stub_path or UNIVERSE_STUB_PATH), now_ms)
+    stored = {}
+    for coin in funding_coins(conn):
+        try:
+            stored[coin] = sync_funding(conn, coin, now_ms)
+        except Exception as e:
+            print(f"  {coin}: funding sync failed: {e}", flush=True)
+    conn.close()
+    print(f"Perp history: OI sampled, funding for {sum(1 for n in stored.values() if n)} of {len(stored)} coins "
+          f"({sum(stored.values())} hours) in {time.time() - t0:.1f}s", flush=True)
+
+if __name__ == "__main__":
+    # Usage: perp_history.py [--stub PATH]   (metaAndAssetCtxs from a saved response, see universe.py --record)
+    args = sys.argv[1:]
+    sync.init_db()
+    sync_perp(args[args.index('--stub') + 1] if '--stub' in args else None)
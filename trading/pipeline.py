@@ -0,0 +1,238 @@
+import fcntl
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from correlation import CORR_INTERVAL, update_correlation
+from market_data import INTERVAL_MS, list_series, load_latest_rows
+from position_tracker import TRACK_INTERVAL
+from resample import SOURCE_INTERVAL, resample_candles
+from signal_store import DB_PATH, connect
+from snapshot import SNAPSHOT_EVERY_MS
+
+# data_exporter lives in dashboard/ (no pandas, cheap to import)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard"))
+from data_exporter import MACD_PATH, PRICE_INTERVAL, trade_files
+
+# --- Pipeline Runner ---
+# The cron chain as one DAG:
+#   ingest -> resample -> indicators
+#   ingest -> scan -> track -> export
+#   ingest -> perp (OI sample + due funding hours)
+#   ingest -> correlation (rolling return correlation / beta matrix, read by scan and export)
+#   indicators + export + perp + correlation -> backup (once a day, after every writer of the cycle)
+# Every stage declares its inputs (series watermarks, signal store, files). A stage runs
+# only if the signature of its inputs differs from the one stored after its last
+# successful run, so an idle cycle costs a few index seeks. Stages whose dependencies
+# are done run in parallel threads with their own connections. A failed stage keeps its
+# old signature (retried next cycle) and blocks its dependents for this cycle.
+
+PIPELINE_STATE_PATH = "/home/manni/.openclaw/workspace/trading/data/pipeline_state.json"
+INGEST_EVERY_MS = INTERVAL_MS['15m']  # Sync once per close of the finest synced interval
+SCAN_INTERVALS = ['1h', '4h']         # alert_scanner.INTERVALS (not imported: pulls in pandas_ta)
+WORKERS = 4
+
+# --- Inputs ---
+# Each input is a probe conn -> JSON-able value; the stage's signature hashes them all.
+def clock(step):
+    def probe(conn):
+        return int(time.time() * 1000) // step
+    return probe
+
+def candles(intervals=None, closes=True):
+    """Newest (timestamp, close) of every series, or only its open time (closes=False)."""
+    def probe(conn):
+        pairs = [p for p in list_series(conn) if intervals is None or p[1] in intervals]
+        latest = load_latest_rows(conn, pairs)
+        return sorted([s, i, ts, c if closes else None] for (s, i), (ts, c) in latest.items())
+    return probe
+
+def signals(status=True):
+    """Newest signal id, plus the number still ACTIVE (changes when positions close)."""
+    def probe(conn):
+        try:
+            if status:
+                return conn.execute("SELECT MAX(id), (SELECT COUNT(*) FROM signals WHERE status = 'ACTIVE') FROM signals").fetchone()
+            return conn.execute("SELECT MAX(id) FROM signals").fetchone()
+        except sqlite3.OperationalError:
+            return None # No signals table yet
+    return probe
+
+def export_files(conn):
+    """mtimes of the strategy result files the exporter reads."""
+    return [[p, os.path.getmtime(p) if os.path.exists(p) else None] for p in trade_files() + [MACD_PATH]]
+
+def signature(inputs, conn):
+    blob = json.dumps([probe(conn) for probe in inputs], separators=(',', ':'))
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+# --- Stages ---
+# Heavy imports happen inside the stages, so skipped stages never load pandas & co.
+def run_ingest(conn):
+    from sync_hyperliquid import run_sync
+    run_sync()
+
+def run_resample(conn):
+    written = resample_candles(conn)
+    print(f"Resampled {SOURCE_INTERVAL} -> " + ", ".join(f"{t}: {n} candles" for t, n in written.items()), flush=True)
+
+def run_indicators(conn):
+    from market_snapshot import market_snapshot
+    rows, recomputed = market_snapshot(conn)
+    print(f"Snapshot: {len(rows)} series, {recomputed} recomputed", flush=True)
+
+def run_scan(conn):
+    from alert_scanner import check_signals
+    check_signals()
+
+def run_track(conn):
+    from position_tracker import track_positions
+    track_positions()
+
+def run_export(conn):
+    from data_exporter import export_data
+    export_data()
+
+def run_perp(conn):
+    from perp_history import sync_perp
+    sync_perp()
+
+def run_correlation(conn):
+    update_correlation()
+
+def run_backup(conn):
+    from snapshot import take_snapshot
+    take_snapshot()
+
+# name: (function, dependencies, inputs)
+STAGES = {
+    'ingest': (run_ingest, [], [clock(INGEST_EVERY_MS)]),
+    'resample': (run_resample, ['ingest'], [candles([SOURCE_INTERVAL])]),
+    'indicators': (run_indicators, ['resample'], [candles()]),
+    'scan': (run_scan, ['ingest'], [candles(SCAN_INTERVALS, closes=False)]),
+    'track': (run_track, ['scan'], [candles([TRACK_INTERVAL]), signals(status=False)]),
+    'export': (run_export, ['track'], [candles([PRICE_INTERVAL]), signals(), export_files]),
+    'perp': (run_perp, ['ingest'], [clock(INGEST_EVERY_MS)]),
+    'correlation': (run_correlation, ['ingest'], [candles([CORR_INTERVAL], closes=False)]),
+    'backup': (run_backup, ['indicators', 'export', 'perp', 'correlation'], [clock(SNAPSHOT_EVERY_MS)]),
+}
+
+# --- Execution ---
+def run_stage(name, last_signature, force):
+    """Returns (status, new signature or None, probe ms, run ms)."""
+    fn, _, inputs = STAGES[name]
+    conn = connect(DB_PATH)
+    try:
+        t0 = time.perf_counter()
+        sig = signature(inputs, conn)
+        probe_ms = (time.perf_counter() - t0) * 1000
+        if sig == last_signature and not force:
+            return 'skipped', None, probe_ms, 0.0
+        t0 = time.perf_counter()
+        try:
+            fn(conn)
+        except Exception:
+            print(f"Stage {name} failed:", flush=True)
+            traceback.print_exc()
+            return 'failed', None, probe_ms, (time.perf_counter() - t0) * 1000
+        return 'ran', sig, probe_ms, (time.perf_counter() - t0) * 1000
+    finally:
+        conn.close()
+
+def load_state(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'stages': {}}
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, path)
+
+def run_cycle(force=(), skip=(), state_path=PIPELINE_STATE_PATH, workers=WORKERS):
+    """One pass over the DAG. Returns {stage: (status, probe ms, run ms)}."""
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    lock = open(state_path + ".lock", 'w')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        print("Previous pipeline cycle still running, skipping.", flush=True)
+        lock.close()
+        return {}
+
+    t0 = time.perf_counter()
+    state = load_state(state_path)
+    results = {}
+    pending = [name for name in STAGES if name not in skip]
+    results.update({name: ('off', 0.0, 0.0) for name in skip if name in STAGES})
+    running = {}
+    try:
+        with ThreadPoolExecutor(workers) as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = STAGES[name][1]
+                    if not all(d in results for d in deps):
+                        continue
+                    pending.remove(name)
+                    if any(results[d][0] in ('failed', 'blocked') for d in deps):
+                        results[name] = ('blocked', 0.0, 0.0)
+                        continue
+                    last = state['stages'].get(name, {}).get('inputs')
+                    running[pool.submit(run_stage, name, last, name in force)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    status, sig, probe_ms, run_ms = future.result()
+                    results[name] = (status, probe_ms, run_ms)
+                    if sig is not None:
+                        state['stages'][name] = {'inputs': sig, 'ran': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                                                 'ms': round(run_ms, 1)}
+
+        total_ms = (time.perf_counter() - t0) * 1000
+        state['last_cycle'] = {'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'ms': round(total_ms, 1),
+                               'stages': {n: r[0] for n, r in results.items()}}
+        save_state(state_path, state)
+    finally:
+        lock.close()
+
+    print(f"Pipeline cycle in {total_ms:.1f} ms")
+    for name in STAGES:
+        status, probe_ms, run_ms = results[name]
+        print(f"  {name:<11} {status:<8} probe {probe_ms:7.1f} ms  run {run_ms:9.1f} ms")
+    return results
+
+def sync_cycle(*args):
+    """Sync now, then every downstream stage whose inputs advanced (cron 'sync' job)."""
+    return run_cycle(force={'ingest'})
+
+def main(*args):
+    # Usage: pipeline.py [--all] [--force STAGE,...] [--skip STAGE,...]
+    args = list(args)
+    force, skip = set(), set()
+    for flag, target in (('--force', force), ('--skip', skip)):
+        if flag in args:
+            i = args.index(flag)
+            target.update(args[i + 1].split(','))
+            del args[i:i + 2]
+    if '--all' in args:
+        force.update(STAGES)
+    unknown = (force | skip) - set(STAGES)
+    if unknown:
+        print(f"Unknown stages: {', '.join(sorted(unknown))} (known: {', '.join(STAGES)})")
+        return
+    run_cycle(force, skip)
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
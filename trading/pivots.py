@@ -0,0 +1,103 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Single pivot definition shared by optimizer.py (backtests) and alert_scanner.py (live):
+# bar p is a pivot low if low[p] is the minimum of low[p-n ... p+n] (ties allowed),
+# same as rolling(window=2n+1, center=True).min() == low. It is confirmed at bar p+n.
+PIVOT_LOOKBACK = 2
+MAX_PIVOTS = 100 # Per kind; older pivots are never "previous" again once newer ones exist
+
+def find_pivots(lows, highs, n=PIVOT_LOOKBACK):
+    """
+    Vectorized pivot detection. Returns (is_pivot_low, is_pivot_high) boolean arrays.
+    The first and last n bars can never be pivots (incomplete window).
+    """
+    lows = np.asarray(lows, dtype=np.float64)
+    highs = np.asarray(highs, dtype=np.float64)
+    is_pl = np.zeros(len(lows), dtype=bool)
+    is_ph = np.zeros(len(highs), dtype=bool)
+    if len(lows) < 2 * n + 1:
+        return is_pl, is_ph
+
+    window = 2 * n + 1
+    is_pl[n:len(lows) - n] = sliding_window_view(lows, window).min(axis=1) == lows[n:len(lows) - n]
+    is_ph[n:len(highs) - n] = sliding_window_view(highs, window).max(axis=1) == highs[n:len(highs) - n]
+    return is_pl, is_ph
+
+def divergence_signal(kind, prev_price, prev_rsi, price, rsi, rsi_oversold, rsi_overbought):
+    """
+    Regular divergence between a pivot and the previous pivot of the same kind.
+    Returns 1 (bullish, on pivot lows), -1 (bearish, on pivot highs) or 0.
+    """
+    if kind == 'low':
+        if price < prev_price and rsi > prev_rsi and rsi < rsi_oversold:
+            return 1
+    elif kind == 'high':
+        if price > prev_price and rsi < prev_rsi and rsi > rsi_overbought:
+            return -1
+    return 0
+
+class PivotIndex:
+    """
+    Confirmed pivot lows/highs of one series, kept as timestamp-sorted arrays with the
+    pivot price and RSI at the time of confirmation.
+
+    update() only looks at bars newer than the last confirmation it processed, so a
+    resident scanner pays O(new bars) per candle, and the previous pivot is always the
+    last entry (O(1) lookup instead of a backward search).
+    """
+
+    def __init__(self, lookback=PIVOT_LOOKBACK):
+        self.n = lookback
+        self.lows = {'ts': [], 'price': [], 'rsi': []}
+        self.highs = {'ts': [], 'price': [], 'rsi': []}
+        self.confirmed_ts = None # Timestamp of the last bar processed as confirmation bar
+
+    def previous(self, kind):
+        """Latest confirmed pivot of a kind as (ts, price, rsi), or None."""
+        book = self.lows if kind == 'low' else self.highs
+        if not book['ts']:
+            return None
+        return book['ts'][-1], book['price'][-1], book['rsi'][-1]
+
+    def update(self, timestamps, lows, highs, rsi):
+        """
+        Processes confirmation bars after the last call. Arrays are the current (rolling)
+        window of the series, sorted ascending. Returns the newly confirmed pivots as dicts
+        with the previous pivot of the same kind attached.
+        """
+        n = self.n
+        first = 2 * n
+        if self.confirmed_ts is not None:
+            first = max(first, int(np.searchsorted(timestamps, self.confirmed_ts, side='right')))
+        if first >= len(timestamps):
+            return []
+
+        # Only the slice that can contain new pivots (plus the window they need)
+        lo = first - 2 * n
+        is_pl, is_ph = find_pivots(lows[lo:], highs[lo:], n)
+
+        events = []
+        for i in range(first, len(timestamps)):
+            p = i - n
+            for kind, flags, prices, book in (('low', is_pl, lows, self.lows), ('high', is_ph, highs, self.highs)):
+                if not flags[p - lo]:
+                    continue
+                prev = self.previous(kind)
+                book['ts'].append(int(timestamps[p]))
+                book['price'].append(float(prices[p]))
+                book['rsi'].append(float(rsi[p]))
+                if len(book['ts']) > MAX_PIVOTS:
+                    for values in book.values():
+                        del values[0]
+                events.append({
+                    'kind': kind,
+                    'pivot_ts': int(timestamps[p]),
+                    'confirm_ts': int(timestamps[i]),
+                    'price': float(prices[p]),
+                    'rsi': float(rsi[p]),
+                    'prev': prev
+                })
+
+        self.confirmed_ts = int(timestamps[-1])
+        return events
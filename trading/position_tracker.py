@@ -0,0 +1,174 @@
+import time
+from datetime import datetime
+
+from market_data import INTERVAL_MS, load_range_batch
+from signal_store import DB_PATH, connect, init_signal_store
+
+# --- Position Tracker ---
+# Keeps ACTIVE signals in memory, keyed by symbol. Each new candle is checked only
+# against the open positions of its symbol (SL/TP via the bar's high/low), and status
+# changes are written back in one batch. Work per candle ~ open positions of that coin.
+# Every position keeps a watermark (signals.checked_ts, last closed candle checked), so
+# a run - or the daemon after a restart - replays exactly the candles closed since.
+
+# Candles used to check open positions (finer than the signal intervals)
+TRACK_INTERVAL = '1h'
+
+class PositionTracker:
+    def __init__(self, conn):
+        self.conn = conn
+        self.open = {}       # symbol -> list of open positions
+        self.updates = []    # pending (status, profit_loss, exit_price, closed_ts, id)
+        self.checked = {}    # pending id -> checked_ts of positions still open
+
+    def load(self):
+        """Loads all ACTIVE signals (idx_signals_status)."""
+        self.open = {}
+        rows = self.conn.execute('''
+            SELECT id, symbol, interval, signal, entry_price, sl_price, tp_price, candle_ts, checked_ts
+            FROM signals WHERE status = 'ACTIVE'
+        ''').fetchall()
+        for r in rows:
+            self.add({'id': r[0], 'symbol': r[1], 'interval': r[2], 'signal': r[3],
+                      'entry': r[4], 'sl': r[5], 'tp': r[6], 'candle_ts': r[7]}, checked_ts=r[8])
+        return len(rows)
+
+    def add(self, position, checked_ts=None):
+        """
+        Starts tracking a position. Entry happens at the close of the signal candle,
+        so only candles opening at or after that time can hit SL/TP, and only those
+        after `checked_ts` (already checked by an earlier run).
+        """
+        step = INTERVAL_MS.get(position['interval'], 0)
+        position['entry_ts'] = (position['candle_ts'] or 0) + step
+        position['checked_ts'] = checked_ts if checked_ts is not None else -1
+        self.open.setdefault(position['symbol'], []).append(position)
+
+    def resume_ts(self):
+        """Open time of the oldest candle some open position still has to be checked against."""
+        step = INTERVAL_MS[TRACK_INTERVAL]
+        return min(max(p['entry_ts'], p['checked_ts'] + step) for positions in self.open.values() for p in positions)
+
+    def add_alerts(self, alerts):
+        """Tracks freshly stored scanner alerts (record_scan sets their id)."""
+        for a in alerts:
+            self.add({'id': a['id'], 'symbol': a['symbol'], 'interval': a['interval'],
+                      'signal': 'BUY' if a['type'].startswith('BUY') else 'SELL',
+                      'entry': a['price'], 'sl': a['sl'], 'tp': a['tp'], 'candle_ts': a['candle_ts']})
+
+    def open_count(self):
+        return sum(len(p) for p in self.open.values())
+
+    def on_candle(self, symbol, ts, high, low):
+        """
+        Checks one candle against the symbol's open positions. If SL and TP are both
+        inside the bar we assume the stop was hit first (conservative).
+        Returns the positions closed by this candle.
+        """
+        positions = self.open.get(symbol)
+        if not positions:
+            return []
+
+        closed = []
+        still_open = []
+        for pos in positions:
+            if ts < pos['entry_ts'] or ts <= pos['checked_ts']:
+                still_open.append(pos)
+                continue
+
+            exit_price = None
+            status = None
+            if pos['signal'] == 'BUY':
+                if low <= pos['sl']: exit_price, status = pos['sl'], 'CLOSED_SL'
+                elif high >= pos['tp']: exit_price, status = pos['tp'], 'CLOSED_TP'
+            else:
+                if high >= pos['sl']: exit_price, status = pos['sl'], 'CLOSED_SL'
+                elif low <= pos['tp']: exit_price, status = pos['tp'], 'CLOSED_TP'
+
+            if status is None:
+                still_open.append(pos)
+                continue
+
+            side = 1 if pos['signal'] == 'BUY' else -1
+            pnl_pct = side * (exit_price - pos['entry']) / pos['entry'] * 100
+            self.updates.append((status, pnl_pct, exit_price, int(ts), pos['id']))
+            pos.update({'status': status, 'profit_loss': pnl_pct, 'exit_price': exit_price})
+            closed.append(pos)
+
+        if still_open:
+            self.open[symbol] = still_open
+        else:
+            del self.open[symbol]
+        return closed
+
+    def on_candles(self, symbol, arrays, now_ms=None):
+        """
+        Feeds a block of candles ({column: array}, ascending) for one symbol. The watermark
+        of the positions left open moves to the newest candle closed at `now_ms` (None: all
+        candles of the block are closed); a forming candle is checked but counts again.
+        """
+        closed = []
+        ts, high, low = arrays['timestamp'], arrays['high'], arrays['low']
+        for i in range(len(ts)):
+            if symbol not in self.open:
+                break
+            closed.extend(self.on_candle(symbol, int(ts[i]), float(high[i]), float(low[i])))
+
+        done = ts if now_ms is None else ts[ts + INTERVAL_MS[TRACK_INTERVAL] <= now_ms]
+        if len(done):
+            for pos in self.open.get(symbol, []):
+                if int(done[-1]) > pos['checked_ts']:
+                    pos['checked_ts'] = int(done[-1])
+                    self.checked[pos['id']] = pos['checked_ts']
+        return closed
+
+    def catch_up(self, now_ms):
+        """Replays the candles closed since each open position's watermark (one query). Returns the positions closed."""
+        if not self.open:
+            return []
+        batch = load_range_batch(self.conn, sorted(self.open), TRACK_INTERVAL, self.resume_ts() - 1, now_ms + 1)
+        closed = []
+        for (symbol, _), arrays in batch.items():
+            closed.extend(self.on_candles(symbol, arrays, now_ms))
+        return closed
+
+    def flush(self):
+        """Writes pending status changes and watermarks in one transaction. Returns positions closed."""
+        if not self.updates and not self.checked:
+            return 0
+        closed_ids = {u[4] for u in self.updates}
+        with self.conn:
+            self.conn.executemany('''
+                UPDATE signals SET status = ?, profit_loss = ?, exit_price = ?, closed_ts = ?
+                WHERE id = ? AND status = 'ACTIVE'
+            ''', self.updates)
+            self.conn.executemany("UPDATE signals SET checked_ts = ? WHERE id = ? AND status = 'ACTIVE'",
+                                  [(ts, i) for i, ts in self.checked.items() if i not in closed_ids])
+        n = len(self.updates)
+        self.updates = []
+        self.checked = {}
+        return n
+
+def track_positions():
+    """One-shot run: checks every ACTIVE signal against the candles since its watermark."""
+    conn = connect(DB_PATH)
+    init_signal_store(conn)
+    tracker = PositionTracker(conn)
+
+    t0 = time.perf_counter()
+    n_open = tracker.load()
+    print(f"Tracking {n_open} open positions at {datetime.now()}...", flush=True)
+    if n_open == 0:
+        conn.close()
+        return
+
+    closed = tracker.catch_up(int(time.time() * 1000))
+    written = tracker.flush()
+    conn.close()
+
+    for pos in closed:
+        print(f"  {pos['symbol']} {pos['signal']} #{pos['id']}: {pos['status']} @ {pos['exit_price']:.4f} ({pos['profit_loss']:+.2f}%)")
+    print(f"Closed {written} positions, {tracker.open_count()} still open ({(time.perf_counter() - t0)*1000:.1f} ms)", flush=True)
+
+if __name__ == "__main__":
+    track_positions()
@@ -0,0 +1,70 @@
+import sqlite3
+import sys
+import time
+import numpy as np
+
+from market_data import DB_PATH, INTERVAL_MS, list_series, load_latest_rows, load_range_batch
+
+# --- Derived Intervals ---
+# The sync only fetches 15m/1h/4h. Daily candles are built from the 1h candles and stored
+# in the candles table like any synced series, so the snapshot panel and the batch
+# loaders see them. Incremental: per symbol only the days from its newest stored target
+# candle on are rebuilt (that one may still have been forming).
+
+SOURCE_INTERVAL = '1h'
+TARGET_INTERVALS = ['1d']
+
+def aggregate(arrays, size):
+    """OHLCV buckets of `size` ms over ascending source arrays."""
+    ts = arrays['timestamp']
+    buckets = ts - ts % size
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+    return {
+        'timestamp': buckets[starts],
+        'open': arrays['open'][starts],
+        'high': np.maximum.reduceat(arrays['high'], starts),
+        'low': np.minimum.reduceat(arrays['low'], starts),
+        'close': arrays['close'][ends],
+        'volume': np.add.reduceat(arrays['volume'], starts)
+    }
+
+def resample_candles(conn, source=SOURCE_INTERVAL, targets=TARGET_INTERVALS):
+    """Updates every target interval from the source candles. Returns {target: rows written}."""
+    symbols = sorted(s for s, interval in list_series(conn) if interval == source)
+    written = {}
+    for target in targets:
+        size = INTERVAL_MS[target]
+        latest = load_latest_rows(conn, [(s, target) for s in symbols])
+        # Per symbol: rebuild from its newest stored bucket on (full history for new symbols)
+        since = {s: latest[(s, target)][0] if (s, target) in latest else -1 for s in symbols}
+        batch = load_range_batch(conn, symbols, source, min(since.values(), default=-1) - 1, 2 ** 62)
+
+        rows = []
+        for (symbol, _), arrays in batch.items():
+            keep = arrays['timestamp'] >= since[symbol]
+            if not keep.any():
+                continue
+            out = aggregate({col: values[keep] for col, values in arrays.items()}, size)
+            if since[symbol] < 0 and out['timestamp'][0] < arrays['timestamp'][0]:
+                # History starts mid-bucket, that first bucket would be incomplete
+                out = {col: values[1:] for col, values in out.items()}
+            rows.extend(zip([symbol] * len(out['timestamp']), [target] * len(out['timestamp']),
+                            out['timestamp'].tolist(), out['open'].tolist(), out['high'].tolist(),
+                            out['low'].tolist(), out['close'].tolist(), out['volume'].tolist()))
+        with conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO candles (symbol, interval, timestamp, open, high, low, close, volume)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+        written[target] = len(rows)
+    return written
+
+if __name__ == "__main__":
+    # Usage: resample.py [db_path]
+    conn = sqlite3.connect(sys.argv[1] if len(sys.argv) > 1 else DB_PATH, timeout=30)
+    t0 = time.perf_counter()
+    written = resample_candles(conn)
+    conn.close()
+    print(f"Resampled {SOURCE_INTERVAL} -> " + ", ".join(f"{t}: {n} candles" for t, n in written.items()) +
+          f" in {(time.perf_counter() - t0)*1000:.1f} ms")
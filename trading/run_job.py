@@ -0,0 +1,96 @@
+import importlib
+import json
+import os
+import socket
+import sys
+
+# --- Job Client ---
+# Cron entry point: `python3 run_job.py JOB [args...]`. The job is handed to a running
+# job_worker.py over its Unix socket (pandas / job modules already imported) and the
+# output is streamed back. Without a worker the job runs here, cold. Only the stdlib is
+# imported up front; the job module is imported on the cold path only.
+
+TRADING_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKER_SOCKET = "/home/manni/.openclaw/workspace/trading/data/job_worker.sock"
+STATUS_MARK = b"\x00"  # Starts the worker's final status frame {"code", "ms"}
+
+# Job name -> (module, function), modules are imported on first use
+JOBS = {
+    'pipeline': ('pipeline', 'main'),
+    'sync': ('pipeline', 'sync_cycle'),   # Ingest plus the stages downstream of it
+    'scan': ('alert_scanner', 'check_signals'),
+    'track': ('position_tracker', 'track_positions'),
+    'export': ('data_exporter', 'export_data'),
+    'snapshot': ('market_snapshot', 'print_snapshot'),
+    'optimize': ('optimizer', 'optimize'),
+}
+
+def job_function(name):
+    module, func = JOBS[name]
+    for path in (TRADING_DIR, os.path.join(TRADING_DIR, "dashboard")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return getattr(importlib.import_module(module), func)
+
+def exit_code(e):
+    """Exit status of a SystemExit, like the interpreter would report it."""
+    if e.code is None:
+        return 0
+    return e.code if isinstance(e.code, int) else 1
+
+def run_local(name, args):
+    try:
+        job_function(name)(*args)
+    except SystemExit as e:
+        return exit_code(e)
+    return 0
+
+def run_remote(name, args, socket_path=WORKER_SOCKET):
+    """Runs the job in the worker, streaming its output. None if no worker is listening."""
+    try:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.connect(socket_path)
+    except OSError:
+        return None
+
+    out = sys.stdout.buffer
+    status = None
+    with s:
+        s.sendall(json.dumps({'job': name, 'args': args}).encode() + b"\n")
+        while True:
+            data = s.recv(65536)
+            if not data:
+                break
+            if status is None:
+                head, mark, rest = data.partition(STATUS_MARK)
+                out.write(head)
+                out.flush()
+                if mark:
+                    status = rest
+            else:
+                status += data
+
+    if status is None:
+        print("Job worker closed the connection before the job finished", file=sys.stderr)
+        return 1
+    return json.loads(status)['code']
+
+if __name__ == "__main__":
+    # Usage: run_job.py [--cold] [--socket PATH] JOB [args...]
+    args = sys.argv[1:]
+    cold = '--cold' in args
+    args = [a for a in args if a != '--cold']
+    socket_path = WORKER_SOCKET
+    if '--socket' in args:
+        i = args.index('--socket')
+        socket_path = args[i + 1]
+        del args[i:i + 2]
+    if not args or args[0] not in JOBS:
+        print(f"Usage: run_job.py [--cold] [--socket PATH] {{{'|'.join(JOBS)}}} [args...]")
+        sys.exit(2)
+
+    name, job_args = args[0], args[1:]
+    code = None if cold else run_remote(name, job_args, socket_path)
+    if code is None:
+        code = run_local(name, job_args)
+    sys.exit(code)
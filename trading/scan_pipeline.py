@@ -0,0 +1,99 @@
+import time
+import pandas_ta as ta
+
+# --- Scanner Pipeline ---
+# Strategies register which indicators they need. For every series the candles are
+# loaded once, the union of all required indicators is computed once, and every
+# registered strategy runs on the same shared arrays.
+#
+# Indicator spec: a tuple (name, *params), e.g. ('rsi', 14) or ('macd', 12, 26, 9).
+
+INDICATORS = {}
+REGISTRY = {}
+
+def indicator(name):
+    """Decorator registering an indicator function fn(df, *params)."""
+    def wrap(fn):
+        INDICATORS[name] = fn
+        return fn
+    return wrap
+
+def register_strategy(name, requires, scan):
+    """
+    requires(symbol, interval) -> list of indicator specs
+    scan(symbol, interval, df, ind, state) -> list of alerts
+    `ind` maps spec -> computed values, `state` is a per-series dict the strategy can
+    keep between runs (e.g. a PivotIndex in the resident daemon).
+    """
+    REGISTRY[name] = (requires, scan)
+
+# --- Built-in Indicators ---
+@indicator('rsi')
+def _rsi(df, length):
+    rsi = ta.rsi(df.series('close'), length=length)
+    return rsi.values if rsi is not None else None
+
+@indicator('ema')
+def _ema(df, length):
+    ema = ta.ema(df.series('close'), length=length)
+    return ema.values if ema is not None else None
+
+@indicator('atr')
+def _atr(df, length):
+    atr = ta.atr(df.series('high'), df.series('low'), df.series('close'), length=length)
+    return atr.values if atr is not None else None
+
+@indicator('macd')
+def _macd(df, fast, slow, signal):
+    macd = ta.macd(df.series('close'), fast=fast, slow=slow, signal=signal)
+    if macd is None: return None
+    return {
+        'macd': macd[f"MACD_{fast}_{slow}_{signal}"].values,
+        'signal': macd[f"MACDs_{fast}_{slow}_{signal}"].values
+    }
+
+@indicator('supertrend')
+def _supertrend(df, length, multiplier):
+    st = ta.supertrend(df.series('high'), df.series('low'), df.series('close'), length=length, multiplier=multiplier)
+    if st is None: return None
+    # Column names vary (SUPERTd_7_3.0 vs SUPERTd_7_3), pick the direction column
+    col_name = [c for c in st.columns if c.startswith('SUPERTd')][0]
+    return {'direction': st[col_name].values}
+
+# --- Execution ---
+def compute_indicators(df, specs):
+    """Computes each distinct spec once. Returns {spec: values}."""
+    ind = {}
+    for spec in specs:
+        if spec not in ind:
+            ind[spec] = INDICATORS[spec[0]](df, *spec[1:])
+    return ind
+
+def run_series(symbol, interval, df, state=None, strategies=None, timings=None):
+    """
+    Runs all (or the given) registered strategies on one series.
+    `state` is {strategy_name: dict} kept by the caller across runs.
+    `timings` (optional dict) accumulates seconds per stage.
+    """
+    if state is None:
+        state = {}
+    names = strategies if strategies is not None else list(REGISTRY.keys())
+
+    t0 = time.perf_counter()
+    specs = set()
+    for name in names:
+        specs.update(REGISTRY[name][0](symbol, interval))
+    ind = compute_indicators(df, specs)
+    t1 = time.perf_counter()
+
+    alerts = []
+    for name in names:
+        for alert in REGISTRY[name][1](symbol, interval, df, ind, state.setdefault(name, {})):
+            alert['strategy'] = name
+            alerts.append(alert)
+    t2 = time.perf_counter()
+
+    if timings is not None:
+        timings['indicators'] = timings.get('indicators', 0.0) + (t1 - t0)
+        timings['strategies'] = timings.get('strategies', 0.0) + (t2 - t1)
+    return alerts
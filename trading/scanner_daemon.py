@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import select
+import socket
+import numpy as np
+from datetime import datetime
+
+from alert_scanner import DB_PATH, COINS, INTERVALS, SCAN_LIMIT, MIN_CANDLES, scan_series, publish_alerts
+from candles import Candles
+from correlation import load_matrix, suppress_correlated
+from market_data import load_latest_batch, load_range_batch, INTERVAL_MS
+from signal_store import connect, init_signal_store, record_scan
+from position_tracker import PositionTracker, TRACK_INTERVAL
+from latency import LatencyHistogram
+
+# --- Configuration ---
+# Resident version of alert_scanner.py: pandas/pandas_ta are imported once, the last
+# WINDOW candles of every series stay in memory and only series whose candle just
+# closed are re-evaluated.
+SOCKET_PATH = "/home/manni/.openclaw/workspace/trading/data/scanner.sock"
+LATENCY_PATH = "/home/manni/.openclaw/workspace/trading/dashboard/scanner_latency.json"
+WINDOW = SCAN_LIMIT
+POLL_MS = 250            # Re-check interval while waiting for sync to write the closed candle
+MAX_WAIT_MS = 10 * 60 * 1000  # Give up on a boundary if the candle never shows up
+
+def now_ms():
+    return int(time.time() * 1000)
+
+class ScannerDaemon:
+    def __init__(self, coins=COINS, intervals=INTERVALS, window=WINDOW, socket_path=SOCKET_PATH):
+        self.coins = list(coins)
+        self.intervals = list(intervals)
+        self.window = window
+        self.socket_path = socket_path
+        self.conn = connect(DB_PATH)
+        init_signal_store(self.conn)
+
+        self.state = {}          # (symbol, interval) -> {column: array}, closed candles only
+        self.strategy_state = {} # (symbol, interval) -> per-strategy state (e.g. PivotIndex)
+        self.pending = {}        # interval -> (boundary_ms, set of symbols still waiting)
+        # eval: trigger (boundary poll hit / ingest event) -> alert emitted
+        # close: candle close boundary -> alert emitted (includes ingest delay)
+        self.latency = {'eval': LatencyHistogram(), 'close': LatencyHistogram()}
+        self.tracker = PositionTracker(self.conn)
+        self.sock = None
+
+    # --- State ---
+    def bootstrap(self):
+        ts = now_ms()
+        batch = load_latest_batch(self.conn, self.coins, self.intervals, limit=self.window + 1, now_ms=ts)
+        for (symbol, interval), arrays in batch.items():
+            # Drop the candle that is still forming
+            closed = arrays['timestamp'] + INTERVAL_MS[interval] <= ts
+            self.state[(symbol, interval)] = {col: arr[closed][-self.window:] for col, arr in arrays.items()}
+        n_open = self.tracker.load()
+        # SL/TP hits in candles that closed while the daemon was down
+        replayed = self.tracker.catch_up(ts)
+        self.tracker.flush()
+        print(f"Scanner daemon loaded {len(self.state)} series, {n_open} open positions "
+              f"({len(replayed)} closed on replay) at {datetime.now()}", flush=True)
+
+    def last_ts(self, key):
+        arrays = self.state.get(key)
+        if arrays is None or len(arrays['timestamp']) == 0:
+            return 0
+        return int(arrays['timestamp'][-1])
+
+    def append(self, key, arrays):
+        """Appends newer candles to a series and trims it back to the window."""
+        old = self.state.get(key)
+        if old is None:
+            self.state[key] = {col: arr[-self.window:] for col, arr in arrays.items()}
+            return
+        mask = arrays['timestamp'] > self.last_ts(key)
+        if not mask.any():
+            return
+        self.state[key] = {col: np.concatenate([old[col], arr[mask]])[-self.window:] for col, arr in arrays.items()}
+
+    def refresh(self, interval, symbols, boundary):
+        """
+        Pulls candles that closed before `boundary` for the given symbols (one query).
+        Returns the symbols whose candle [boundary - step, boundary) is now in memory.
+        """
+        step = INTERVAL_MS[interval]
+        # Series not in memory yet (e.g. first ingest event) only need their last WINDOW candles
+        floor = boundary - (self.window + 1) * step
+        start = min(self.last_ts((s, interval)) if (s, interval) in self.state else floor for s in symbols)
+        # Candle with open time t is closed once t + step <= boundary
+        batch = load_range_batch(self.conn, symbols, interval, start, boundary - step + 1)
+        for (symbol, _), arrays in batch.items():
+            prev_ts = self.last_ts((symbol, interval))
+            self.append((symbol, interval), arrays)
+            if interval == TRACK_INTERVAL:
+                # Check the symbol's open positions against the new candles only
+                new = arrays['timestamp'] > prev_ts
+                self.tracker.on_candles(symbol, {col: arr[new] for col, arr in arrays.items()})
+        return [s for s in symbols if self.last_ts((s, interval)) >= boundary - step]
+
+    # --- Evaluation ---
+    def evaluate(self, keys, trigger_ms, boundary_ms):
+        alerts = []
+        for key in keys:
+            arrays = self.state.get(key)
+            if arrays is None or len(arrays['timestamp']) < MIN_CANDLES:
+                continue
+            state = self.strategy_state.setdefault(key, {})
+            alerts.extend(scan_series(key[0], key[1], Candles.from_arrays(arrays), state))
+
+        alerts, suppressed = suppress_correlated(alerts, load_matrix())
+        if suppressed:
+            print(f"  Suppressed {len(suppressed)} correlated alerts: {', '.join(a['symbol'] for a in suppressed)}", flush=True)
+
+        # Store events and advance watermarks, publish only events not seen before
+        alerts = record_scan(self.conn, alerts, {key: self.last_ts(key) for key in keys if key in self.state})
+        self.tracker.add_alerts(alerts)
+        self.tracker.flush()
+        done = now_ms()
+        if alerts:
+            publish_alerts(alerts)
+            sys.stdout.flush()
+        for _ in keys:
+            self.latency['eval'].observe(done - trigger_ms)
+            self.latency['close'].observe(done - boundary_ms)
+        return alerts
+
+    def on_boundary(self, boundary):
+        for interval in self.intervals:
+            if boundary % INTERVAL_MS[interval] == 0:
+                # Only wait on series we actually have data for
+                waiting = set(s for s in self.coins if (s, interval) in self.state)
+                self.pending[interval] = (boundary, waiting)
+
+    def poll_pending(self):
+        ts = now_ms()
+        for interval in list(self.pending.keys()):
+            boundary, waiting = self.pending[interval]
+            ready = self.refresh(interval, sorted(waiting), boundary) if waiting else []
+            if ready:
+                self.evaluate([(s, interval) for s in ready], ts, boundary)
+                waiting.difference_update(ready)
+            if not waiting or ts - boundary > MAX_WAIT_MS:
+                if waiting:
+                    print(f"  {interval}: no closed candle for {sorted(waiting)} after {MAX_WAIT_MS/1000:.0f}s", flush=True)
+                del self.pending[interval]
+
+    def on_event(self, message, received_ms):
+        """
+        Ingest event "SYMBOL INTERVAL OPEN_TS" sent by sync_hyperliquid when a candle closed.
+        Evaluates that one series right away.
+        """
+        try:
+            symbol, interval, open_ts = message.split()
+            open_ts = int(open_ts)
+        except ValueError:
+            return
+        if symbol not in self.coins or interval not in self.intervals:
+            return
+        if self.last_ts((symbol, interval)) >= open_ts:
+            return # Already evaluated (e.g. by the boundary poll)
+
+        boundary = open_ts + INTERVAL_MS[interval]
+        if self.refresh(interval, [symbol], boundary):
+            self.evaluate([(symbol, interval)], received_ms, boundary)
+            pending = self.pending.get(interval)
+            if pending and pending[0] == boundary:
+                pending[1].discard(symbol)
+
+    def next_boundary(self, ts):
+        return min((ts // INTERVAL_MS[i] + 1) * INTERVAL_MS[i] for i in self.intervals)
+
+    def write_latency(self):
+        data = {name: h.snapshot() for name, h in self.latency.items()}
+        data['updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            tmp = LATENCY_PATH + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, LATENCY_PATH)
+        except OSError:
+            pass
+
+    # --- Main Loop ---
+    def open_socket(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.socket_path)
+        self.sock.setblocking(False)
+
+    def run(self):
+        self.bootstrap()
+        self.open_socket()
+        boundary = self.next_boundary(now_ms())
+        print(f"Next close boundary: {datetime.fromtimestamp(boundary/1000)}", flush=True)
+
+        try:
+            while True:
+                ts = now_ms()
+                timeout_ms = boundary - ts
+                if self.pending:
+                    timeout_ms = min(timeout_ms, POLL_MS)
+                readable, _, _ = select.select([self.sock], [], [], max(timeout_ms, 0) / 1000)
+
+                if readable:
+                    received = now_ms()
+                    while True:
+                        try:
+                            message = self.sock.recv(256).decode()
+                        except BlockingIOError:
+                            break
+                        self.on_event(message, received)
+
+                ts = now_ms()
+                if ts >= boundary:
+                    self.on_boundary(boundary)
+                    boundary = self.next_boundary(ts)
+                if self.pending:
+                    self.poll_pending()
+                    if not self.pending:
+                        self.write_latency()
+        except KeyboardInterrupt:
+            print("Scanner daemon stopped.", flush=True)
+        finally:
+            self.write_latency()
+            self.sock.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.conn.close()
+
+if __name__ == "__main__":
+    ScannerDaemon().run()
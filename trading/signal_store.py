@@ -0,0 +1,143 @@
+import sqlite3
+import time
+from datetime import datetime
+
+DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
+
+# --- Signal Event Store ---
+# Append-only table of every alert the scanner produced, deduplicated on
+# (symbol, interval, strategy, candle_ts, signal). `candle_ts` is the open time of the
+# candle that triggered the signal and is indexed for range reads by the exporter.
+# The dashboard columns (timestamp, entry_price, sl_price, tp_price, status,
+# profit_loss) keep the layout data_exporter.py already expects.
+#
+# scan_watermarks stores, per series, the last candle the scanner has evaluated, so a
+# run only looks at candles after it (no repeats, nothing skipped between runs).
+# `checked_ts` is the same for the position tracker: the open time of the last closed
+# TRACK_INTERVAL candle an ACTIVE signal was checked against for SL/TP.
+
+SIGNAL_COLUMNS = {
+    'timestamp': 'TEXT',
+    'symbol': 'TEXT',
+    'interval': 'TEXT',
+    'strategy': 'TEXT',
+    'signal': 'TEXT',
+    'type': 'TEXT',
+    'entry_price': 'REAL',
+    'sl_price': 'REAL',
+    'tp_price': 'REAL',
+    'status': "TEXT DEFAULT 'ACTIVE'",
+    'profit_loss': 'REAL',
+    'candle_ts': 'INTEGER',
+    'created_at': 'INTEGER',
+    'exit_price': 'REAL',
+    'closed_ts': 'INTEGER',
+    'checked_ts': 'INTEGER'
+}
+
+def connect(db_path=DB_PATH):
+    # Sync writes to the same file, wait for its locks instead of failing
+    return sqlite3.connect(db_path, timeout=30)
+
+def init_signal_store(conn):
+    cols = ",\n            ".join(f"{name} {sql_type}" for name, sql_type in SIGNAL_COLUMNS.items())
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS signals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            {cols}
+        )
+    ''')
+    # Older hand-made signals tables lack some columns
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(signals)")}
+    for name, sql_type in SIGNAL_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE signals ADD COLUMN {name} {sql_type}")
+    # Legacy rows have no candle_ts: derive it from `timestamp` (local time text as
+    # record_scan writes it, or epoch s / ms), so range reads by candle_ts include them.
+    # OR IGNORE: a row that would collide with a stored event keeps NULL.
+    conn.execute('''
+        UPDATE OR IGNORE signals SET candle_ts = CASE
+            WHEN CAST(timestamp AS TEXT) NOT GLOB '*[^0-9.]*' THEN
+                CAST(CASE WHEN CAST(timestamp AS REAL) < 1e11 THEN CAST(timestamp AS REAL) * 1000
+                          ELSE CAST(timestamp AS REAL) END AS INTEGER)
+            ELSE CAST(strftime('%s', timestamp, 'utc') AS INTEGER) * 1000
+        END
+        WHERE candle_ts IS NULL AND timestamp IS NOT NULL
+    ''')
+
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_signals_event
+        ON signals (symbol, interval, strategy, candle_ts, signal)
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_signals_candle_ts ON signals (candle_ts)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_signals_status ON signals (status, symbol)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scan_watermarks (
+            symbol TEXT,
+            interval TEXT,
+            last_ts INTEGER,
+            updated_at INTEGER,
+            PRIMARY KEY (symbol, interval)
+        )
+    ''')
+    conn.commit()
+
+def load_watermarks(conn):
+    """Returns {(symbol, interval): last evaluated candle timestamp}."""
+    return {(s, i): ts for s, i, ts in conn.execute("SELECT symbol, interval, last_ts FROM scan_watermarks")}
+
+def record_scan(conn, alerts, watermarks):
+    """
+    Writes alerts and advances watermarks in ONE transaction.
+    Alerts need 'candle_ts' and 'strategy'. Duplicates of already stored events are
+    ignored; returns only the alerts that were actually new.
+    """
+    now = int(time.time() * 1000)
+    new_alerts = []
+    with conn:
+        for a in alerts:
+            cur = conn.execute('''
+                INSERT OR IGNORE INTO signals
+                    (timestamp, symbol, interval, strategy, signal, type, entry_price, sl_price, tp_price,
+                     status, profit_loss, candle_ts, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'ACTIVE', 0, ?, ?)
+            ''', (
+                datetime.fromtimestamp(a['candle_ts'] / 1000).strftime('%Y-%m-%dT%H:%M:%S'),
+                a['symbol'], a['interval'], a['strategy'],
+                'BUY' if a['type'].startswith('BUY') else 'SELL', a['type'],
+                float(a['price']), float(a['sl']), float(a['tp']),
+                int(a['candle_ts']), now
+            ))
+            if cur.rowcount:
+                a['id'] = cur.lastrowid
+                new_alerts.append(a)
+
+        conn.executemany('''
+            INSERT INTO scan_watermarks (symbol, interval, last_ts, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (symbol, interval) DO UPDATE SET last_ts = excluded.last_ts, updated_at = excluded.updated_at
+            WHERE excluded.last_ts > scan_watermarks.last_ts
+        ''', [(s, i, int(ts), now) for (s, i), ts in watermarks.items()])
+    return new_alerts
+
+def load_recent_events(conn, since_ms):
+    """Signal events with candle_ts >= since_ms, newest first (index range scan)."""
+    rows = conn.execute('''
+        SELECT id, timestamp, symbol, interval, strategy, signal, entry_price, sl_price, tp_price, status, profit_loss, exit_price
+        FROM signals
+        WHERE candle_ts >= ?
+        ORDER BY candle_ts DESC
+    ''', (since_ms,)).fetchall()
+    return [{
+        "id": r[0],
+        "date": r[1],
+        "symbol": r[2],
+        "interval": r[3],
+        "strategy": r[4],
+        "signal": r[5],
+        "entry": r[6],
+        "sl": r[7],
+        "tp": r[8],
+        "status": r[9],
+        "profit_loss": r[10],
+        "exit": r[11]
+    } for r in rows]
@@ -0,0 +1,137 @@
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from signal_store import DB_PATH
+
+# --- Database Snapshots ---
+# Consistent copies of the live database while the sync keeps writing, via SQLite's
+# online backup API in steps of BACKUP_PAGES pages with a short pause in between.
+# In WAL mode (sync_hyperliquid.init_db sets it) the copy pins one read snapshot: writers
+# keep committing to the WAL and are never blocked or seen. In rollback-journal mode each
+# step holds a read lock only briefly, but any commit restarts the copy from page one;
+# after BACKUP_MAX_RESTARTS restarts the rest is copied in a single step (one lock of a
+# second or so rather than never finishing). The copy is checked, gzipped and rotated.
+
+SNAPSHOT_DIR = "/home/manni/.openclaw/workspace/trading/data/snapshots"
+SNAPSHOT_PREFIX = "hyperliquid-"
+SNAPSHOT_KEEP = 7
+SNAPSHOT_EVERY_MS = 24 * 60 * 60 * 1000  # Pipeline stage clock
+BACKUP_PAGES = 256          # Pages per step (1 MB at the default 4 KB page size)
+BACKUP_PAUSE_S = 0.002      # Between steps, leaves the disk and the lock to the writers
+BACKUP_MAX_RESTARTS = 3
+COMPRESS_LEVEL = 3          # gzip; higher levels cost a lot more CPU for a few % size
+
+class TooManyRestarts(Exception):
+    pass
+
+def copy_online(src_path, dst_path, pages=BACKUP_PAGES, pause=BACKUP_PAUSE_S, max_restarts=BACKUP_MAX_RESTARTS):
+    """Online backup of src_path into a new file. Returns (steps, restarts)."""
+    stats = {'steps': 0, 'restarts': 0, 'remaining': None}
+
+    def progress(status, remaining, total):
+        stats['steps'] += 1
+        if stats['remaining'] is not None and remaining > stats['remaining']:
+            stats['restarts'] += 1 # Source changed under us, SQLite started over
+            if stats['restarts'] > max_restarts:
+                raise TooManyRestarts()
+        stats['remaining'] = remaining
+        time.sleep(pause)
+
+    src = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True, timeout=30, isolation_level=None)
+    try:
+        if src.execute("PRAGMA journal_mode").fetchone()[0] == 'wal':
+            # Pin one read snapshot for the whole copy: writers keep committing to the WAL
+            # and the backup never sees (or restarts on) their changes
+            src.execute("BEGIN")
+            src.execute("SELECT 1 FROM sqlite_master LIMIT 1")
+        dst = sqlite3.connect(dst_path)
+        # Scratch file: no journal, no fsyncs that would queue the writers' commits behind ours
+        dst.execute("PRAGMA journal_mode=OFF")
+        dst.execute("PRAGMA synchronous=OFF")
+        try:
+            src.backup(dst, pages=pages, progress=progress)
+        except TooManyRestarts:
+            src.backup(dst, pages=-1) # Everything in one step
+            stats['steps'] += 1
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return stats['steps'], stats['restarts']
+
+def compress(path, out_path, level=COMPRESS_LEVEL):
+    tmp = out_path + ".tmp"
+    with open(path, 'rb') as src, gzip.open(tmp, 'wb', compresslevel=level) as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.replace(tmp, out_path)
+
+def list_snapshots(snapshot_dir=SNAPSHOT_DIR):
+    """Snapshot files, oldest first (the names sort by time)."""
+    return sorted(glob.glob(os.path.join(snapshot_dir, f"{SNAPSHOT_PREFIX}*.db.gz")))
+
+def rotate(snapshot_dir=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
+    """Deletes all but the newest `keep` snapshots. Returns the deleted paths."""
+    old = list_snapshots(snapshot_dir)[:-keep] if keep > 0 else []
+    for path in old:
+        os.remove(path)
+    return old
+
+def take_snapshot(db_path=DB_PATH, snapshot_dir=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
+    """Copies, checks, compresses and rotates. Returns the snapshot path."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    name = f"{SNAPSHOT_PREFIX}{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    part = os.path.join(snapshot_dir, name + ".db.part")
+    out = os.path.join(snapshot_dir, name + ".db.gz")
+
+    try:
+        t0 = time.perf_counter()
+        steps, restarts = copy_online(db_path, part)
+        t_copy = time.perf_counter() - t0
+
+        conn = sqlite3.connect(part)
+        check = conn.execute("PRAGMA quick_check").fetchone()[0]
+        conn.close()
+        if check != 'ok':
+            raise RuntimeError(f"Snapshot copy failed quick_check: {check}")
+
+        t0 = time.perf_counter()
+        size = os.path.getsize(part)
+        compress(part, out)
+        t_compress = time.perf_counter() - t0
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+
+    removed = rotate(snapshot_dir, keep)
+    print(f"Snapshot {os.path.basename(out)}: {size / 1e6:.1f} MB -> {os.path.getsize(out) / 1e6:.1f} MB, "
+          f"copy {t_copy:.1f}s in {steps} steps ({restarts} restarts), compress {t_compress:.1f}s, "
+          f"{len(removed)} old removed", flush=True)
+    return out
+
+def restore(snapshot_path, target_path):
+    """Unpacks a snapshot to a new file (never over an existing one, stop the jobs and swap it in by hand)."""
+    if os.path.exists(target_path):
+        raise FileExistsError(f"{target_path} exists")
+    tmp = target_path + ".tmp"
+    with gzip.open(snapshot_path, 'rb') as src, open(tmp, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.replace(tmp, target_path)
+    print(f"Restored {snapshot_path} to {target_path}")
+
+if __name__ == "__main__":
+    # Usage: snapshot.py [db_path] | --list | --restore SNAPSHOT TARGET
+    args = sys.argv[1:]
+    if '--list' in args:
+        for path in list_snapshots():
+            print(f"{os.path.basename(path)}  {os.path.getsize(path) / 1e6:.1f} MB")
+    elif '--restore' in args:
+        i = args.index('--restore')
+        restore(args[i + 1], args[i + 2])
+    else:
+        take_snapshot(args[0] if args else DB_PATH)
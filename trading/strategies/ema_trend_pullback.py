@@ -1,25 +1,45 @@
 import sqlite3
-import pandas as pd
+import sys
+import os
 import pandas_ta as ta
 import numpy as np
 
+# Shared modules live one level up in trading/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from candles import Candles
+from market_data import load_candles
+
 # --- Strategy Logic ---
-def backtest_ema_pullback(df, ema_trend=200, ema_entry=50, sl_atr=2.0, tp_atr=4.0):
+def backtest_ema_pullback(candles, ema_trend=200, ema_entry=50, sl_atr=2.0, tp_atr=4.0):
     """
     Trend Following Strategy:
     1. Trend Filter: Price > EMA 200 (Long only) / Price < EMA 200 (Short only)
     2. Entry: Price touches EMA 50 (Pullback)
     3. Exit: ATR-based SL/TP
+    Runs on a Candles container (a DataFrame is converted).
     """
-    
+    if not isinstance(candles, Candles):
+        candles = Candles.from_pandas(candles)
+
     # Indicators
-    df['EMA_Trend'] = ta.ema(df['close'], length=ema_trend)
-    df['EMA_Entry'] = ta.ema(df['close'], length=ema_entry)
-    df['ATR'] = ta.atr(df['high'], df['low'], df['close'], length=14)
-    
+    close = candles.series('close')
+    c = candles.with_columns(
+        ema_trend=ta.ema(close, length=ema_trend).to_numpy(),
+        ema_entry=ta.ema(close, length=ema_entry).to_numpy(),
+        atr=ta.atr(candles.series('high'), candles.series('low'), close, length=14).to_numpy()
+    )
+
     # Drop warmup
-    df = df.dropna().reset_index(drop=True)
-    
+    c = c.dropna()
+
+    closes = c.close.tolist()
+    highs = c.high.tolist()
+    lows = c.low.tolist()
+    ema_ts = c['ema_trend'].tolist()
+    ema_es = c['ema_entry'].tolist()
+    atrs = c['atr'].tolist()
+    dates = c.timestamp.tolist()
+
     # Simulation
     capital = 1000.0
     position = 0 # 0: flat, 1: long, -1: short
@@ -29,14 +49,14 @@ def backtest_ema_pullback(df, ema_trend=200, ema_entry=50, sl_atr=2.0, tp_atr=4.
     
     trades = []
     
-    for i in range(1, len(df)):
-        price = df['close'][i]
-        high = df['high'][i]
-        low = df['low'][i]
-        ema_t = df['EMA_Trend'][i]
-        ema_e = df['EMA_Entry'][i]
-        atr = df['ATR'][i]
-        date = df['timestamp'][i]
+    for i in range(1, len(c)):
+        price = closes[i]
+        high = highs[i]
+        low = lows[i]
+        ema_t = ema_ts[i]
+        ema_e = ema_es[i]
+        atr = atrs[i]
+        date = dates[i]
         
         # --- Check Exit ---
         if position != 0:
@@ -74,7 +94,7 @@ def backtest_ema_pullback(df, ema_trend=200, ema_entry=50, sl_atr=2.0, tp_atr=4.
         if position == 0:
             # LONG Condition
             # Trend is UP (Close > EMA 200) AND Pullback (Low touches EMA 50)
-            if df['close'][i-1] > df['EMA_Trend'][i-1] and low <= ema_e and df['close'][i] > ema_e:
+            if closes[i-1] > ema_ts[i-1] and low <= ema_e and price > ema_e:
                 # Entry Long
                 position = 1
                 entry_price = price
@@ -84,7 +104,7 @@ def backtest_ema_pullback(df, ema_trend=200, ema_entry=50, sl_atr=2.0, tp_atr=4.
                 
             # SHORT Condition
             # Trend is DOWN (Close < EMA 200) AND Pullback (High touches EMA 50)
-            elif df['close'][i-1] < df['EMA_Trend'][i-1] and high >= ema_e and df['close'][i] < ema_e:
+            elif closes[i-1] < ema_ts[i-1] and high >= ema_e and price < ema_e:
                 # Entry Short
                 position = -1
                 entry_price = price
@@ -101,10 +121,9 @@ if __name__ == "__main__":
     coins = ['BTC', 'ETH', 'SOL', 'LINK', 'DOGE']
     
     for coin in coins:
-        query = f"SELECT timestamp, open, high, low, close, volume FROM candles WHERE symbol='{coin}' AND interval='1h' ORDER BY timestamp ASC"
-        df = pd.read_sql_query(query, conn)
-        if df.empty: continue
+        candles = load_candles(conn, coin, '1h')
+        if len(candles) == 0: continue
         
-        final_cap, trades = backtest_ema_pullback(df)
+        final_cap, trades = backtest_ema_pullback(candles)
         ret = ((final_cap - 1000) / 1000) * 100
         print(f"{coin} 1h: Return {ret:.2f}% | Trades: {len(trades)/2:.0f}")
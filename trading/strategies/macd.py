@@ -1,39 +1,52 @@
 import sqlite3
-import pandas as pd
+import sys
 import pandas_ta as ta
 import numpy as np
 import os
 import json
 
+# Shared modules live one level up in trading/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from candles import Candles
+from market_data import load_candles
+
 DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
 
-def backtest_macd(df, fast=12, slow=26, signal=9, sl_pct=0.03, tp_pct=0.06):
+def backtest_macd(candles, fast=12, slow=26, signal=9, sl_pct=0.03, tp_pct=0.06):
     """
     MACD Strategy:
     - Long when MACD crosses above Signal line
     - Short when MACD crosses below Signal line
+    Runs on a Candles container (a DataFrame is converted).
     """
-    macd = ta.macd(df['close'], fast=fast, slow=slow, signal=signal)
+    if not isinstance(candles, Candles):
+        candles = Candles.from_pandas(candles)
+    macd = ta.macd(candles.series('close'), fast=fast, slow=slow, signal=signal)
     if macd is None: return 1000.0, []
-    
-    df = pd.concat([df, macd], axis=1)
-    macd_col = f"MACD_{fast}_{slow}_{signal}"
-    signal_col = f"MACDs_{fast}_{slow}_{signal}"
-    
-    df = df.dropna().reset_index(drop=True)
-    
+
+    c = candles.with_columns(
+        macd=macd[f"MACD_{fast}_{slow}_{signal}"].to_numpy(),
+        signal=macd[f"MACDs_{fast}_{slow}_{signal}"].to_numpy()
+    ).dropna()
+
+    # Plain lists: indexing them is far cheaper than Series.__getitem__ in the loop
+    closes = c.close.tolist()
+    macd_vals = c['macd'].tolist()
+    sig_vals = c['signal'].tolist()
+    dates = c.timestamp.tolist()
+
     capital = 1000.0
     position = 0
     entry_price = 0.0
     trades = []
 
-    for i in range(1, len(df)):
-        price = df['close'][i]
-        macd_val = df[macd_col][i]
-        sig_val = df[signal_col][i]
-        prev_macd = df[macd_col][i-1]
-        prev_sig = df[signal_col][i-1]
-        date = df['timestamp'][i]
+    for i in range(1, len(c)):
+        price = closes[i]
+        macd_val = macd_vals[i]
+        sig_val = sig_vals[i]
+        prev_macd = macd_vals[i-1]
+        prev_sig = sig_vals[i-1]
+        date = dates[i]
 
         # Exit
         if position != 0:
@@ -69,16 +82,15 @@ def run_optimization():
     
     for coin in coins:
         for interval in intervals:
-            query = f"SELECT timestamp, close FROM candles WHERE symbol='{coin}' AND interval='{interval}' ORDER BY timestamp ASC"
-            df = pd.read_sql_query(query, conn)
-            if len(df) < 100: continue
+            candles = load_candles(conn, coin, interval)
+            if len(candles) < 100: continue
             
             best_ret = -100
             best_params = {}
             
             # Simple grid
             for f, s, sig in [(12,26,9), (8,21,5)]:
-                final_cap, trades = backtest_macd(df, fast=f, slow=s, signal=sig)
+                final_cap, trades = backtest_macd(candles, fast=f, slow=s, signal=sig)
                 ret = ((final_cap - 1000) / 1000) * 100
                 if ret > best_ret:
                     best_ret = ret
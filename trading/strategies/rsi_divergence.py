@@ -1,8 +1,14 @@
 import sqlite3
-import pandas as pd
+import sys
+import os
 import pandas_ta as ta
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timezone
+
+# Shared modules live one level up in trading/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from market_data import load_candles
+from pivots import find_pivots
 
 # --- Configuration ---
 DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
@@ -12,31 +18,27 @@ RSI_OVERBOUGHT = 70
 STOP_LOSS_PCT = 0.03 # 3% Stop Loss
 TAKE_PROFIT_PCT = 0.06 # 6% Take Profit (2:1 Ratio)
 
-def detect_divergence(df):
+def detect_divergence(candles):
     """
     Detects Regular Bullish and Bearish RSI Divergences.
+    Returns the Candles with 'RSI' and 'signal' columns added.
     """
-    df['RSI'] = ta.rsi(df['close'], length=RSI_LENGTH)
+    rsi = ta.rsi(candles.series('close'), length=RSI_LENGTH)
     
     n = 2 
-    df['is_pivot_low'] = df['low'].rolling(window=n*2+1, center=True).min() == df['low']
-    df['is_pivot_high'] = df['high'].rolling(window=n*2+1, center=True).max() == df['high']
-    
-    df['signal'] = 0 
+    # Same pivot rule as rolling(2n+1, center=True) min/max (see pivots.py)
+    is_pl, is_ph = find_pivots(candles.low, candles.high, n)
     
     last_pivot_low_idx = None
     last_pivot_high_idx = None
     
-    closes = df['close'].values
-    lows = df['low'].values
-    highs = df['high'].values
-    rsis = df['RSI'].values
-    is_pl = df['is_pivot_low'].values
-    is_ph = df['is_pivot_high'].values
+    lows = candles.low
+    highs = candles.high
+    rsis = rsi.to_numpy()
     
-    signals = np.zeros(len(df))
+    signals = np.zeros(len(candles))
     
-    for i in range(RSI_LENGTH + n, len(df) - n):
+    for i in range(RSI_LENGTH + n, len(candles) - n):
         pivot_idx = i - n
         
         # Bullish Divergence
@@ -61,24 +63,26 @@ def detect_divergence(df):
                     signals[i] = -1
             last_pivot_high_idx = pivot_idx
 
-    df['signal'] = signals
-    return df
+    return candles.with_columns(RSI=rsis, signal=signals)
+
+def format_date(ts):
+    return datetime.fromtimestamp(ts / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
 
 def run_backtest(symbol, interval, initial_capital=1000):
     conn = sqlite3.connect(DB_PATH)
-    query = f"SELECT timestamp, open, high, low, close, volume FROM candles WHERE symbol='{symbol}' AND interval='{interval}' ORDER BY timestamp ASC"
-    df = pd.read_sql_query(query, conn)
+    candles = load_candles(conn, symbol, interval)
     conn.close()
     
-    if df.empty:
+    if len(candles) == 0:
         print(f"No data for {symbol} {interval}")
         return
 
-    df['date'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df.set_index('date', inplace=True)
-    
     # Detect Signals
-    df = detect_divergence(df)
+    candles = detect_divergence(candles)
+    closes = candles.close.tolist()
+    rsis = candles['RSI'].tolist()
+    signals = candles['signal'].tolist()
+    dates = candles.timestamp.tolist()
     
     capital = initial_capital
     position = 0 # 0: flat, >0: long size, <0: short size
@@ -87,11 +91,10 @@ def run_backtest(symbol, interval, initial_capital=1000):
     take_profit = 0 
     trades = []
     
-    for i in range(len(df)):
-        row = df.iloc[i]
-        price = row['close']
-        signal = row['signal']
-        date = row.name
+    for i in range(len(candles)):
+        price = closes[i]
+        signal = signals[i]
+        date = dates[i]
         
         # --- Check OPEN Position ---
         if position != 0:
@@ -120,7 +123,7 @@ def run_backtest(symbol, interval, initial_capital=1000):
 
         # --- Check NEW Entry ---
         if position == 0:
-            if signal == 1 and row['RSI'] < 35: # Bullish Entry
+            if signal == 1 and rsis[i] < 35: # Bullish Entry
                 position = capital / price
                 entry_price = price
                 capital -= (position * price)
@@ -128,7 +131,7 @@ def run_backtest(symbol, interval, initial_capital=1000):
                 take_profit = price * (1 + TAKE_PROFIT_PCT)
                 trades.append({'type': 'OPEN', 'side': 'LONG', 'date': date, 'price': price})
                 
-            elif signal == -1 and row['RSI'] > 65: # Bearish Entry
+            elif signal == -1 and rsis[i] > 65: # Bearish Entry
                 size = capital / price
                 position = -size
                 entry_price = price
@@ -141,9 +144,9 @@ def run_backtest(symbol, interval, initial_capital=1000):
     if position != 0:
         curr_val = 0
         if position > 0:
-            curr_val = position * df.iloc[-1]['close']
+            curr_val = position * closes[-1]
         else:
-            profit = (entry_price - df.iloc[-1]['close']) * abs(position)
+            profit = (entry_price - closes[-1]) * abs(position)
             curr_val = (abs(position) * entry_price) + profit
         final_value = capital + curr_val
     else:
@@ -167,7 +170,7 @@ def run_backtest(symbol, interval, initial_capital=1000):
         for t in trades[-5:]:
             p_str = f" (${t['profit']:.2f})" if 'profit' in t else ""
             side = t.get('side', '')
-            print(f"  {t['date']} {t['type']} {side} @ {t['price']:.2f} {t.get('reason','')}{p_str}")
+            print(f"  {format_date(t['date'])} {t['type']} {side} @ {t['price']:.2f} {t.get('reason','')}{p_str}")
 
 if __name__ == "__main__":
     print("Running RSI Divergence Backtest (Long/Short + SL/TP)...")
@@ -1,41 +1,50 @@
 import sqlite3
-import pandas as pd
+import sys
 import pandas_ta as ta
 import numpy as np
 import os
 
+# Shared modules live one level up in trading/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from candles import Candles
+from market_data import load_candles
+
 DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
 
-def backtest_supertrend(df, length=10, multiplier=3.0, sl_pct=0.03, tp_pct=0.06):
+def backtest_supertrend(candles, length=10, multiplier=3.0, sl_pct=0.03, tp_pct=0.06):
     """
     SuperTrend Strategy:
     - Long when SuperTrend flips to bullish (Price > SuperTrend)
     - Short when SuperTrend flips to bearish (Price < SuperTrend)
+    Runs on a Candles container (a DataFrame is converted).
     """
+    if not isinstance(candles, Candles):
+        candles = Candles.from_pandas(candles)
     # Calculate SuperTrend
-    st = ta.supertrend(df['high'], df['low'], df['close'], length=length, multiplier=multiplier)
+    st = ta.supertrend(candles.series('high'), candles.series('low'), candles.series('close'), length=length, multiplier=multiplier)
     if st is None: return 1000.0, []
-    
-    # Debug: print(f"ST shape: {st.shape}, NaNs: {st.isna().sum().sum()}")
-    
-    df = pd.concat([df, st], axis=1)
+
     # st column names can vary (e.g. SUPERTd_7_3.0 or SUPERTd_7_3)
     # Let's find the correct column name dynamically
-    col_name = [c for c in df.columns if c.startswith('SUPERTd')][0]
-    
-    # Drop warmup
-    df = df.dropna().reset_index(drop=True)
-    
+    col_name = [c for c in st.columns if c.startswith('SUPERTd')][0]
+
+    # Drop the ATR warmup only: SUPERTl / SUPERTs are NaN on every bar of the other side
+    c = candles.with_columns(**{name: st[name].to_numpy() for name in st.columns}).dropna([col_name])
+
+    closes = c.close.tolist()
+    directions = c[col_name].tolist()
+    dates = c.timestamp.tolist()
+
     capital = 1000.0
     position = 0
     entry_price = 0.0
     trades = []
 
-    for i in range(1, len(df)):
-        price = df['close'][i]
-        direction = df[col_name][i] # 1 for bullish, -1 for bearish
-        prev_direction = df[col_name][i-1]
-        date = df['timestamp'][i]
+    for i in range(1, len(c)):
+        price = closes[i]
+        direction = directions[i] # 1 for bullish, -1 for bearish
+        prev_direction = directions[i-1]
+        date = dates[i]
 
         # Exit logic
         if position != 0:
@@ -75,10 +84,8 @@ def run_optimization():
     
     for coin in coins:
         for interval in intervals:
-            query = f"SELECT timestamp, open, high, low, close FROM candles WHERE symbol='{coin}' AND interval='{interval}' ORDER BY timestamp ASC"
-            df = pd.read_sql_query(query, conn)
-            # print(f"Processing {coin} {interval}, rows: {len(df)}")
-            if len(df) < 100: continue
+            candles = load_candles(conn, coin, interval)
+            if len(candles) < 100: continue
             
             # Optimization grid
             best_ret = -100
@@ -86,7 +93,7 @@ def run_optimization():
             
             for length in [7, 10, 14]:
                 for mult in [2.0, 3.0, 4.0]:
-                    final_cap, trades = backtest_supertrend(df, length=length, multiplier=mult)
+                    final_cap, trades = backtest_supertrend(candles, length=length, multiplier=mult)
                     ret = ((final_cap - 1000) / 1000) * 100
                     if ret > best_ret:
                         best_ret = ret
@@ -0,0 +1,233 @@
+import math
+import os
+import resource
+import sqlite3
+import sys
+import time
+import numpy as np
+
+from market_data import DB_PATH, iter_candle_chunks, load_candles
+
+# --- Streaming Backtest ---
+# Out-of-core version of strategies/ema_trend_pullback.py for long 1m/5m histories.
+# Candles arrive as fixed-size blocks (market_data.iter_candle_chunks) and every
+# indicator keeps O(1) state, so peak memory depends on CHUNK_SIZE, not on history
+# length. The indicator updates repeat pandas' ewm recurrence step by step, so the
+# result is the same for any chunking, including one block holding the whole series.
+
+CHUNK_SIZE = 50000
+NAN = float('nan')
+
+# --- Streaming Indicators ---
+class Ewm:
+    """pandas ewm(alpha, adjust, min_periods).mean() one value at a time (ignore_na=False)."""
+    __slots__ = ('factor', 'new_wt', 'adjust', 'min_periods', 'weighted', 'old_wt', 'nobs', 'started')
+
+    def __init__(self, alpha, adjust=True, min_periods=0):
+        self.factor = 1.0 - alpha
+        self.new_wt = 1.0 if adjust else alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+        self.started = False
+
+    def update(self, x):
+        is_obs = x == x
+        self.nobs += is_obs
+        if not self.started:
+            self.weighted = x
+            self.started = True
+        elif self.weighted == self.weighted:
+            self.old_wt *= self.factor
+            if is_obs:
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + self.new_wt * x) / (self.old_wt + self.new_wt)
+                if self.adjust: self.old_wt += self.new_wt
+                else: self.old_wt = 1.0
+        elif is_obs:
+            self.weighted = x
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+class Ema:
+    """pandas_ta ema: SMA of the first `length` closes as seed, then ewm(span, adjust=False)."""
+    __slots__ = ('length', 'seed', 'ewm')
+
+    def __init__(self, length):
+        self.length = length
+        self.seed = []
+        self.ewm = Ewm(2.0 / (length + 1), adjust=False)
+
+    def update(self, close):
+        if self.seed is not None:
+            self.seed.append(close)
+            if len(self.seed) < self.length:
+                return self.ewm.update(NAN)
+            close = float(np.mean(np.array(self.seed)))
+            self.seed = None
+        return self.ewm.update(close)
+
+class Atr:
+    """pandas_ta atr (mamode 'rma'): true range smoothed with ewm(alpha=1/length, min_periods=length)."""
+    __slots__ = ('prev_close', 'rma')
+
+    def __init__(self, length=14):
+        self.prev_close = None
+        self.rma = Ewm(1.0 / length, adjust=True, min_periods=length)
+
+    def update(self, high, low, close):
+        if self.prev_close is None:
+            tr = NAN
+        else:
+            tr = max(abs(high - low), abs(high - self.prev_close), abs(self.prev_close - low))
+        self.prev_close = close
+        return self.rma.update(tr)
+
+# --- Strategy ---
+class EmaPullbackStream:
+    """
+    Same rules as backtest_ema_pullback(): trend filter on the previous bar's close vs
+    EMA(trend), entry when the bar touches EMA(entry) and closes beyond it, ATR SL/TP.
+    Position and the previous bar carry over between blocks.
+    """
+
+    def __init__(self, ema_trend=200, ema_entry=50, sl_atr=2.0, tp_atr=4.0, atr_length=14):
+        self.ema_trend = Ema(ema_trend)
+        self.ema_entry = Ema(ema_entry)
+        self.atr = Atr(atr_length)
+        self.sl_atr = sl_atr
+        self.tp_atr = tp_atr
+
+        self.capital = 1000.0
+        self.position = 0
+        self.entry_price = 0.0
+        self.stop_loss = 0.0
+        self.take_profit = 0.0
+        self.prev = None   # (close, ema_trend) of the previous bar with all indicators ready
+        self.trades = []
+        self.bars = 0
+
+    def feed(self, chunk):
+        ts, high, low, close = chunk['timestamp'], chunk['high'], chunk['low'], chunk['close']
+        ema_trend, ema_entry, atr = self.ema_trend.update, self.ema_entry.update, self.atr.update
+        capital, position, prev, trades = self.capital, self.position, self.prev, self.trades
+        entry_price, stop_loss, take_profit = self.entry_price, self.stop_loss, self.take_profit
+        sl_atr, tp_atr = self.sl_atr, self.tp_atr
+
+        for i in range(len(ts)):
+            price = float(close[i])
+            h = float(high[i])
+            l = float(low[i])
+            ema_t = ema_trend(price)
+            ema_e = ema_entry(price)
+            a = atr(h, l, price)
+            # Warmup bars (any indicator NaN) are skipped, like df.dropna()
+            if math.isnan(ema_t) or math.isnan(ema_e) or math.isnan(a):
+                continue
+            if prev is None:
+                prev = (price, ema_t)
+                continue
+
+            # --- Check Exit ---
+            if position != 0:
+                exit_reason = None
+                if position == 1:
+                    if l <= stop_loss: exit_price, exit_reason = stop_loss, "SL"
+                    elif h >= take_profit: exit_price, exit_reason = take_profit, "TP"
+                else:
+                    if h >= stop_loss: exit_price, exit_reason = stop_loss, "SL"
+                    elif l <= take_profit: exit_price, exit_reason = take_profit, "TP"
+
+                if exit_reason:
+                    if position == 1:
+                        profit = (exit_price - entry_price) * (capital / entry_price)
+                    else:
+                        profit = (entry_price - exit_price) * (capital / entry_price)
+                    capital += profit
+                    trades.append({'type': exit_reason, 'profit': profit, 'capital': capital})
+                    position = 0
+                    prev = (price, ema_t)
+                    continue
+
+            # --- Check Entry ---
+            if position == 0:
+                if prev[0] > prev[1] and l <= ema_e and price > ema_e:
+                    position = 1
+                    entry_price = price
+                    stop_loss = price - (a * sl_atr)
+                    take_profit = price + (a * tp_atr)
+                    trades.append({'type': 'ENTRY_LONG', 'price': price, 'date': int(ts[i])})
+                elif prev[0] < prev[1] and h >= ema_e and price < ema_e:
+                    position = -1
+                    entry_price = price
+                    stop_loss = price + (a * sl_atr)
+                    take_profit = price - (a * tp_atr)
+                    trades.append({'type': 'ENTRY_SHORT', 'price': price, 'date': int(ts[i])})
+            prev = (price, ema_t)
+
+        self.capital, self.position, self.prev = capital, position, prev
+        self.entry_price, self.stop_loss, self.take_profit = entry_price, stop_loss, take_profit
+        self.bars += len(ts)
+
+def backtest_ema_pullback_stream(chunks, **params):
+    """Runs the strategy over an iterable of candle blocks. Returns (capital, trades, bars)."""
+    strategy = EmaPullbackStream(**params)
+    for chunk in chunks:
+        strategy.feed(chunk)
+    return strategy.capital, strategy.trades, strategy.bars
+
+def same_trades(a, b, rel=1e-9):
+    """Trade lists equal up to float rounding (pandas_ta vs the step-by-step indicators)."""
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        if x.keys() != y.keys():
+            return False
+        for key in x:
+            if isinstance(x[key], float):
+                if not math.isclose(x[key], y[key], rel_tol=rel, abs_tol=rel):
+                    return False
+            elif x[key] != y[key]:
+                return False
+    return True
+
+def verify_in_memory(conn, symbol, interval, capital, trades):
+    """Runs strategies/ema_trend_pullback.backtest_ema_pullback on the same candles and compares."""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "strategies"))
+    from ema_trend_pullback import backtest_ema_pullback
+    capital_mem, trades_mem = backtest_ema_pullback(load_candles(conn, symbol, interval))
+    same = math.isclose(capital_mem, capital, rel_tol=1e-9) and same_trades(trades_mem, trades)
+    print(f"backtest_ema_pullback: capital {capital_mem:.6f} vs {capital:.6f}, "
+          f"{len(trades_mem)} vs {len(trades)} trade events -> {'MATCH' if same else 'MISMATCH'}")
+    if not same:
+        for k, (x, y) in enumerate(zip(trades_mem, trades)):
+            if not same_trades([x], [y]):
+                print(f"  first difference at event {k}: {x} vs {y}")
+                break
+    return same
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+if __name__ == "__main__":
+    # Usage: stream_backtest.py SYMBOL INTERVAL [chunk_size] [--verify]
+    # --verify also runs the in-memory backtest_ema_pullback on the same candles and
+    # compares trades and return (equal up to float rounding). Exits 1 on a mismatch.
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    symbol = args[0] if len(args) > 0 else 'BTC'
+    interval = args[1] if len(args) > 1 else '5m'
+    chunk_size = int(args[2]) if len(args) > 2 else CHUNK_SIZE
+
+    conn = sqlite3.connect(DB_PATH)
+    t0 = time.perf_counter()
+    capital, trades, bars = backtest_ema_pullback_stream(iter_candle_chunks(conn, symbol, interval, chunk_size))
+    elapsed = time.perf_counter() - t0
+
+    ret = ((capital - 1000) / 1000) * 100
+    print(f"{symbol} {interval}: Return {ret:.2f}% | Trades: {len(trades)/2:.0f} | {bars} candles in {elapsed:.1f}s "
+          f"({chunk_size} per block, peak RSS {peak_rss_mb():.0f} MB)")
+
+    same = verify_in_memory(conn, symbol, interval, capital, trades) if '--verify' in sys.argv else True
+    conn.close()
+    sys.exit(0 if same else 1)
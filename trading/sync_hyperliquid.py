@@ -3,8 +3,15 @@ import requests
 import time
 import os
 import sys
+import socket
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+from candle_validation import from_api, init_quarantine, store_candles
+from market_data import INTERVAL_MS
+
 # Configuration
 DB_PATH = "/home/manni/.openclaw/workspace/trading/data/hyperliquid.db"
 API_URL = "https://api.hyperliquid.xyz/info"
@@ -12,11 +19,75 @@ TIMEFRAMES = ["15m", "1h", "4h"]
 # Default lookback for fresh sync (e.g. 30 days). Increase if needed, but mind API limits.
 MAX_LOOKBACK_DAYS = 365 * 2 # 2 years
 
-# List of coins to track. We can make this dynamic later.
+# Watchlist: always in the top refresh tier of the universe (universe.py)
 COINS = ["BTC", "ETH", "SOL", "BNB", "ARB", "OP", "SUI", "MATIC", "LINK", "DOGE"] 
+# True: sync every listed perp through the tiered scheduler, False: only COINS, all every run
+SYNC_UNIVERSE = True
+
+# Unix socket of scanner_daemon.py (notified whenever a candle closes)
+SCANNER_SOCKET = "/home/manni/.openclaw/workspace/trading/data/scanner.sock"
+
+# Backfill: a response holds at most MAX_CANDLES_PER_REQUEST candles, so long ranges are
+# cut into disjoint shards of that size and fetched concurrently. Every request of every
+# thread draws from one weight budget (info endpoint limit per IP): base weight per
+# request plus one per ITEMS_PER_WEIGHT candles returned.
+MAX_CANDLES_PER_REQUEST = 5000
+BACKFILL_WORKERS = 4
+WEIGHT_PER_MINUTE = 1200
+WEIGHT_WINDOW_S = 61.0  # One minute plus a second of clock slack
+REQUEST_WEIGHT = 20
+ITEMS_PER_WEIGHT = 60
+
+class RateLimiter:
+    """
+    Sliding window over request weight (the API's own rule), shared by all fetch threads.
+    A request reserves its worst-case weight before it is sent and settles to the real
+    weight once the response is in, so requests in flight never overdraw the budget.
+    A 429 pauses everyone.
+    """
+
+    def __init__(self, per_minute=WEIGHT_PER_MINUTE, window=WEIGHT_WINDOW_S):
+        self.limit = per_minute
+        self.window = window
+        self.entries = deque()  # [sent, weight]
+        self.paused_until = 0.0
+        self.total = 0  # Weight spent since start (settled), for per-cycle budgets
+        self.lock = threading.Lock()
+
+    def acquire(self, weight):
+        weight = min(weight, self.limit)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.entries and self.entries[0][0] <= now - self.window:
+                    self.entries.popleft()
+                used = sum(e[1] for e in self.entries)
+                if now >= self.paused_until and used + weight <= self.limit:
+                    entry = [now, weight]
+                    self.entries.append(entry)
+                    self.total += weight
+                    return entry
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    wait = self.entries[0][0] + self.window - now # Oldest reservation expires
+            time.sleep(max(wait, 0.01))
+
+    def settle(self, entry, weight):
+        with self.lock:
+            self.total += weight - entry[1]
+            entry[1] = weight
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+LIMITER = RateLimiter()
 
 def init_db():
     conn = sqlite3.connect(DB_PATH)
+    # WAL: readers (scanner, dashboard, snapshot.py) never block the sync's commits
+    conn.execute("PRAGMA journal_mode=WAL")
     c = conn.cursor()
     # Ensure table exists with correct schema
     c.execute('''
@@ -32,6 +103,17 @@ def init_db():
             PRIMARY KEY (symbol, interval, timestamp)
         )
     ''')
+    # Oldest candle the API has for a series (nothing before it), so a short history is
+    # not re-requested on every sync
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sync_floor (
+            symbol TEXT,
+            interval TEXT,
+            floor_ts INTEGER,
+            PRIMARY KEY (symbol, interval)
+        )
+    ''')
+    init_quarantine(conn) # Candles rejected by the validation on ingest
     conn.commit()
     conn.close()
 
@@ -43,6 +125,18 @@ def get_time_range(coin, interval):
     conn.close()
     return result if result and result[0] else (None, None)
 
+def get_floor(coin, interval):
+    conn = sqlite3.connect(DB_PATH)
+    row = conn.execute('SELECT floor_ts FROM sync_floor WHERE symbol = ? AND interval = ?', (coin, interval)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def set_floor(coin, interval, floor_ts):
+    conn = sqlite3.connect(DB_PATH)
+    with conn:
+        conn.execute('INSERT OR REPLACE INTO sync_floor (symbol, interval, floor_ts) VALUES (?, ?, ?)', (coin, interval, floor_ts))
+    conn.close()
+
 def fetch_candles_chunk(coin, interval, start_time, end_time):
     payload = {
         "type": "candleSnapshot",
@@ -56,17 +150,22 @@ def fetch_candles_chunk(coin, interval, start_time, end_time):
     
     max_retries = 5
     backoff = 2
+    # Worst case: a full response for the requested range
+    expected = min(MAX_CANDLES_PER_REQUEST, max(0, (end_time - start_time) // INTERVAL_MS[interval] + 1))
     
     for i in range(max_retries):
         try:
+            entry = LIMITER.acquire(REQUEST_WEIGHT + expected // ITEMS_PER_WEIGHT)
             response = requests.post(API_URL, json=payload, headers={"Content-Type": "application/json"}, timeout=15)
             if response.status_code == 429:
                 print(f"Rate limited (429). Waiting {backoff}s...", flush=True)
-                time.sleep(backoff)
+                LIMITER.settle(entry, REQUEST_WEIGHT)
+                LIMITER.pause(backoff)
                 backoff *= 2
                 continue
             response.raise_for_status()
             data = response.json()
+            LIMITER.settle(entry, REQUEST_WEIGHT + len(data) // ITEMS_PER_WEIGHT)
             return data
         except Exception as e:
             if i == max_retries - 1:
@@ -74,36 +173,186 @@ def fetch_candles_chunk(coin, interval, start_time, end_time):
             else:
                 time.sleep(1)
                 continue
-    return []
+    # None, not []: an empty list means the exchange has no candles in the range
+    return None
 
 def save_candles(coin, interval, candles):
+    """Validates and stores one fetched chunk (candle_validation.py). Returns candles saved."""
     if not candles:
         return 0
-        
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    count = 0
-    
-    for candle in candles:
-        try:
-            ts = candle['t']
-            o = float(candle['o'])
-            h = float(candle['h'])
-            l = float(candle['l'])
-            cl = float(candle['c'])
-            v = float(candle['v'])
-            
-            c.execute('''
-                INSERT OR REPLACE INTO candles (symbol, interval, timestamp, open, high, low, close, volume)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (coin, interval, ts, o, h, l, cl, v))
-            count += 1
-        except Exception as e:
-            continue
-            
-    conn.commit()
+
+    arrays, dropped = from_api(candles)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    saved, quarantined = store_candles(conn, coin, interval, arrays)
     conn.close()
-    return count
+    if quarantined or dropped:
+        print(f"  {coin} {interval}: Quarantined {quarantined} candles, dropped {dropped} without open time", flush=True)
+    return saved
+
+def notify_candle_closed(coin, interval, candles, now_ms):
+    """Tells a running scanner daemon about the newest closed candle. No-op if none is listening."""
+    if not os.path.exists(SCANNER_SOCKET):
+        return
+    closed = [c['t'] for c in candles if c['t'] + INTERVAL_MS[interval] <= now_ms]
+    if not closed:
+        return
+    try:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        s.sendto(f"{coin} {interval} {closed[-1]}".encode(), SCANNER_SOCKET)
+        s.close()
+    except OSError:
+        pass
+
+# --- Backfill ---
+def plan_shards(start_ms, end_ms, interval):
+    """Disjoint [start, end] ranges of at most MAX_CANDLES_PER_REQUEST candles on the interval grid."""
+    step = INTERVAL_MS[interval]
+    span = MAX_CANDLES_PER_REQUEST * step
+    shard_start = -(-start_ms // step) * step
+    shards = []
+    while shard_start <= end_ms:
+        shards.append((shard_start, min(shard_start + span - 1, end_ms)))
+        shard_start += span
+    return shards
+
+def fetch_shard(coin, interval, start_ms, end_ms):
+    """
+    All candles of one shard. Continues inside the shard if a full response stopped short
+    of its end. Returns (candles, ok); ok is False if a request ran out of retries.
+    """
+    step = INTERVAL_MS[interval]
+    out = []
+    while start_ms <= end_ms:
+        candles = fetch_candles_chunk(coin, interval, start_ms, end_ms)
+        if candles is None:
+            return out, False
+        if not candles:
+            break
+        out.extend(candles)
+        last = candles[-1]['t']
+        if len(candles) < MAX_CANDLES_PER_REQUEST or last + step > end_ms:
+            break
+        start_ms = last + 1
+    return out, True
+
+def stitch(parts, interval):
+    """
+    Merges shard results by open time (overlaps deduplicated). Returns (candles ascending,
+    gaps) with gaps as (first missing, last missing) open times between the first and last candle.
+    """
+    step = INTERVAL_MS[interval]
+    by_ts = {}
+    for candles in parts:
+        for candle in candles:
+            by_ts[candle['t']] = candle
+    ts = sorted(by_ts)
+    gaps = [(a + step, b - step) for a, b in zip(ts, ts[1:]) if b - a > step]
+    return [by_ts[t] for t in ts], gaps
+
+def backfill_series(coin, interval, start_ms, end_ms, workers=BACKFILL_WORKERS):
+    """
+    Fetches [start_ms, end_ms] as concurrent shards under the shared LIMITER, stitches them
+    and re-fetches failed shards (retries ran out) and gaps once. Returns (candles, gaps left,
+    complete); complete is True only if every request of the range finally succeeded.
+    Gaps that survive the re-fetch of a complete range are holes on the exchange side.
+    """
+    def fetch(shard):
+        return fetch_shard(coin, interval, *shard)
+
+    shards = plan_shards(start_ms, end_ms, interval)
+    if not shards:
+        return [], [], True
+    with ThreadPoolExecutor(min(workers, len(shards))) as pool:
+        results = list(pool.map(fetch, shards))
+        parts = [candles for candles, _ in results]
+        candles, gaps = stitch(parts, interval)
+        failed = [shard for shard, (_, ok) in zip(shards, results) if not ok]
+        retry = failed + [shard for gap in gaps for shard in plan_shards(gap[0], gap[1], interval)]
+        if retry:
+            results = list(pool.map(fetch, retry))
+            parts.extend(candles for candles, _ in results)
+            candles, gaps = stitch(parts, interval)
+            # A failed shard counts as fetched once its re-fetch went through
+            failed = [shard for shard, (_, ok) in zip(retry[:len(failed)], results) if not ok]
+    return candles, gaps, not failed
+
+def backfill(coin, interval, start_ms, end_ms):
+    """Backfills one range, saves it and records the series' floor. Returns candles saved."""
+    t0 = time.time()
+    n_shards = len(plan_shards(start_ms, end_ms, interval))
+    candles, gaps, complete = backfill_series(coin, interval, start_ms, end_ms)
+    saved = save_candles(coin, interval, candles)
+    # Nothing older on the exchange: the floor is the oldest candle it returned, or for an
+    # empty range the oldest one already stored (an older-range fill ends right before it).
+    # Only from a range fetched without errors; otherwise the missing leading part is
+    # requested again next sync (the older-range check sees no floor below the data).
+    if complete and not candles:
+        set_floor(coin, interval, end_ms + 1)
+    elif complete and candles[0]['t'] >= start_ms + INTERVAL_MS[interval]:
+        set_floor(coin, interval, candles[0]['t'])
+    note = f", {len(gaps)} gaps left (first {datetime.fromtimestamp(gaps[0][0]/1000)})" if gaps else ""
+    if not complete:
+        note += ", fetch errors (no floor recorded, retried next sync)"
+    print(f"  {coin} {interval}: Backfilled {saved} candles in {n_shards} shards ({time.time() - t0:.1f}s){note}", flush=True)
+    return saved
+
+def sync_series(coin, interval, current_time_ms, target_start_time):
+    """Backfills missing history of one series if needed, then tops it up to now. Returns candles saved."""
+    label = f"{coin} {interval}"
+    saved_total = 0
+    min_ts, max_ts = get_time_range(coin, interval)
+    floor = get_floor(coin, interval)
+
+    if min_ts is not None:
+         # Check if we have data going back far enough (allow 7 days slack)
+         if min_ts > target_start_time + (7 * 86400 * 1000) and (floor is None or min_ts > floor):
+             print(f"  {label}: Existing data starts {datetime.fromtimestamp(min_ts/1000)}. Fetching older data from {datetime.fromtimestamp(target_start_time/1000)}...", flush=True)
+             saved_total += backfill(coin, interval, target_start_time, min_ts - 1)
+         else:
+             print(f"  {label}: History looks good (starts {datetime.fromtimestamp(min_ts/1000)}). Resuming from {datetime.fromtimestamp(max_ts/1000)}...", flush=True)
+    else:
+         print(f"  {label}: Initial fetch (last {MAX_LOOKBACK_DAYS/365:.1f} years)", flush=True)
+         saved_total += backfill(coin, interval, target_start_time, current_time_ms)
+         min_ts, max_ts = get_time_range(coin, interval)
+
+    # Forward from the newest stored candle (usually one request)
+    chunk_start = max_ts + 1 if max_ts is not None else target_start_time
+    loop_guard = 0
+    prev_last_ts = None
+
+    while chunk_start < current_time_ms:
+        loop_guard += 1
+        if loop_guard > 500: # Safety break
+            print(f"  {label}: Loop guard hit (500 iterations). Breaking.", flush=True)
+            break
+
+        candles = fetch_candles_chunk(coin, interval, chunk_start, current_time_ms)
+
+        if candles is None:
+            print(f"  {label}: Fetch failed, resuming from {datetime.fromtimestamp(chunk_start/1000)} next sync.", flush=True)
+            break
+        if not candles:
+            print(f"  {label}: No more candles returned from API.", flush=True)
+            break
+
+        last_candle_ts = candles[-1]['t']
+        if last_candle_ts == prev_last_ts:
+            print(f"  {label}: No new candles (stuck at {datetime.fromtimestamp(last_candle_ts/1000)}). breaking.", flush=True)
+            break
+        prev_last_ts = last_candle_ts
+
+        saved = save_candles(coin, interval, candles)
+        saved_total += saved
+        notify_candle_closed(coin, interval, candles, int(time.time() * 1000))
+        print(f"  {label}: Fetched {len(candles)} candles. Saved {saved}. Latest: {datetime.fromtimestamp(last_candle_ts/1000)}", flush=True)
+
+        if last_candle_ts >= current_time_ms - 60000:
+            print(f"  {label}: Caught up to now.", flush=True)
+            break
+
+        chunk_start = last_candle_ts + 1
+
+    return saved_total
 
 def sync_coin(coin):
     print(f"Syncing {coin}...", flush=True)
@@ -112,67 +361,22 @@ def sync_coin(coin):
     target_start_time = int((time.time() - (MAX_LOOKBACK_DAYS * 86400)) * 1000)
     
     for interval in TIMEFRAMES:
-        min_ts, max_ts = get_time_range(coin, interval)
-        
-        start_time = target_start_time
-        
-        if min_ts is not None:
-             # Check if we have data going back far enough (allow 7 days slack)
-             if min_ts > target_start_time + (7 * 86400 * 1000):
-                 print(f"  {interval}: Existing data starts {datetime.fromtimestamp(min_ts/1000)}. Fetching older data from {datetime.fromtimestamp(target_start_time/1000)}...", flush=True)
-                 start_time = target_start_time
-             else:
-                 print(f"  {interval}: History looks good (starts {datetime.fromtimestamp(min_ts/1000)}). Resuming from {datetime.fromtimestamp(max_ts/1000)}...", flush=True)
-                 start_time = max_ts + 1
-        else:
-             print(f"  {interval}: Initial fetch (last {MAX_LOOKBACK_DAYS/365:.1f} years)", flush=True)
-             start_time = target_start_time
-
-        chunk_start = start_time
-        loop_guard = 0
-        prev_last_ts = None
-        
-        while chunk_start < current_time_ms:
-            loop_guard += 1
-            if loop_guard > 500: # Safety break
-                print(f"  {interval}: Loop guard hit (500 iterations). Breaking.", flush=True)
-                break
-                
-            candles = fetch_candles_chunk(coin, interval, chunk_start, current_time_ms)
-            
-            if not candles:
-                print(f"  {interval}: No more candles returned from API.", flush=True)
-                break
-                
-            last_candle_ts = candles[-1]['t']
-            if last_candle_ts == prev_last_ts:
-                print(f"  {interval}: No new candles (stuck at {datetime.fromtimestamp(last_candle_ts/1000)}). breaking.", flush=True)
-                break
-            prev_last_ts = last_candle_ts
-
-            saved = save_candles(coin, interval, candles)
-            total_saved += saved
-            print(f"  {interval}: Fetched {len(candles)} candles. Saved {saved}. Latest: {datetime.fromtimestamp(last_candle_ts/1000)}", flush=True)
-            
-            if last_candle_ts >= current_time_ms - 60000:
-                print(f"  {interval}: Caught up to now.", flush=True)
-                break
-                
-            chunk_start = last_candle_ts + 1
-            time.sleep(1.0) # Rate limit: 1s
+        total_saved += sync_series(coin, interval, current_time_ms, target_start_time)
 
     print(f"  Saved {total_saved} new candles for {coin}.", flush=True)
 
-if __name__ == "__main__":
+def run_sync():
     init_db()
     print(f"Starting sync at {datetime.now()}", flush=True)
-    for coin in COINS:
-        sync_coin(coin)
+    if SYNC_UNIVERSE:
+        from universe import refresh_cycle
+        refresh_cycle()
+    else:
+        for coin in COINS:
+            sync_coin(coin)
     print("Sync complete.", flush=True)
-    
-    # Update Dashboard Data
-    try:
-        import subprocess
-        subprocess.run(["python3", "/home/manni/.openclaw/workspace/trading/dashboard/data_exporter.py"], check=True)
-    except Exception as e:
-        print(f"Dashboard update failed: {e}")
+
+if __name__ == "__main__":
+    # Sync, then every downstream stage whose inputs advanced (resample, scan, export, ...)
+    from pipeline import sync_cycle
+    sync_cycle()
@@ -0,0 +1,386 @@
+import json
+import sqlite3
+import sys
+import time
+import numpy as np
+
+from market_data import COLUMNS, DB_PATH, load_latest_rows
+
+# --- Information-Driven Bars ---
+# Trade prints (time ms, price, size, side +1 buy / -1 sell aggressor) are streamed
+# chunk by chunk through aggregators that close a bar on activity instead of the clock:
+#   volume bars          - every `size` coins traded
+#   dollar bars          - every `size` USD of notional traded
+#   tick imbalance bars  - once the signed tick count since the bar opened exceeds what
+#                          recent bars lead to expect (E[T] * |E[b]|, both EWMAs)
+# Memory is constant: between chunks an aggregator only keeps the open bar and its
+# counters (STATE), which are also saved per series in bar_state after every chunk so
+# the next replay continues exactly where the last one stopped. Progress is the key
+# (time of the last trade, trades seen at that ms): multi-fill taker orders put several
+# prints on one ms, and a chunk boundary or replay can fall between them.
+# Bars are stored in the candles table under their own interval label (e.g.
+# 'v50'), timestamp = open time of the bar (bumped by 1 ms if two bars open in the same
+# ms, it is the primary key), so load_candles() and every strategy run on them as-is.
+
+REPLAY_CHUNK = 100000  # Trades per chunk
+IMBALANCE_SPAN = 20    # Bars in the E[T] / E[b] EWMAs
+IMBALANCE_FLOOR = 0.1  # |E[b]| never counts as lower (balanced flow would make bars of 1 tick)
+
+# interval label -> (kind, size); '*' applies to coins without their own entry
+BAR_SPECS = {
+    'BTC': {'v10': ('volume', 10.0), 'd1m': ('dollar', 1e6), 'tib200': ('tick_imbalance', 200)},
+    'ETH': {'v200': ('volume', 200.0), 'd1m': ('dollar', 1e6), 'tib200': ('tick_imbalance', 200)},
+    '*': {'d250k': ('dollar', 2.5e5), 'tib200': ('tick_imbalance', 200)},
+}
+
+# --- Aggregation ---
+def empty_bars():
+    return {col: np.zeros(0, dtype=np.int64 if col == 'timestamp' else np.float64) for col in COLUMNS}
+
+def cut_bars(t, px, sz, ends, open_bar):
+    """
+    Bars over one chunk, closing after each trade index in `ends` (ascending). The first
+    bar continues `open_bar` (the unfinished bar of the previous chunk, or None).
+    Returns (closed bars {column: array}, new open bar or None).
+    """
+    n = len(t)
+    starts = np.r_[0, ends[:-1] + 1] if len(ends) else np.zeros(0, dtype=np.int64)
+    bars = empty_bars()
+    if len(ends):
+        stop = ends[-1] + 1 # Segment k is [starts[k], ends[k]]
+        bars = {
+            'timestamp': t[starts],
+            'open': px[starts],
+            'high': np.maximum.reduceat(px[:stop], starts),
+            'low': np.minimum.reduceat(px[:stop], starts),
+            'close': px[ends],
+            'volume': np.add.reduceat(sz[:stop], starts),
+        }
+        if open_bar is not None:
+            bars['timestamp'][0] = open_bar['timestamp']
+            bars['open'][0] = open_bar['open']
+            bars['high'][0] = max(bars['high'][0], open_bar['high'])
+            bars['low'][0] = min(bars['low'][0], open_bar['low'])
+            bars['volume'][0] += open_bar['volume']
+            open_bar = None
+
+    rest = ends[-1] + 1 if len(ends) else 0
+    if rest < n:
+        tail = {'timestamp': int(t[rest]), 'open': float(px[rest]), 'high': float(px[rest:].max()),
+                'low': float(px[rest:].min()), 'close': float(px[-1]), 'volume': float(sz[rest:].sum())}
+        if open_bar is not None:
+            tail.update(timestamp=open_bar['timestamp'], open=open_bar['open'],
+                        high=max(tail['high'], open_bar['high']), low=min(tail['low'], open_bar['low']),
+                        volume=tail['volume'] + open_bar['volume'])
+        open_bar = tail
+    return bars, open_bar
+
+class ThresholdBars:
+    """Volume or dollar bars: a bar closes on the trade that takes the running total past the next multiple of `size`."""
+    STATE = ('acc', 'open_bar')
+
+    def __init__(self, size, measure='volume'):
+        self.size = float(size)
+        self.measure = measure
+        self.acc = 0.0        # Measure since the last close, always < size
+        self.open_bar = None
+
+    def update(self, t, px, sz, side):
+        m = sz if self.measure == 'volume' else px * sz
+        k = np.floor((self.acc + np.cumsum(m)) / self.size)
+        # Overshoot carries into the next bar, so bars average exactly `size`
+        ends = np.flatnonzero(np.diff(np.r_[0.0, k]) > 0)
+        self.acc = (self.acc + m.sum()) - k[-1] * self.size if len(k) else self.acc
+        bars, self.open_bar = cut_bars(t, px, sz, ends, self.open_bar)
+        return bars
+
+class TickImbalanceBars:
+    """
+    Tick imbalance bars. theta = sum of aggressor signs since the bar opened; the bar
+    closes once |theta| >= E[T] * max(|E[b]|, IMBALANCE_FLOOR). E[T] (ticks per bar) is
+    kept within [expected / 4, expected * 4] so the threshold can't run away.
+    """
+    STATE = ('exp_ticks', 'exp_b', 'theta', 'ticks', 'open_bar')
+
+    def __init__(self, expected_ticks, span=IMBALANCE_SPAN):
+        self.expected = float(expected_ticks)
+        self.exp_ticks = float(expected_ticks)
+        self.exp_b = 0.0
+        self.alpha = 2.0 / (span + 1)
+        self.theta = 0.0      # Of the open bar
+        self.ticks = 0
+        self.open_bar = None
+
+    def threshold(self):
+        return self.exp_ticks * max(abs(self.exp_b), IMBALANCE_FLOOR)
+
+    def close_bar(self, theta, ticks):
+        self.exp_ticks += self.alpha * (ticks - self.exp_ticks)
+        self.exp_ticks = min(max(self.exp_ticks, self.expected / 4), self.expected * 4)
+        self.exp_b += self.alpha * (theta / ticks - self.exp_b)
+
+    def update(self, t, px, sz, side):
+        n = len(t)
+        cum = np.cumsum(side, dtype=np.float64)
+        ends = []
+        start = 0
+        base = self.theta  # theta before trade `start`, minus the cum up to it
+        while start < n:
+            thr = self.threshold()
+            offset = cum[start - 1] if start else 0.0
+            window = max(int(thr * 4), 64)
+            while True:
+                stop = min(n, start + window)
+                theta = base + cum[start:stop] - offset
+                hit = np.flatnonzero(np.abs(theta) >= thr)
+                if len(hit) or stop == n:
+                    break
+                window *= 2
+            if not len(hit):
+                self.theta = float(theta[-1])
+                self.ticks += n - start
+                break
+            end = start + int(hit[0])
+            ticks = self.ticks + end - start + 1
+            self.close_bar(float(theta[hit[0]]), ticks)
+            ends.append(end)
+            start, base, self.ticks, self.theta = end + 1, 0.0, 0, 0.0
+        bars, self.open_bar = cut_bars(t, px, sz, np.array(ends, dtype=np.int64), self.open_bar)
+        return bars
+
+def make_aggregator(kind, size):
+    if kind == 'volume':
+        return ThresholdBars(size, 'volume')
+    if kind == 'dollar':
+        return ThresholdBars(size, 'dollar')
+    if kind == 'tick_imbalance':
+        return TickImbalanceBars(size)
+    raise ValueError(f"Unknown bar kind {kind}")
+
+# --- Trade Feeds ---
+# A feed yields chunks (time ms int64, price, size, side +1/-1) of one coin, ascending.
+def parse_trades(records, coin=None):
+    """Hyperliquid trade dicts ({'coin', 'side': 'B'/'A', 'px', 'sz', 'time'}) -> chunk arrays."""
+    rows = [(r['time'], r['px'], r['sz'], 1.0 if r['side'] == 'B' else -1.0)
+            for r in records if coin is None or r.get('coin') == coin]
+    if not rows:
+        return None
+    t, px, sz, side = zip(*rows)
+    return (np.array(t, dtype=np.int64), np.array(px, dtype=np.float64),
+            np.array(sz, dtype=np.float64), np.array(side, dtype=np.float64))
+
+def replay_file(path, coin, chunk=REPLAY_CHUNK):
+    """
+    Recorded trades, one JSON per line: a trade dict or a websocket message
+    {"channel": "trades", "data": [trades]}.
+    """
+    records = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            msg = json.loads(line)
+            if isinstance(msg, dict) and msg.get('channel') == 'trades':
+                records.extend(msg['data'])
+            elif isinstance(msg, list):
+                records.extend(msg)
+            else:
+                records.append(msg)
+            if len(records) >= chunk:
+                arrays = parse_trades(records, coin)
+                records = []
+                if arrays is not None:
+                    yield arrays
+    arrays = parse_trades(records, coin)
+    if arrays is not None:
+        yield arrays
+
+def synthetic_trades(n, chunk=REPLAY_CHUNK, start_ms=None, price=60000.0, rate=50.0, seed=0):
+    """
+    Local stand-in feed: `n` trades at ~`rate` per second, log-normal sizes and a price
+    that moves with order flow (runs of same-side trades like a real tape).
+    """
+    rng = np.random.default_rng(seed)
+    t = start_ms if start_ms is not None else int(time.time() * 1000) - int(n / rate * 1000)
+    for first in range(0, n, chunk):
+        m = min(chunk, n - first)
+        t_arr = t + np.cumsum(rng.exponential(1000.0 / rate, m)).astype(np.int64)
+        flips = rng.random(m) < 0.3
+        side = np.where(np.cumsum(flips) % 2 == 0, 1.0, -1.0)
+        px = price * np.exp(np.cumsum(side * rng.exponential(2e-5, m)))
+        sz = rng.lognormal(-3.0, 1.2, m)
+        t, price = int(t_arr[-1]), float(px[-1])
+        yield t_arr, px, sz, side
+
+# --- Storage ---
+def unique_times(ts, last_ts):
+    """Strictly increasing open times: s[i] = max(ts[i], s[i-1] + 1), s[-1] = last_ts."""
+    idx = np.arange(len(ts), dtype=np.int64)
+    return np.maximum.accumulate(np.maximum(ts - idx, last_ts + 1)) + idx
+
+def save_bars(conn, symbol, interval, bars, last_ts):
+    """Writes closed bars, returns the newest stored open time."""
+    if not len(bars['timestamp']):
+        return last_ts
+    ts = unique_times(bars['timestamp'], last_ts)
+    conn.executemany('''
+        INSERT OR REPLACE INTO candles (symbol, interval, timestamp, open, high, low, close, volume)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', zip([symbol] * len(ts), [interval] * len(ts), ts.tolist(),
+             *(bars[col].tolist() for col in COLUMNS[1:])))
+    return int(ts[-1])
+
+def init_bar_state(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bar_state (
+            symbol TEXT,
+            interval TEXT,
+            last_trade_ms INTEGER,
+            state TEXT,
+            PRIMARY KEY (symbol, interval)
+        )
+    ''')
+
+def save_state(conn, symbol, interval, spec, agg, resume):
+    last_trade_ms, seen = resume
+    state = {'spec': list(spec), 'seen': seen, **{name: getattr(agg, name) for name in agg.STATE}}
+    conn.execute("INSERT OR REPLACE INTO bar_state (symbol, interval, last_trade_ms, state) VALUES (?, ?, ?, ?)",
+                 (symbol, interval, last_trade_ms, json.dumps(state)))
+
+def unseen(t, skip):
+    """
+    Skips what a previous replay already aggregated: every trade before the resume key's
+    ms and the first `seen` at it. Returns (index of the first new trade in ascending `t`,
+    what is left to skip in the next chunk, None once the feed is past the key).
+    """
+    last_ms, seen = skip
+    lo = int(np.searchsorted(t, last_ms, side='left'))
+    hi = int(np.searchsorted(t, last_ms, side='right'))
+    start = lo + min(seen, hi - lo)
+    if hi < len(t):
+        return start, None
+    return start, (last_ms, seen - (start - lo))
+
+def advance(t, start, resume):
+    """Resume key after the trades t[start:] went through an aggregator."""
+    last_ms = int(t[-1])
+    if last_ms == resume[0]:
+        return last_ms, resume[1] + len(t) - start # All of them on the same ms as before
+    return last_ms, len(t) - int(np.searchsorted(t, last_ms, side='left'))
+
+def build_bars(conn, symbol, feed, specs=None):
+    """
+    Streams a feed through every bar spec of the coin and stores the closed bars. Each
+    aggregator resumes from its saved state and skips trades it has already seen, so a
+    replay can be re-run or extended. Returns {interval: bars written}.
+    """
+    specs = specs or BAR_SPECS.get(symbol, BAR_SPECS['*'])
+    init_bar_state(conn)
+    saved = {row[0]: (row[1], json.loads(row[2])) for row in
+             conn.execute("SELECT interval, last_trade_ms, state FROM bar_state WHERE symbol = ?", (symbol,))}
+    latest = load_latest_rows(conn, [(symbol, interval) for interval in specs])
+
+    aggregators, resume, skip, last_ts = {}, {}, {}, {}
+    for interval, (kind, size) in specs.items():
+        agg = make_aggregator(kind, size)
+        newest = latest[(symbol, interval)][0] if (symbol, interval) in latest else -1
+        if interval in saved and saved[interval][1]['spec'] == [kind, size]:
+            for name in agg.STATE:
+                setattr(agg, name, saved[interval][1][name])
+            # State saved before the seen count: every trade on its last ms went in
+            resume[interval] = (saved[interval][0], saved[interval][1].get('seen', sys.maxsize))
+            last_ts[interval] = newest
+        else:
+            # No (matching) state: rebuild from the newest stored bar's open on, replacing it
+            resume[interval], last_ts[interval] = (newest, 0), newest - 1
+        aggregators[interval] = agg
+        skip[interval] = resume[interval]
+
+    written = {interval: 0 for interval in specs}
+    n_trades = 0
+    agg_s = 0.0
+    for t, px, sz, side in feed:
+        n_trades += len(t)
+        with conn:
+            for interval, agg in aggregators.items():
+                start = 0
+                if skip[interval] is not None:
+                    start, skip[interval] = unseen(t, skip[interval])
+                if start == len(t):
+                    continue
+                t0 = time.perf_counter()
+                bars = agg.update(t[start:], px[start:], sz[start:], side[start:])
+                agg_s += time.perf_counter() - t0
+                last_ts[interval] = save_bars(conn, symbol, interval, bars, last_ts[interval])
+                written[interval] += len(bars['timestamp'])
+                resume[interval] = advance(t, start, resume[interval])
+                save_state(conn, symbol, interval, specs[interval], agg, resume[interval])
+
+    rate = n_trades * len(aggregators) / agg_s / 1e6 if agg_s else 0.0
+    print(f"{symbol}: {n_trades} trades -> " + ", ".join(f"{i}: {n} bars" for i, n in written.items()) +
+          f" (aggregation {rate:.1f}M trades/s per bar type)", flush=True)
+    return written
+
+# --- Resume Check ---
+def load_bars(conn, symbol, specs):
+    return {interval: conn.execute("SELECT timestamp, open, high, low, close, volume FROM candles "
+                                   "WHERE symbol = ? AND interval = ? ORDER BY timestamp", (symbol, interval)).fetchall()
+            for interval in specs}
+
+def check_resume(n=20000, chunk=1001, fills=4, symbol='BTC'):
+    """
+    Builds the bars of one synthetic tape in a single pass and again in `chunk`-sized
+    chunks over two runs, the second replaying the tail of the first (every `fills`
+    prints share a ms, so boundaries split them). True if the bars match.
+    """
+    t, px, sz, side = (np.concatenate(a) for a in zip(*synthetic_trades(n, seed=1)))
+    t = t[np.arange(n) // fills * fills] # Multi-fill taker orders
+    specs = BAR_SPECS.get(symbol, BAR_SPECS['*'])
+
+    def chunks(lo, hi):
+        for first in range(lo, hi, chunk):
+            stop = min(first + chunk, hi)
+            yield t[first:stop], px[first:stop], sz[first:stop], side[first:stop]
+
+    results = []
+    half = n // 2 + fills // 2 # The first run ends inside a ms
+    for runs in ([(0, n)], [(0, half), (half - 3 * chunk, n)]):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE candles (symbol TEXT, interval TEXT, timestamp INTEGER, open REAL, high REAL, "
+                     "low REAL, close REAL, volume REAL, PRIMARY KEY (symbol, interval, timestamp))")
+        for lo, hi in runs:
+            build_bars(conn, symbol, chunks(lo, hi) if len(runs) > 1 else iter([(t, px, sz, side)]), specs)
+        results.append(load_bars(conn, symbol, specs))
+        conn.close()
+
+    ok = True
+    for interval in specs:
+        single, chunked = (np.array(r[interval], dtype=np.float64).reshape(-1, 6) for r in results)
+        same = single.shape == chunked.shape and np.allclose(single, chunked, rtol=1e-9, atol=0)
+        print(f"{interval}: {len(single)} bars single pass, {len(chunked)} chunked + replayed, "
+              f"volume {single[:, 5].sum():.4f} vs {chunked[:, 5].sum():.4f} -> {'OK' if same else 'MISMATCH'}")
+        ok &= same
+    return ok
+
+if __name__ == "__main__":
+    # Usage: trade_bars.py --replay FILE --coin COIN [--db PATH]
+    #        trade_bars.py --synthetic N [--coin COIN] [--db PATH]   (local stand-in feed)
+    #        trade_bars.py --check   (chunked + resumed runs vs one pass, same-ms prints across chunk boundaries)
+    args = sys.argv[1:]
+    def option(name):
+        return args[args.index(name) + 1] if name in args else None
+    coin = option('--coin') or 'BTC'
+    if '--check' in args:
+        sys.exit(0 if check_resume() else 1)
+    conn = sqlite3.connect(option('--db') or DB_PATH, timeout=30)
+    t0 = time.perf_counter()
+    if option('--replay'):
+        build_bars(conn, coin, replay_file(option('--replay'), coin))
+    elif option('--synthetic'):
+        build_bars(conn, coin, synthetic_trades(int(option('--synthetic'))))
+    else:
+        print("Usage: trade_bars.py --replay FILE --coin COIN | --synthetic N [--coin COIN] [--db PATH]")
+        sys.exit(2)
+    conn.close()
+    print(f"Done in {time.perf_counter() - t0:.1f}s")
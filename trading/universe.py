@@ -0,0 +1,289 @@
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import sync_hyperliquid as sync
+from market_data import load_latest_rows
+
+# --- Universe Manager ---
+# Every listed perp (info API metaAndAssetCtxs) is ranked into refresh tiers: the
+# watchlist (sync_hyperliquid.COINS) and the top coins by 24h notional volume are topped
+# up on every cycle, the rest only once they fall a tier-specific lag behind. Each cycle
+# has a weight budget: due series are served in tier order (most behind first within a
+# tier) until it is spent, in waves so cheaper-than-estimated requests free budget for
+# the next wave. Whatever does not fit waits for the next cycle and shows up as lag.
+
+UNIVERSE_STATUS_PATH = "/home/manni/.openclaw/workspace/trading/data/universe_status.json"
+UNIVERSE_REFRESH_S = 6 * 3600  # Re-read listings / volumes at most this often
+# Saved metaAndAssetCtxs response to use instead of the API (tests, offline runs)
+UNIVERSE_STUB_PATH = None
+
+# (name, size by 24h volume - None takes the rest, refresh once this many ms behind - 0 = every cycle)
+TIERS = [
+    ('core', 20, 0),
+    ('active', 40, 60 * 60 * 1000),
+    ('tail', None, 4 * 60 * 60 * 1000),
+]
+CYCLE_BUDGET = sync.WEIGHT_PER_MINUTE * 5  # Weight one cycle may spend (the pipeline ingests every 15m)
+REFRESH_WORKERS = 8
+
+# --- Discovery ---
+def init_universe(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS universe (
+            symbol TEXT PRIMARY KEY,
+            tier INTEGER,
+            day_volume REAL,
+            updated INTEGER
+        )
+    ''')
+
+def fetch_meta(stub_path=None):
+    """Raw metaAndAssetCtxs response: [meta, asset contexts], from the stub file if given."""
+    if stub_path:
+        with open(stub_path, 'r') as f:
+            return json.load(f)
+    sync.LIMITER.acquire(sync.REQUEST_WEIGHT)
+    response = sync.requests.post(sync.API_URL, json={"type": "metaAndAssetCtxs"},
+                                  headers={"Content-Type": "application/json"}, timeout=15)
+    response.raise_for_status()
+    return response.json()
+
+def fetch_listings(stub_path=None):
+    """[(symbol, 24h notional volume)] of every listed (not delisted) perp."""
+    meta, ctxs = fetch_meta(stub_path)
+    return [(asset['name'], float(ctx.get('dayNtlVlm') or 0))
+            for asset, ctx in zip(meta['universe'], ctxs) if not asset.get('isDelisted')]
+
+def assign_tiers(listings, watchlist=sync.COINS):
+    """{symbol: tier}. Listed watchlist coins always land in tier 0, the rest fill the tiers by volume."""
+    listed = {s for s, _ in listings}
+    watched = [s for s in watchlist if s in listed]
+    ranked = watched + [s for s, _ in sorted(listings, key=lambda x: -x[1]) if s not in watched]
+    tiers = {}
+    pos = 0
+    for tier, (_, size, _) in enumerate(TIERS):
+        end = len(ranked) if size is None else pos + size
+        if tier == 0:
+            end = max(end, len(watched))
+        for symbol in ranked[pos:end]:
+            tiers[symbol] = tier
+        pos = end
+    return tiers
+
+def load_universe(conn, stub_path=None, force=False):
+    """
+    {symbol: tier}, re-discovered when the stored one is older than UNIVERSE_REFRESH_S.
+    If discovery fails the stored universe (or, with none stored, the watchlist) is used
+    and discovery is retried next cycle.
+    """
+    init_universe(conn)
+    updated = conn.execute("SELECT MIN(updated) FROM universe").fetchone()[0]
+    stored = dict(conn.execute("SELECT symbol, tier FROM universe").fetchall())
+    if not force and updated is not None and time.time() - updated < UNIVERSE_REFRESH_S:
+        return stored
+
+    try:
+        listings = fetch_listings(stub_path)
+    except Exception as e:
+        source = "stored universe" if stored else "watchlist"
+        print(f"Universe discovery failed ({type(e).__name__}: {e}), syncing the {source}", flush=True)
+        return stored or assign_tiers([(s, 0) for s in sync.COINS])
+    tiers = assign_tiers(listings)
+    missing = [s for s in sync.COINS if s not in tiers]
+    if missing:
+        print(f"Watchlist coins not listed: {', '.join(missing)}", flush=True)
+    now = int(time.time())
+    with conn:
+        conn.execute("DELETE FROM universe") # Delisted coins drop out, their candles stay
+        conn.executemany("INSERT INTO universe (symbol, tier, day_volume, updated) VALUES (?, ?, ?, ?)",
+                         [(s, tiers[s], v, now) for s, v in listings])
+    return tiers
+
+# --- Scheduling ---
+def load_oldest(conn, pairs):
+    """Oldest stored open time of each (symbol, interval) pair, one index seek per pair."""
+    if not pairs:
+        return {}
+    values = ','.join(['(?, ?)'] * len(pairs))
+    rows = conn.execute(f"""
+        WITH series(symbol, interval) AS (VALUES {values})
+        SELECT symbol, interval, (SELECT MIN(timestamp) FROM candles c
+                                  WHERE c.symbol = series.symbol AND c.interval = series.interval)
+        FROM series
+    """, [v for pair in pairs for v in pair]).fetchall()
+    return {(r[0], r[1]): r[2] for r in rows if r[2] is not None}
+
+def load_floors(conn):
+    try:
+        return {(r[0], r[1]): r[2] for r in conn.execute("SELECT symbol, interval, floor_ts FROM sync_floor")}
+    except sqlite3.OperationalError:
+        return {} # No sync_floor table yet
+
+def series_state(conn, universe, now_ms):
+    """
+    Per series: (symbol, interval, tier, newest stored open time or None, lag ms, oldest
+    stored open time if sync_series will backfill older history first, else None).
+    Lag = how far the newest stored candle is behind the newest closed one (0 = fresh).
+    """
+    pairs = [(s, i) for s in sorted(universe) for i in sync.TIMEFRAMES]
+    latest = load_latest_rows(conn, pairs)
+    oldest = load_oldest(conn, pairs)
+    floors = load_floors(conn)
+    target_start = now_ms - sync.MAX_LOOKBACK_DAYS * 86400 * 1000
+    out = []
+    for symbol, interval in pairs:
+        step = sync.INTERVAL_MS[interval]
+        newest_closed = now_ms - now_ms % step - step
+        last = latest[(symbol, interval)][0] if (symbol, interval) in latest else None
+        lag = None if last is None else max(0, newest_closed - last)
+        # Same test as sync_series: history starts > 7 days after the lookback, no floor below it
+        first, floor = oldest.get((symbol, interval)), floors.get((symbol, interval))
+        older = first if first is not None and first > target_start + 7 * 86400 * 1000 and \
+            (floor is None or first > floor) else None
+        out.append((symbol, interval, universe[symbol], last, lag, older))
+    return out
+
+def estimate_weight(interval, last, lag, now_ms, older=None):
+    """
+    Worst-case weight of refreshing one series: a full backfill if it has no data yet,
+    else the top-up plus the older-range backfill shards if one is pending (`older`).
+    """
+    full = sync.REQUEST_WEIGHT + sync.MAX_CANDLES_PER_REQUEST // sync.ITEMS_PER_WEIGHT
+    start = now_ms - sync.MAX_LOOKBACK_DAYS * 86400 * 1000
+    if last is None:
+        return full * len(sync.plan_shards(start, now_ms, interval))
+    behind = lag // sync.INTERVAL_MS[interval] + 2  # Plus the newest closed and the forming candle
+    weight = sync.REQUEST_WEIGHT + behind // sync.ITEMS_PER_WEIGHT
+    if older is not None:
+        weight += full * len(sync.plan_shards(start, older - 1, interval))
+    return weight
+
+def is_due(tier, lag):
+    return lag is None or lag >= TIERS[tier][2]
+
+def plan(states, budget, now_ms, skip=()):
+    """
+    Due series in priority order (tier, then most behind / no data first) that fit the
+    budget by their estimates. Returns (to refresh, deferred).
+    """
+    due = [s for s in states if (s[0], s[1]) not in skip and is_due(s[2], s[4])]
+    due.sort(key=lambda s: (s[2], -(s[4] if s[4] is not None else float('inf'))))
+    chosen, deferred = [], []
+    for s in due:
+        cost = estimate_weight(s[1], s[3], s[4], now_ms, s[5])
+        if cost <= budget:
+            chosen.append(s)
+            budget -= cost
+        else:
+            deferred.append(s)
+    return chosen, deferred
+
+def refresh_series(state, now_ms, target_start):
+    """sync_series for one planned series. Returns candles saved, or None if it failed."""
+    symbol, interval = state[0], state[1]
+    try:
+        return sync.sync_series(symbol, interval, now_ms, target_start)
+    except Exception as e:
+        print(f"  {symbol} {interval}: refresh failed: {type(e).__name__}: {e}", flush=True)
+        return None
+
+def refresh_cycle(stub_path=UNIVERSE_STUB_PATH, budget=CYCLE_BUDGET, workers=REFRESH_WORKERS):
+    """One scheduler cycle: refresh due series within the weight budget, then report staleness."""
+    conn = sqlite3.connect(sync.DB_PATH, timeout=30)
+    universe = load_universe(conn, stub_path)
+    now_ms = int(time.time() * 1000)
+    target_start = now_ms - sync.MAX_LOOKBACK_DAYS * 86400 * 1000
+    spent_at_start = sync.LIMITER.total
+    done, failed = set(), set()
+
+    t0 = time.time()
+    with ThreadPoolExecutor(workers) as pool:
+        while True:
+            remaining = budget - (sync.LIMITER.total - spent_at_start)
+            chosen, _ = plan(series_state(conn, universe, now_ms), remaining, now_ms, skip=done)
+            if not chosen:
+                break
+            saved = list(pool.map(lambda s: refresh_series(s, now_ms, target_start), chosen))
+            failed.update((s[0], s[1]) for s, n in zip(chosen, saved) if n is None)
+            done.update((s[0], s[1]) for s in chosen) # Failed ones too, they retry next cycle
+
+    spent = sync.LIMITER.total - spent_at_start
+    note = f", {len(failed)} failed" if failed else ""
+    print(f"Universe: {len(universe)} coins, refreshed {len(done - failed)} series{note} with {spent} weight "
+          f"in {time.time() - t0:.1f}s", flush=True)
+    status = staleness_report(conn, universe, skip=done - failed)
+    conn.close()
+    write_status(status)
+    return status
+
+# --- Staleness ---
+def staleness_report(conn, universe, now_ms=None, skip=()):
+    """Per tier: series, fresh, median / max lag (minutes), no data yet, still due (not refreshed)."""
+    now_ms = now_ms or int(time.time() * 1000)
+    states = series_state(conn, universe, now_ms)
+    report = {}
+    for tier, (name, _, _) in enumerate(TIERS):
+        rows = [s for s in states if s[2] == tier]
+        lags = [s[4] / 60000 for s in rows if s[4] is not None]
+        report[name] = {
+            'coins': sum(1 for t in universe.values() if t == tier),
+            'series': len(rows),
+            'fresh': sum(1 for s in rows if s[4] == 0),
+            'median_lag_min': round(statistics.median(lags), 1) if lags else None,
+            'max_lag_min': round(max(lags), 1) if lags else None,
+            'no_data': sum(1 for s in rows if s[4] is None),
+            'due': sum(1 for s in rows if (s[0], s[1]) not in skip and is_due(tier, s[4]) and s[4] != 0)
+        }
+    print(f"{'TIER':<8} {'COINS':>5} {'SERIES':>6} {'FRESH':>6} {'MED LAG':>8} {'MAX LAG':>8} {'NO DATA':>7} {'DUE':>5}")
+    for name, r in report.items():
+        med = f"{r['median_lag_min']:.0f}m" if r['median_lag_min'] is not None else '-'
+        mx = f"{r['max_lag_min']:.0f}m" if r['max_lag_min'] is not None else '-'
+        print(f"{name:<8} {r['coins']:>5} {r['series']:>6} {r['fresh']:>6} {med:>8} {mx:>8} {r['no_data']:>7} {r['due']:>5}")
+    return report
+
+def write_status(status):
+    data = {'updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'tiers': status}
+    try:
+        tmp = UNIVERSE_STATUS_PATH + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, UNIVERSE_STATUS_PATH)
+    except OSError:
+        pass
+
+if __name__ == "__main__":
+    # Usage: universe.py [--stub PATH] [--record PATH] [--status] [--plan]
+    #   --record saves the live metaAndAssetCtxs response (e.g. as a stub for tests)
+    #   --status only prints per-tier staleness, --plan shows what the next cycle would fetch
+    args = sys.argv[1:]
+    def option(name):
+        return args[args.index(name) + 1] if name in args else None
+    stub = option('--stub') or UNIVERSE_STUB_PATH
+
+    if option('--record'):
+        with open(option('--record'), 'w') as f:
+            json.dump(fetch_meta(), f)
+        print(f"Saved listing response to {option('--record')}")
+    elif '--status' in args or '--plan' in args:
+        sync.init_db()
+        conn = sqlite3.connect(sync.DB_PATH, timeout=30)
+        universe = load_universe(conn, stub)
+        if '--plan' in args:
+            now_ms = int(time.time() * 1000)
+            chosen, deferred = plan(series_state(conn, universe, now_ms), CYCLE_BUDGET, now_ms)
+            for name_idx, (name, _, _) in enumerate(TIERS):
+                n = sum(1 for s in chosen if s[2] == name_idx)
+                d = sum(1 for s in deferred if s[2] == name_idx)
+                print(f"{name:<8} refresh {n:>4}  deferred {d:>4}")
+        else:
+            staleness_report(conn, universe)
+        conn.close()
+    else:
+        sync.init_db()
+        refresh_cycle(stub)